@@ -1,35 +1,126 @@
+import os
+import io
+import sys
+import glob
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import librosa
 import librosa.display
 import numpy as np
 import matplotlib.pyplot as plt
 import warnings
+from batch_analysis import collect_audio_files
 warnings.filterwarnings('ignore')
 
+
+class TempoAnalysisContext:
+    """Audio and rhythm features of one file, each computed at most once
+
+    The onset envelope is the one beat_track would compute internally, and
+    the tempogram uses the window librosa's tempo estimator uses, so every
+    method can be fed from here without changing its result.
+    """
+
+    def __init__(self, file_path, sr=22050, hop_length=512, ac_size=8.0):
+        self.file_path = file_path
+        self.hop_length = hop_length
+        self.ac_size = ac_size
+        self.y, self.sr = librosa.load(file_path, sr=sr)
+        self._onset_env = None
+        self._tempogram = None
+        self._tempo = None
+        self._pulse = None
+        self._beats = {}
+
+    @property
+    def onset_env(self):
+        if self._onset_env is None:
+            self._onset_env = librosa.onset.onset_strength(y=self.y, sr=self.sr, hop_length=self.hop_length,
+                                                           aggregate=np.median)
+        return self._onset_env
+
+    @property
+    def times(self):
+        return librosa.times_like(self.onset_env, sr=self.sr, hop_length=self.hop_length)
+
+    @property
+    def tempogram(self):
+        if self._tempogram is None:
+            win_length = librosa.time_to_frames(self.ac_size, sr=self.sr, hop_length=self.hop_length).item()
+            self._tempogram = librosa.feature.tempogram(onset_envelope=self.onset_env, sr=self.sr,
+                                                        hop_length=self.hop_length, win_length=win_length)
+        return self._tempogram
+
+    @property
+    def tempo(self):
+        """Global tempo estimate (BPM) from the shared tempogram"""
+        if self._tempo is None:
+            self._tempo = float(librosa.feature.tempo(tg=self.tempogram, sr=self.sr,
+                                                      hop_length=self.hop_length)[0])
+        return self._tempo
+
+    def local_tempo(self):
+        """Frame-wise tempo estimates from the shared tempogram"""
+        return librosa.feature.tempo(tg=self.tempogram, sr=self.sr, hop_length=self.hop_length,
+                                     aggregate=None)
+
+    @property
+    def pulse(self):
+        """Predominant local pulse curve"""
+        if self._pulse is None:
+            self._pulse = librosa.beat.plp(onset_envelope=self.onset_env, sr=self.sr,
+                                           hop_length=self.hop_length)
+        return self._pulse
+
+    def beats(self, tightness=100):
+        """Beat frames from beat_track at the shared tempo"""
+        if tightness not in self._beats:
+            _, frames = librosa.beat.beat_track(onset_envelope=self.onset_env, sr=self.sr,
+                                                hop_length=self.hop_length, bpm=self.tempo,
+                                                tightness=tightness)
+            self._beats[tightness] = frames
+        return self._beats[tightness]
+
+
 class AdvancedTempoEstimator:
     def __init__(self, sr=22050):
         self.sr = sr
+
+    def analysis_context(self, file_path):
+        """Load a file once for use by several estimation methods"""
+        return TempoAnalysisContext(file_path, sr=self.sr)
     
-    def estimate_tempo_librosa(self, file_path):
-        """Use librosa's advanced tempo estimation"""
+    def estimate_tempo_librosa(self, file_path, context=None, show=True, save_path=None):
+        """Use librosa's advanced tempo estimation
+
+        The analysis plot is shown interactively when show=True and/or
+        written to save_path; with neither, nothing is plotted.
+        """
         print(f"Advanced tempo analysis for: {file_path}")
         
         try:
-            # Load audio
-            y, sr = librosa.load(file_path, sr=self.sr)
+            # Load audio (unless the caller already has a context for this file)
+            ctx = context or self.analysis_context(file_path)
+            y, sr = ctx.y, ctx.sr
             
             # Compute tempo and beats
-            tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-            beat_times = librosa.frames_to_time(beats, sr=sr)
+            tempo = ctx.tempo
+            beats = ctx.beats()
+            beat_times = librosa.frames_to_time(beats, sr=sr, hop_length=ctx.hop_length)
             
-            # Compute onset strength
-            onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=512)
-            times = librosa.times_like(onset_env, sr=sr, hop_length=512)
-            
-            # Compute tempogram
-            tempogram = librosa.feature.tempogram(onset_envelope=onset_env, sr=sr, hop_length=512)
+            # Onset strength and tempogram are shared with the other methods
+            onset_env = ctx.onset_env
+            times = ctx.times
+            tempogram = ctx.tempogram
             
             # Plot results
-            self.plot_advanced_analysis(y, sr, onset_env, times, beat_times, tempogram, tempo)
+            if show or save_path:
+                self.plot_advanced_analysis(y, sr, onset_env, times, beat_times, tempogram, tempo,
+                                            save_path=save_path, show=show)
             
             print(f"Librosa Estimated Tempo: {tempo:.1f} BPM")
             print(f"Detected {len(beats)} beats")
@@ -40,8 +131,9 @@ class AdvancedTempoEstimator:
             print(f"Error in advanced analysis: {e}")
             return None, None
     
-    def plot_advanced_analysis(self, y, sr, onset_env, times, beat_times, tempogram, tempo):
-        """Plot advanced analysis results"""
+    def plot_advanced_analysis(self, y, sr, onset_env, times, beat_times, tempogram, tempo,
+                               save_path=None, show=True):
+        """Plot advanced analysis results (saved to save_path if given, shown if show)"""
         plt.figure(figsize=(15, 12))
         
         # Plot 1: Waveform with beats
@@ -86,25 +178,29 @@ class AdvancedTempoEstimator:
             plt.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        plt.show()
+        if save_path:
+            plt.savefig(save_path, dpi=100)
+        if show:
+            plt.show()
+        else:
+            plt.close()
     
-    def compare_methods(self, file_path):
+    def compare_methods(self, file_path, context=None):
         """Compare different tempo estimation methods"""
         print(f"Comparing tempo estimation methods for: {file_path}")
         
-        y, sr = librosa.load(file_path, sr=self.sr)
+        ctx = context or self.analysis_context(file_path)
         
         # Method 1: Default beat tracking
-        tempo1, beats1 = librosa.beat.beat_track(y=y, sr=sr)
+        tempo1, beats1 = ctx.tempo, ctx.beats()
         
         # Method 2: With different parameters
-        tempo2, beats2 = librosa.beat.beat_track(y=y, sr=sr, tightness=100)
+        tempo2, beats2 = ctx.tempo, ctx.beats(tightness=100)
         
         # Method 3: Using dynamic programming
-        onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-        pulse = librosa.beat.plp(onset_envelope=onset_env, sr=sr)
+        pulse = ctx.pulse
         beats_plp = librosa.util.peak_pick(pulse, pre_max=3, post_max=3, pre_avg=3, post_avg=5, delta=0.5, wait=10)
-        tempo_plp = librosa.beat.tempo(onset_envelope=onset_env, sr=sr, aggregate=None)[0]
+        tempo_plp = float(ctx.local_tempo()[0])
         
         print(f"\n=== METHOD COMPARISON ===")
         print(f"Default method: {tempo1:.1f} BPM")
@@ -117,21 +213,150 @@ class AdvancedTempoEstimator:
             'plp': tempo_plp
         }
 
+def _init_headless_worker():
+    """Worker processes render with Agg so nothing ever opens a window"""
+    plt.switch_backend('Agg')
+
+
+def png_names(files, png_dir):
+    """{file: PNG path in png_dir}, named after the file's path below the inputs' common folder
+
+    music/rock/x.wav becomes rock__x_tempo.png, so same-named files in
+    different folders don't overwrite each other; any name still taken
+    (x.wav and x.mp3) gets a numbered suffix.
+    """
+    paths = [os.path.abspath(path) for path in files]
+    root = os.path.commonpath(paths) if len(paths) > 1 else os.path.dirname(paths[0])
+    if root in paths:  # the same file given twice
+        root = os.path.dirname(root)
+    names, taken = {}, set()
+    for file_path, path in zip(files, paths):
+        stem = os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, '__')
+        name, n = f"{stem}_tempo.png", 1
+        while name in taken:
+            n += 1
+            name = f"{stem}_{n}_tempo.png"
+        taken.add(name)
+        names[file_path] = os.path.join(png_dir, name)
+    return names
+
+
+def analyze_file_headless(file_path, png_path=None, sr=22050):
+    """Analyze one file without any GUI and return a JSON-serializable record"""
+    started = time.perf_counter()
+    record = {'file': file_path}
+    try:
+        estimator = AdvancedTempoEstimator(sr=sr)
+        with contextlib.redirect_stdout(io.StringIO()):
+            context = estimator.analysis_context(file_path)
+            tempo, beat_times = estimator.estimate_tempo_librosa(file_path, context, show=False,
+                                                                 save_path=png_path)
+            if tempo is None:
+                raise RuntimeError("tempo estimation failed")
+            methods = estimator.compare_methods(file_path, context)
+
+        record.update({
+            'status': 'ok',
+            'duration': round(len(context.y) / context.sr, 3),
+            'tempo': round(float(tempo), 2),
+            'beat_count': int(len(beat_times)),
+            'beat_times': [round(float(t), 3) for t in beat_times],
+            'methods': {name: round(float(value), 2) for name, value in methods.items()},
+            'png': png_path
+        })
+    except Exception as e:
+        record.update({'status': 'error', 'error': str(e)})
+    record['elapsed_s'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def expand_inputs(inputs):
+    """Files, directories (recursive) and glob patterns -> sorted audio file list"""
+    paths = []
+    for item in inputs:
+        if glob.has_magic(item):
+            paths.extend(glob.glob(item, recursive=True))
+        else:
+            paths.append(item)
+    return collect_audio_files(paths)
+
+
+def run_batch(files, output='-', png_dir=None, workers=None):
+    """Analyze files headlessly, writing one JSON line per file as it completes"""
+    workers = min(workers or max(1, (os.cpu_count() or 2) - 1), len(files))
+    pngs = {}
+    if png_dir:
+        os.makedirs(png_dir, exist_ok=True)
+        pngs = png_names(files, png_dir)
+    # Keep stdout clean for JSON when streaming results there
+    log = sys.stderr if output == '-' else sys.stdout
+    out = sys.stdout if output == '-' else open(output, 'w')
+    failures = 0
+
+    def write(record, done):
+        nonlocal failures
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        if record['status'] == 'ok':
+            print(f"[{done}/{len(files)}] ✅ {record['file']}: {record['tempo']:.1f} BPM", file=log)
+        else:
+            failures += 1
+            print(f"[{done}/{len(files)}] ❌ {record['file']}: {record['error']}", file=log)
+
+    try:
+        if workers == 1:
+            _init_headless_worker()
+            for done, path in enumerate(files, 1):
+                write(analyze_file_headless(path, pngs.get(path)), done)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_headless_worker,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [pool.submit(analyze_file_headless, path, pngs.get(path)) for path in files]
+                for done, future in enumerate(as_completed(futures), 1):
+                    write(future.result(), done)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return failures
+
+
 def main():
-    import sys
-    
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
+    parser = argparse.ArgumentParser(description='Advanced tempo estimation with librosa')
+    parser.add_argument('inputs', nargs='*', help='Audio files, directories or glob patterns')
+    parser.add_argument('--batch', action='store_true',
+                        help='Headless mode (implied by several inputs, directories or globs)')
+    parser.add_argument('--output', '-o', default='-', help='JSON lines output file (default: stdout)')
+    parser.add_argument('--png-dir', help='Also save an analysis PNG per file into this directory')
+    parser.add_argument('--workers', '-j', type=int, default=None,
+                        help='Worker processes (default: CPU count - 1)')
+    args = parser.parse_args()
+
+    if not args.inputs:
+        print("Usage: python advanced_tempo.py <audio_file>")
+        print("       python advanced_tempo.py --batch <files|dirs|globs> [-o results.jsonl] [--png-dir DIR] [-j N]")
+        return
+
+    single_file = len(args.inputs) == 1 and os.path.isfile(args.inputs[0])
+    if single_file and not (args.batch or args.png_dir or args.output != '-'):
+        file_path = args.inputs[0]
         estimator = AdvancedTempoEstimator()
+        context = estimator.analysis_context(file_path)
         
         # Run basic analysis
-        tempo, beats = estimator.estimate_tempo_librosa(file_path)
+        tempo, beats = estimator.estimate_tempo_librosa(file_path, context)
         
-        # Compare methods
+        # Compare methods (reuses the loaded audio, onset envelope and tempogram)
         if tempo:
-            estimator.compare_methods(file_path)
-    else:
-        print("Usage: python advanced_tempo.py <audio_file>")
+            estimator.compare_methods(file_path, context)
+        return
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print("No audio files found", file=sys.stderr)
+        sys.exit(1)
+    failures = run_batch(files, args.output, args.png_dir, args.workers)
+    if failures:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,158 @@
+# analysis_pipeline.py - Stage graph behind the BeatDetector file analyses
+import numpy as np
+
+# Each preset picks the algorithms for the configurable stages and the
+# outputs returned by the analyze_audio_file* method built on it.
+BASIC_OUTPUTS = ('tempo_energy', 'tempo_flux', 'energy_beats', 'flux_beats', 'audio_length')
+ENHANCED_OUTPUTS = ('final_tempo', 'tempo_energy', 'tempo_flux', 'energy_beats', 'flux_beats',
+                    'downbeats', 'weak_beats', 'tempo_over_time', 'tempo_times', 'audio_length')
+
+PRESETS = {
+    'basic': {'peaks': 'static', 'tempo': 'estimate_tempo', 'downbeats': None,
+              'outputs': BASIC_OUTPUTS},
+    'enhanced': {'peaks': 'dynamic', 'tempo': 'estimate_tempo', 'downbeats': 'detect_downbeats',
+                 'outputs': ENHANCED_OUTPUTS},
+    'enhanced_v2': {'peaks': 'dynamic', 'tempo': 'estimate_tempo_improved',
+                    'downbeats': 'detect_downbeats_improved', 'outputs': ENHANCED_OUTPUTS},
+    'enhanced_v3': {'peaks': 'dynamic', 'tempo': 'estimate_tempo_advanced',
+                    'downbeats': 'detect_downbeats_kpop_enhanced', 'outputs': ENHANCED_OUTPUTS},
+}
+
+
+class AudioNotLoaded(Exception):
+    """The file could not be decoded (load_audio already reported why)"""
+
+
+def _load(p):
+    p.progress.stage("Loading audio", 0.0)
+    audio, sr = p.detector.load_audio(p.file_path)
+    if audio is None:
+        raise AudioNotLoaded(p.file_path)
+    if sr != p.detector.sample_rate:
+        p.detector.sample_rate = sr
+    return audio, sr
+
+
+def _filter(p, raw):
+    p.progress.stage("Filtering", 0.15)
+    return p.detector.bandpass_filter(raw[0])
+
+
+def _peaks(p, signal, method):
+    p.progress.stage("Detecting beats", 0.85)
+    if p.config['peaks'] == 'static':
+        # Lower threshold for flux
+        return p.detector.detect_beats(signal, threshold_factor=1.2 if method == 'energy' else 0.5,
+                                       method=method)
+    return p.detector.detect_beats_dynamic(signal, method)
+
+
+def _downbeat_split(p, *inputs):
+    """(downbeat times, weak beats) from the preset's downbeat detector"""
+    detect = getattr(p.detector, p.config['downbeats'])
+    if p.config['downbeats'] == 'detect_downbeats_improved':
+        energy_beats, energy, time_axis, tempo_energy = inputs
+        # This detector works on beat times and already returns times
+        downbeats, weak_beats = detect(energy_beats, energy, time_axis, tempo_energy)
+        return downbeats, weak_beats
+    energy_peaks, energy, time_axis = inputs
+    downbeats, weak_beats = detect(energy_peaks, energy, time_axis)
+    return time_axis[downbeats], weak_beats
+
+
+def _stage_graph(config):
+    """{stage: (function, input stages)} for one preset; every stage follows its inputs"""
+    if config['downbeats'] == 'detect_downbeats_improved':
+        downbeat_inputs = ('energy_beats', 'energy', 'time_axis', 'tempo_energy')
+    else:
+        downbeat_inputs = ('energy_peaks', 'energy', 'time_axis')
+    tempo = lambda p, beats: getattr(p.detector, config['tempo'])(beats)
+    stages = {
+        'raw': (_load, ()),
+        'sr': (lambda p, raw: raw[1], ('raw',)),
+        'audio': (_filter, ('raw',)),
+        'audio_length': (lambda p, audio, sr: len(audio)/sr, ('audio', 'sr')),
+        'energy': (lambda p, audio: p.detector.compute_energy(
+            audio, p.progress.span("Energy envelope", 0.2, 0.45)), ('audio',)),
+        'spectral_flux': (lambda p, audio: p.detector.compute_spectral_flux(
+            audio, p.progress.span("Spectral flux", 0.45, 0.85)), ('audio',)),
+        'time_axis': (lambda p, energy, sr: np.arange(len(energy)) * p.detector.hop_size / sr,
+                      ('energy', 'sr')),
+        'energy_peaks': (lambda p, energy: _peaks(p, energy, 'energy'), ('energy',)),
+        'flux_peaks': (lambda p, flux: _peaks(p, flux, 'flux'), ('spectral_flux',)),
+        'energy_beats': (lambda p, t, peaks: t[peaks], ('time_axis', 'energy_peaks')),
+        'flux_beats': (lambda p, t, peaks: t[peaks], ('time_axis', 'flux_peaks')),
+        'beat_strengths': (lambda p, energy, peaks: energy[peaks], ('energy', 'energy_peaks')),
+        'tempo_energy': (tempo, ('energy_beats',)),
+        'tempo_flux': (lambda p, beats: tempo(p, beats) if len(beats) > 1 else 0, ('flux_beats',)),
+        # Use energy tempo as primary, fallback to flux if needed
+        'final_tempo': (lambda p, energy, flux: energy if energy > 0 else flux,
+                        ('tempo_energy', 'tempo_flux')),
+        'downbeat_split': (_downbeat_split, downbeat_inputs),
+        'downbeats': (lambda p, split: split[0], ('downbeat_split',)),
+        'weak_beats': (lambda p, split: split[1], ('downbeat_split',)),
+        'tempo_curve': (lambda p, beats: p.detector.analyze_tempo_over_time(beats), ('energy_beats',)),
+        'tempo_over_time': (lambda p, curve: p.detector.smooth_tempo(curve[0]) if curve[0] else [],
+                            ('tempo_curve',)),
+        'tempo_times': (lambda p, curve: curve[1], ('tempo_curve',)),
+        'features': (lambda p, audio, sr, energy, flux, t: p.detector._features_dict(
+            audio, sr, energy, flux, t), ('audio', 'sr', 'energy', 'spectral_flux', 'time_axis')),
+    }
+    if config['downbeats'] is None:
+        for name in ('downbeat_split', 'downbeats', 'weak_beats'):
+            del stages[name]
+    return stages
+
+
+class AnalysisPipeline:
+    """Lazily evaluated analysis of one file
+
+    run(outputs) works out which stages the requested outputs depend on
+    and evaluates only those, in dependency order.  Every stage value is
+    memoized, so a later run() for more outputs reuses what is already
+    computed (e.g. plotting after a tempo-only query decodes nothing).
+    """
+
+    def __init__(self, detector, file_path, preset='enhanced', progress=None):
+        self.detector = detector
+        self.file_path = file_path
+        self.config = PRESETS[preset] if isinstance(preset, str) else preset
+        if progress is None:
+            from beat_detector import AnalysisProgress
+            progress = AnalysisProgress()
+        self.progress = progress
+        self.stages = _stage_graph(self.config)
+        self.values = {}
+
+    def required(self, outputs):
+        """Stages needed for outputs, in evaluation order"""
+        needed = set()
+        pending = list(outputs)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown analysis output: {name}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name][1])
+        return [name for name in self.stages if name in needed]
+
+    def run(self, outputs=None):
+        """{output: value} for the requested outputs (default: the preset's)
+
+        Returns None when the audio could not be loaded.
+        """
+        outputs = self.config['outputs'] if outputs is None else outputs
+        try:
+            for name in self.required(outputs):
+                if name not in self.values:
+                    function, inputs = self.stages[name]
+                    self.values[name] = function(self, *(self.values[i] for i in inputs))
+        except AudioNotLoaded:
+            return None
+        return {name: self.values[name] for name in outputs}
+
+    @property
+    def computed(self):
+        """Names of the stages evaluated so far"""
+        return list(self.values)
@@ -0,0 +1,182 @@
+# analysis_result.py - Compact analysis results with binary (.npz) and JSON round-trips
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+import numpy as np
+
+BEAT_DTYPE = np.dtype([('time', 'f8'), ('strength', 'f4'), ('is_downbeat', '?')])
+CURVE_DTYPE = np.dtype([('time', 'f8'), ('tempo', 'f8')])
+
+
+class AnalysisResult:
+    """One file's analysis: scalars plus structured beat and tempo-curve records
+
+    beats holds the energy beats as (time, strength, is_downbeat) records,
+    so downbeats and weak beats are views of it rather than extra lists.
+    Indexing with the keys of the analyze_audio_file* dicts
+    (result['energy_beats'], result.get('tempo_over_time'), ...) still works.
+    """
+
+    __slots__ = ('file_path', 'preset', 'final_tempo', 'tempo_energy', 'tempo_flux', 'audio_length',
+                 'beats', 'flux_beats', 'tempo_curve')
+
+    SCALARS = ('final_tempo', 'tempo_energy', 'tempo_flux', 'audio_length')
+    KEYS = ('final_tempo', 'tempo_energy', 'tempo_flux', 'energy_beats', 'flux_beats', 'downbeats',
+            'weak_beats', 'tempo_over_time', 'tempo_times', 'audio_length')
+
+    def __init__(self, beats, flux_beats=None, tempo_curve=None, final_tempo=0.0, tempo_energy=0.0,
+                 tempo_flux=0.0, audio_length=0.0, file_path='', preset=''):
+        self.beats = np.asarray(beats, dtype=BEAT_DTYPE)
+        self.flux_beats = np.asarray([] if flux_beats is None else flux_beats, dtype=np.float64)
+        self.tempo_curve = np.asarray([] if tempo_curve is None else tempo_curve, dtype=CURVE_DTYPE)
+        self.final_tempo = float(final_tempo)
+        self.tempo_energy = float(tempo_energy)
+        self.tempo_flux = float(tempo_flux)
+        self.audio_length = float(audio_length)
+        self.file_path = str(file_path)
+        self.preset = str(preset)
+
+    @classmethod
+    def from_results(cls, results, beat_strengths=None, file_path='', preset=''):
+        """Build from an analyze_audio_file* dict (beat strengths default to nan)"""
+        times = np.asarray(results['energy_beats'], dtype=np.float64)
+        beats = np.zeros(len(times), dtype=BEAT_DTYPE)
+        beats['time'] = times
+        beats['strength'] = np.nan if beat_strengths is None else beat_strengths
+        beats['is_downbeat'] = np.isin(times, np.asarray(results.get('downbeats', []), dtype=np.float64))
+
+        curve_tempos = results.get('tempo_over_time')
+        if curve_tempos is None:  # may be an ndarray, so no `or []`
+            curve_tempos = []
+        curve = np.zeros(len(curve_tempos), dtype=CURVE_DTYPE)
+        curve['time'] = np.asarray(results.get('tempo_times', []), dtype=np.float64)[:len(curve)]
+        curve['tempo'] = curve_tempos
+        tempo_energy = results['tempo_energy']
+        return cls(beats, results.get('flux_beats'), curve,
+                   final_tempo=results.get('final_tempo', tempo_energy or results['tempo_flux']),
+                   tempo_energy=tempo_energy, tempo_flux=results['tempo_flux'],
+                   audio_length=results['audio_length'], file_path=file_path, preset=preset)
+
+    # Views matching the legacy result dict
+
+    @property
+    def energy_beats(self):
+        return self.beats['time']
+
+    @property
+    def downbeats(self):
+        return self.beats['time'][self.beats['is_downbeat']]
+
+    @property
+    def weak_beats(self):
+        return self.beats['time'][~self.beats['is_downbeat']]
+
+    @property
+    def tempo_over_time(self):
+        return self.tempo_curve['tempo']
+
+    @property
+    def tempo_times(self):
+        return self.tempo_curve['time']
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in self.KEYS else default
+
+    def keys(self):
+        return self.KEYS
+
+    def to_dict(self):
+        """The legacy dict shape (tempo_over_time and tempo_times as lists)"""
+        results = {key: self[key] for key in self.KEYS}
+        results['tempo_over_time'] = self.tempo_over_time.tolist()
+        results['tempo_times'] = self.tempo_times.tolist()
+        return results
+
+    @property
+    def nbytes(self):
+        return self.beats.nbytes + self.flux_beats.nbytes + self.tempo_curve.nbytes
+
+    def __repr__(self):
+        return (f"AnalysisResult({os.path.basename(self.file_path) or '?'}, {self.final_tempo:.1f} BPM, "
+                f"{len(self.beats)} beats, {int(self.beats['is_downbeat'].sum())} downbeats)")
+
+    # Binary round-trip: raw arrays, no pickling and no parsing on load
+
+    def save_npz(self, path):
+        arrays = {name: np.float64(getattr(self, name)) for name in self.SCALARS}
+        np.savez(path, beats=self.beats, flux_beats=self.flux_beats, tempo_curve=self.tempo_curve,
+                 file_path=np.str_(self.file_path), preset=np.str_(self.preset), **arrays)
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['beats'], data['flux_beats'], data['tempo_curve'],
+                       file_path=data['file_path'][()], preset=data['preset'][()],
+                       **{name: data[name][()] for name in cls.SCALARS})
+
+    # JSON round-trip: Python floats print their shortest exact repr, so nothing is lost
+
+    def to_json(self, **dump_kwargs):
+        payload = {name: getattr(self, name) for name in self.SCALARS + ('file_path', 'preset')}
+        payload['beats'] = {field: self.beats[field].tolist() for field in BEAT_DTYPE.names}
+        payload['flux_beats'] = self.flux_beats.tolist()
+        payload['tempo_curve'] = {field: self.tempo_curve[field].tolist() for field in CURVE_DTYPE.names}
+        return json.dumps(payload, **dump_kwargs)
+
+    @classmethod
+    def from_json(cls, text):
+        payload = json.loads(text)
+        beats = np.zeros(len(payload['beats']['time']), dtype=BEAT_DTYPE)
+        for field in BEAT_DTYPE.names:
+            beats[field] = payload['beats'][field]
+        curve = np.zeros(len(payload['tempo_curve']['time']), dtype=CURVE_DTYPE)
+        for field in CURVE_DTYPE.names:
+            curve[field] = payload['tempo_curve'][field]
+        return cls(beats, payload['flux_beats'], curve, file_path=payload['file_path'],
+                   preset=payload['preset'], **{name: payload[name] for name in cls.SCALARS})
+
+
+class ResultCache:
+    """Directory of .npz results keyed by file path, size, mtime and preset
+
+    A changed or replaced audio file gets a new key, so stale entries are
+    never returned.  Writes go through a temporary file and os.replace, so
+    readers never see a partial entry.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, file_path, preset):
+        stat = os.stat(file_path)
+        key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{preset}"
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + '.npz')
+
+    def get(self, file_path, preset):
+        try:
+            return AnalysisResult.load_npz(self._path(file_path, preset))
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            return None  # missing or corrupt entry: a miss
+
+    def put(self, result):
+        path = self._path(result.file_path, result.preset)
+        fd, temp_path = tempfile.mkstemp(suffix='.npz', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                result.save_npz(f)
+            os.replace(temp_path, path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+        return path
@@ -0,0 +1,151 @@
+# batch_analysis.py - Analyze many audio files on a pool of worker processes
+import os
+import io
+import queue
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.m4a', '.aac')
+
+SUMMARY_FIELDS = ('final_tempo', 'tempo_energy', 'tempo_flux', 'total_beats', 'downbeats',
+                  'duration', 'beat_density', 'tempo_stability', 'interval_consistency',
+                  'algorithm_agreement')
+
+_detector = None  # one BeatDetector per worker process
+
+
+def collect_audio_files(paths):
+    """Expand files and folders (recursively) into a sorted list of audio files"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, files in os.walk(path):
+                found.extend(os.path.join(folder, name) for name in files
+                             if name.lower().endswith(AUDIO_EXTENSIONS))
+        elif path.lower().endswith(AUDIO_EXTENSIONS):
+            found.append(path)
+    return sorted(set(found))
+
+
+def summarize_results(results, file_path):
+    """Reduce full analysis results to the scalars shown in a batch table"""
+    beat_intervals = np.diff(results['energy_beats'])
+    tempo_over_time = results.get('tempo_over_time')
+    if tempo_over_time is None:  # may be an ndarray, so no `or []`
+        tempo_over_time = []
+    final_tempo = results.get('final_tempo', results['tempo_energy'] or results['tempo_flux'])
+    return {
+        'path': file_path,
+        'file': os.path.basename(file_path),
+        'status': 'done',
+        'final_tempo': float(final_tempo),
+        'tempo_energy': float(results['tempo_energy']),
+        'tempo_flux': float(results['tempo_flux']),
+        'total_beats': len(results['energy_beats']),
+        'downbeats': len(results.get('downbeats', [])),
+        'duration': float(results['audio_length']),
+        'beat_density': len(results['energy_beats']) / results['audio_length'],
+        'tempo_stability': float(np.std(tempo_over_time)) if len(tempo_over_time) else 0.0,
+        'interval_consistency': float(np.std(beat_intervals)) if len(beat_intervals) > 1 else 0.0,
+        'algorithm_agreement': abs(float(results['tempo_energy']) - float(results['tempo_flux']))
+    }
+
+
+def analyze_file_summary(file_path, method='analyze_audio_file_enhanced'):
+    """Worker entry point: analyze one file and return only its summary
+
+    Runs in a child process, so the audio and feature arrays never leave
+    it; the parent only receives a small dict of scalars.
+    """
+    global _detector
+    if _detector is None:
+        from beat_detector import BeatDetector
+        _detector = BeatDetector()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = getattr(_detector, method)(file_path, visualize=False)
+        if not results:
+            return {'path': file_path, 'file': os.path.basename(file_path),
+                    'status': 'error', 'error': 'could not load audio'}
+        return summarize_results(results, file_path)
+    except Exception as e:
+        return {'path': file_path, 'file': os.path.basename(file_path),
+                'status': 'error', 'error': str(e)}
+
+
+class BatchRunner:
+    """Run analyze_file_summary over many files and collect summaries on a queue
+
+    Completed summaries are put on self.results as they finish (in
+    completion order), so a GUI can poll it without ever blocking.
+    Poll while unreported is non-zero: a future is done() just before
+    its summary is queued.
+    """
+
+    def __init__(self, max_workers=None, method='analyze_audio_file_enhanced'):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.method = method
+        self.results = queue.Queue()
+        self._executor = None
+        self._futures = []
+        self._unreported = 0  # submitted files whose summary hasn't been drained yet
+
+    def submit(self, file_paths):
+        """Queue files for analysis; returns the number submitted"""
+        if self._executor is None:
+            # spawn keeps workers independent of the parent's threads and Tk state
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        for path in file_paths:
+            future = self._executor.submit(analyze_file_summary, path, self.method)
+            future.add_done_callback(lambda f, path=path: self._collect(f, path))
+            self._futures.append(future)
+            self._unreported += 1
+        return len(file_paths)
+
+    def _collect(self, future, path):
+        if future.cancelled():
+            summary = {'path': path, 'file': os.path.basename(path), 'status': 'cancelled'}
+        elif future.exception() is not None:
+            summary = {'path': path, 'file': os.path.basename(path),
+                       'status': 'error', 'error': str(future.exception())}
+        else:
+            summary = future.result()
+        self.results.put(summary)
+
+    @property
+    def pending(self):
+        self._futures = [f for f in self._futures if not f.done()]
+        return len(self._futures)
+
+    def drain(self, max_items=500):
+        """Summaries completed since the last call (never blocks)"""
+        items = []
+        while len(items) < max_items:
+            try:
+                items.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        self._unreported = max(0, self._unreported - len(items))
+        return items
+
+    @property
+    def unreported(self):
+        """Files submitted whose summary hasn't been returned by drain() yet"""
+        return self._unreported
+
+    def cancel(self):
+        """Cancel files that have not started; running ones finish in the background"""
+        for future in self._futures:
+            future.cancel()
+
+    def shutdown(self):
+        self.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._futures = []
+        self._unreported = 0
@@ -5,15 +5,72 @@ import sounddevice as sd
 import soundfile as sf
 import argparse
 import os
+import time
+import threading
 from scipy.io import wavfile
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy import fft as sp_fft
+from scipy.signal import butter, filtfilt, sosfiltfilt, find_peaks
+from scipy.ndimage import median_filter
+from beat_events import BeatEvent, BeatEventBus, start_console_printer
+from waveform_pyramid import MinMaxPyramid, plot_pyramid
+from tempo_batch import estimate_tempo_windows
+from analysis_pipeline import AnalysisPipeline
+from analysis_result import AnalysisResult
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an analysis when its CancellationToken was cancelled"""
+
+
+class CancellationToken:
+    """Thread-safe flag an analysis checks between stages and feature chunks"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise AnalysisCancelled("Analysis cancelled")
+
+
+class AnalysisProgress:
+    """Report fractional progress of one analysis and honour its cancellation token
+
+    callback(fraction, stage) receives the overall fraction in [0, 1].
+    Every report first checks the token, so reporting doubles as the
+    cancellation point.
+    """
+
+    def __init__(self, callback=None, cancel_token=None):
+        self.callback = callback
+        self.cancel_token = cancel_token
+
+    def stage(self, name, fraction):
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+        if self.callback is not None:
+            self.callback(fraction, name)
+
+    def span(self, name, start, end):
+        """Progress function for a chunked stage covering [start, end] of the run"""
+        return lambda fraction: self.stage(name, start + (end - start) * fraction)
 
 
 class BeatDetector:
-    def __init__(self, sample_rate=22050, frame_size=1024, hop_size=512):
+    def __init__(self, sample_rate=22050, frame_size=1024, hop_size=512, dtype='float32'):
         self.sample_rate = sample_rate
         self.frame_size = frame_size
         self.hop_size = hop_size
+        # Precision of the whole pipeline: float32 (spectra complex64) halves memory
+        # and bandwidth; 'float64' reproduces the original double-precision path
+        self.dtype = np.dtype(dtype)
         
     def load_audio(self, file_path):
         """Load audio file and convert to mono"""
@@ -21,7 +78,7 @@ class BeatDetector:
         
         try:
             # Use librosa for all audio file types
-            audio, sr = librosa.load(file_path, sr=self.sample_rate, mono=True)
+            audio, sr = librosa.load(file_path, sr=self.sample_rate, mono=True, dtype=self.dtype)
             
             print(f"Audio loaded: {len(audio)/sr:.2f} seconds, Sample rate: {sr} Hz")
             return audio, sr
@@ -54,8 +111,13 @@ class BeatDetector:
         
         try:
             # Butterworth bandpass filter (lower order for stability)
-            b, a = butter(2, [low_normalized, high_normalized], btype='band')
-            filtered_audio = filtfilt(b, a, audio)
+            if self.dtype == np.float64:
+                b, a = butter(2, [low_normalized, high_normalized], btype='band')
+                filtered_audio = filtfilt(b, a, audio)
+            else:
+                # Second-order sections keep the low cutoff stable in single precision
+                sos = butter(2, [low_normalized, high_normalized], btype='band', output='sos')
+                filtered_audio = sosfiltfilt(sos.astype(self.dtype), audio.astype(self.dtype, copy=False))
             print("  ✓ Filter applied successfully")
             return filtered_audio
         except Exception as e:
@@ -63,35 +125,47 @@ class BeatDetector:
             print("  Returning original audio")
             return audio
     
-    def compute_energy(self, audio):
-        """Compute energy envelope of the signal"""
+    def compute_energy(self, audio, progress=None):
+        """Compute energy envelope of the signal
+
+        progress, if given, is called with the fraction done every few
+        thousand frames (and may raise AnalysisCancelled).
+        """
         print("Computing energy envelope...")
         energy = []
         frames = len(audio) // self.hop_size
+        audio = np.asarray(audio, dtype=self.dtype)
         
         for i in range(frames):
+            if progress is not None and i % 2048 == 0:
+                progress(i / frames)
             start = i * self.hop_size
             end = start + self.frame_size
             if end < len(audio):
                 frame = audio[start:end]
-                energy.append(np.sum(frame ** 2))
+                energy.append(np.dot(frame, frame))
         
-        return np.array(energy)
+        return np.array(energy, dtype=self.dtype)
     
-    def compute_spectral_flux(self, audio):
-        """Compute spectral flux for beat detection"""
+    def compute_spectral_flux(self, audio, progress=None):
+        """Compute spectral flux for beat detection (progress as in compute_energy)"""
         print("Computing spectral flux...")
         frames = len(audio) // self.hop_size
         flux = []
         prev_spectrum = None
+        audio = np.asarray(audio, dtype=self.dtype)
+        window = np.hanning(self.frame_size).astype(self.dtype)
         
         for i in range(frames):
+            if progress is not None and i % 512 == 0:
+                progress(i / frames)
             start = i * self.hop_size
             end = start + self.frame_size
             if end < len(audio):
                 frame = audio[start:end]
-                windowed = frame * np.hanning(len(frame))
-                spectrum = np.abs(np.fft.fft(windowed)[:len(windowed)//2])
+                windowed = frame * window
+                # Real FFT keeps float32 input in complex64; bins 0..N/2-1 as before
+                spectrum = np.abs(sp_fft.rfft(windowed)[:len(windowed)//2])
                 
                 if prev_spectrum is not None:
                     diff = spectrum - prev_spectrum
@@ -102,7 +176,7 @@ class BeatDetector:
                 
                 prev_spectrum = spectrum
         
-        return np.array(flux)
+        return np.array(flux, dtype=self.dtype)
     
     def detect_beats(self, energy_signal, threshold_factor=1.3, method='energy'):
         """Detect beats from energy signal with improved parameters"""
@@ -327,285 +401,412 @@ class BeatDetector:
         
         return best_tempo
 
-    def analyze_audio_file(self, file_path, visualize=True):
-        """Complete analysis of an audio file"""
+    def estimate_tempo_comb(self, onset, rate, min_bpm=40, max_bpm=240, resolution=0.1,
+                            harmonics=4, prior_bpm=120):
+        """Tempo salience over a dense BPM grid, scored with one comb-filter matrix
+
+        Each candidate's comb reads the onset autocorrelation at 1..harmonics
+        beat periods (interpolating between lags) and subtracts the off-beats
+        halfway between them, so half the true tempo, whose off-beats fall on
+        real beats, is not rewarded.  A broad log-normal prior around
+        prior_bpm settles what octave ambiguity is left.  Returns the tempo,
+        a 0-1 confidence and the full 'bpms' / 'salience' curve.
+        """
+        bpms = np.arange(min_bpm, max_bpm + resolution / 2, resolution)
+        periods = 60.0 * rate / bpms  # beat period of every candidate, in envelope frames
+        onset = np.asarray(onset, dtype=np.float64)
+        onset = onset - onset.mean()
+        n = len(onset)
+        max_lag = int(np.ceil(periods.max() * harmonics)) + 1
+        if n <= max_lag or not onset.any():
+            return {'tempo': 0, 'confidence': 0.0, 'bpms': bpms, 'salience': np.zeros(len(bpms))}
+
+        spectrum = np.fft.rfft(onset, 2 * n)
+        ac = np.fft.irfft(spectrum * np.conj(spectrum))[:max_lag + 1]
+        ac /= n - np.arange(max_lag + 1)  # unbiased, so long lags are not penalised
+        ac /= ac[0]
+
+        # (candidates x harmonics) lag matrices for the beats and the off-beats between them
+        beat_lags = periods[:, None] * np.arange(1, harmonics + 1)
+        offbeat_lags = beat_lags - periods[:, None] / 2
+        salience = self._interp_lags(ac, beat_lags).mean(axis=1) - \
+            self._interp_lags(ac, offbeat_lags).mean(axis=1)
+        salience = np.clip(salience, 0, 1)
+
+        weighted = salience * np.exp(-0.5 * np.log2(bpms / prior_bpm) ** 2)
+        best = int(np.argmax(weighted))
+        return {
+            'tempo': float(bpms[best]),
+            'confidence': float(salience[best]),
+            'bpms': bpms,
+            'salience': salience
+        }
+
+    def _interp_lags(self, values, lags):
+        """Linear interpolation of values at fractional (in-range) indices"""
+        index = lags.astype(int)
+        frac = lags - index
+        return values[index] * (1 - frac) + values[index + 1] * frac
+
+    def analysis_pipeline(self, file_path, preset='enhanced', progress_callback=None, cancel_token=None):
+        """Lazy stage graph over one file; run(outputs) computes only what those outputs need
+
+        preset is a name from analysis_pipeline.PRESETS ('basic', 'enhanced',
+        'enhanced_v2', 'enhanced_v3') or a dict of the same form.
+        """
+        return AnalysisPipeline(self, file_path, preset, AnalysisProgress(progress_callback, cancel_token))
+
+    def analyze(self, file_path, outputs, preset='enhanced', progress_callback=None, cancel_token=None):
+        """Only the requested outputs of a preset analysis, or None if the file cannot be loaded"""
+        return self.analysis_pipeline(file_path, preset, progress_callback, cancel_token).run(outputs)
+
+    def analyze_result(self, file_path, preset='enhanced', cache=None,
+                       progress_callback=None, cancel_token=None):
+        """AnalysisResult of a preset analysis, read from / stored in an optional ResultCache"""
+        if cache is not None:
+            cached = cache.get(file_path, preset)
+            if cached is not None:
+                return cached
+        pipeline = self.analysis_pipeline(file_path, preset, progress_callback, cancel_token)
+        results = pipeline.run()
+        if results is None:
+            return None
+        result = AnalysisResult.from_results(results, pipeline.run(['beat_strengths'])['beat_strengths'],
+                                             file_path=file_path, preset=preset)
+        if cache is not None:
+            cache.put(result)
+        return result
+
+    def analyze_audio_file(self, file_path, visualize=True, keep_features=False,
+                           progress_callback=None, cancel_token=None):
+        """Complete analysis of an audio file
+
+        With keep_features=True the filtered audio and feature envelopes are
+        returned under results['features'] so callers can plot without
+        decoding and recomputing them.
+        """
         print(f"\n=== Analyzing: {file_path} ===")
-        
-        # Load and process audio
-        audio, sr = self.load_audio(file_path)
-        if audio is None:
+        pipeline = self.analysis_pipeline(file_path, 'basic', progress_callback, cancel_token)
+        results = pipeline.run()
+        if results is None:
             return None
-            
-        # Update sample rate if different from loaded file
-        if sr != self.sample_rate:
-            self.sample_rate = sr
-        
-        audio = self.bandpass_filter(audio)
-        
-        # Compute features
-        energy = self.compute_energy(audio)
-        spectral_flux = self.compute_spectral_flux(audio)
-        
-        # Detect beats with appropriate thresholds
-        energy_beats = self.detect_beats(energy, threshold_factor=1.2, method='energy')
-        flux_beats = self.detect_beats(spectral_flux, threshold_factor=0.5, method='flux')  # Lower threshold for flux
-        
-        # Convert to time
-        time_axis = np.arange(len(energy)) * self.hop_size / sr
-        energy_beat_times = time_axis[energy_beats]
-        flux_beat_times = time_axis[flux_beats]
-        
+
         # Debug the intervals
-        self.debug_beat_intervals(energy_beat_times, file_path)
-        
-        # Estimate tempo
-        tempo_energy = self.estimate_tempo(energy_beat_times)
-        tempo_flux = self.estimate_tempo(flux_beat_times) if len(flux_beat_times) > 1 else 0
-        
+        self.debug_beat_intervals(results['energy_beats'], file_path)
+
         print(f"\n=== RESULTS ===")
-        print(f"Tempo (Energy method): {tempo_energy:.1f} BPM")
-        print(f"Tempo (Spectral Flux): {tempo_flux:.1f} BPM")
-        print(f"Detected {len(energy_beat_times)} beats (Energy method)")
-        print(f"Detected {len(flux_beat_times)} beats (Spectral Flux method)")
-        
+        print(f"Tempo (Energy method): {results['tempo_energy']:.1f} BPM")
+        print(f"Tempo (Spectral Flux): {results['tempo_flux']:.1f} BPM")
+        print(f"Detected {len(results['energy_beats'])} beats (Energy method)")
+        print(f"Detected {len(results['flux_beats'])} beats (Spectral Flux method)")
+
+        pipeline.progress.stage("Done", 1.0)
         if visualize:
-            self.visualize_results(audio, sr, energy, spectral_flux, 
-                                 energy_beats, flux_beats, time_axis,
-                                 energy_beat_times, flux_beat_times)
-        
-        return {
-            'tempo_energy': tempo_energy,
-            'tempo_flux': tempo_flux,
-            'energy_beats': energy_beat_times,
-            'flux_beats': flux_beat_times,
-            'audio_length': len(audio)/sr
-        }
-    
-    def analyze_audio_file_enhanced(self, file_path, visualize=True):
-        """Enhanced analysis with dynamic thresholding, tempo smoothing, and downbeat detection"""
-        print(f"\n=== ENHANCED ANALYSIS: {file_path} ===")
-        
-        # Load and process audio
-        audio, sr = self.load_audio(file_path)
-        if audio is None:
+            v = pipeline.run(['audio', 'sr', 'energy', 'spectral_flux', 'energy_peaks', 'flux_peaks',
+                              'time_axis', 'energy_beats', 'flux_beats'])
+            self.visualize_results(v['audio'], v['sr'], v['energy'], v['spectral_flux'],
+                                   energy_beats=v['energy_peaks'], flux_beats=v['flux_peaks'],
+                                   time_axis=v['time_axis'], energy_beat_times=v['energy_beats'],
+                                   flux_beat_times=v['flux_beats'])
+        if keep_features:
+            results['features'] = pipeline.run(['features'])['features']
+        return results
+
+    def _analyze_enhanced_preset(self, file_path, preset, header, results_title, visualize,
+                                 keep_features, progress_callback, cancel_token):
+        """Shared body of the analyze_audio_file_enhanced* presets"""
+        print(f"\n=== {header} ===")
+        pipeline = self.analysis_pipeline(file_path, preset, progress_callback, cancel_token)
+        results = pipeline.run()
+        if results is None:
             return None
-            
-        if sr != self.sample_rate:
-            self.sample_rate = sr
-        
-        audio = self.bandpass_filter(audio)
-        
-        # Compute features
-        energy = self.compute_energy(audio)
-        spectral_flux = self.compute_spectral_flux(audio)
-        time_axis = np.arange(len(energy)) * self.hop_size / sr
-        
-        # Detect beats with dynamic thresholding
-        energy_beats = self.detect_beats_dynamic(energy, 'energy')
-        flux_beats = self.detect_beats_dynamic(spectral_flux, 'flux')
-        
-        energy_beat_times = time_axis[energy_beats]
-        flux_beat_times = time_axis[flux_beats]
-        
-        # Downbeat detection
-        downbeats, weak_beats = self.detect_downbeats(energy_beats, energy, time_axis)
-        downbeat_times = time_axis[downbeats]
-        
-        # Tempo analysis over time
-        energy_tempos, tempo_times = self.analyze_tempo_over_time(energy_beat_times)
-        smoothed_tempos = self.smooth_tempo(energy_tempos) if energy_tempos else []
-        
-        # Final tempo estimates
-        tempo_energy = self.estimate_tempo(energy_beat_times)
-        tempo_flux = self.estimate_tempo(flux_beat_times) if len(flux_beat_times) > 1 else 0
-        
-        # Use energy tempo as primary, fallback to flux if needed
-        final_tempo = tempo_energy if tempo_energy > 0 else tempo_flux
-        
-        print(f"\n=== ENHANCED RESULTS ===")
-        print(f"Primary Tempo: {final_tempo:.1f} BPM")
-        print(f"Energy Method: {tempo_energy:.1f} BPM")
-        print(f"Flux Method: {tempo_flux:.1f} BPM")
-        print(f"Downbeats Detected: {len(downbeats)}")
-        print(f"Weak Beats: {len(weak_beats)}")
-        
+
+        smoothed_tempos = results['tempo_over_time']
+        print(f"\n=== {results_title} ===")
+        print(f"Primary Tempo: {results['final_tempo']:.1f} BPM")
+        print(f"Energy Method: {results['tempo_energy']:.1f} BPM")
+        print(f"Flux Method: {results['tempo_flux']:.1f} BPM")
+        print(f"Downbeats Detected: {len(results['downbeats'])}")
+        print(f"Weak Beats: {len(results['weak_beats'])}")
+
         if smoothed_tempos:
             print(f"Tempo Range: {min(smoothed_tempos):.1f}-{max(smoothed_tempos):.1f} BPM")
             print(f"Tempo Stability: {np.std(smoothed_tempos):.1f} BPM std dev")
-        
+
+        pipeline.progress.stage("Done", 1.0)
         if visualize:
-            self.visualize_enhanced_results(audio, sr, energy, spectral_flux,
-                                          energy_beat_times, downbeat_times,
-                                          smoothed_tempos, tempo_times,
-                                          flux_beat_times)
-        
-        return {
-            'final_tempo': final_tempo,
-            'tempo_energy': tempo_energy,
-            'tempo_flux': tempo_flux,
-            'energy_beats': energy_beat_times,
-            'flux_beats': flux_beat_times,
-            'downbeats': downbeat_times,
-            'weak_beats': weak_beats,
-            'tempo_over_time': smoothed_tempos,
-            'tempo_times': tempo_times,
-            'audio_length': len(audio)/sr
-        }
-    
-    def analyze_audio_file_enhanced_v2(self, file_path, visualize=True):
+            v = pipeline.run(['audio', 'sr', 'energy', 'spectral_flux'])
+            self.visualize_enhanced_results(*v.values(),
+                                            results['energy_beats'], results['downbeats'],
+                                            smoothed_tempos, results['tempo_times'],
+                                            results['flux_beats'])
+        if keep_features:
+            results['features'] = pipeline.run(['features'])['features']
+        return results
+
+    def analyze_audio_file_enhanced(self, file_path, visualize=True, keep_features=False,
+                                    progress_callback=None, cancel_token=None):
+        """Enhanced analysis with dynamic thresholding, tempo smoothing, and downbeat detection"""
+        return self._analyze_enhanced_preset(file_path, 'enhanced', f"ENHANCED ANALYSIS: {file_path}",
+                                             "ENHANCED RESULTS", visualize, keep_features,
+                                             progress_callback, cancel_token)
+
+    def analyze_audio_file_enhanced_v2(self, file_path, visualize=True, keep_features=False,
+                                       progress_callback=None, cancel_token=None):
         """Version 2 with improved tempo estimation and downbeat detection"""
-        print(f"\n=== ENHANCED ANALYSIS V2: {file_path} ===")
-        
-        # Load and process audio
+        return self._analyze_enhanced_preset(file_path, 'enhanced_v2', f"ENHANCED ANALYSIS V2: {file_path}",
+                                             "ENHANCED RESULTS V2", visualize, keep_features,
+                                             progress_callback, cancel_token)
+
+    def analyze_audio_file_enhanced_v3(self, file_path, visualize=True, keep_features=False,
+                                       progress_callback=None, cancel_token=None):
+        """Version 3 with improved algorithms for all music genres"""
+        return self._analyze_enhanced_preset(file_path, 'enhanced_v3',
+                                             f"ENHANCED ANALYSIS V3: {os.path.basename(file_path)}",
+                                             "ENHANCED RESULTS V3", visualize, keep_features,
+                                             progress_callback, cancel_token)
+    
+    def analyze_audio_file_coarse_to_fine(self, file_path, envelope_rate=100, refine_window=0.07,
+                                          min_bpm=60, max_bpm=200,
+                                          progress_callback=None, cancel_token=None):
+        """Fast analysis: coarse tempo from a ~100 Hz envelope, beats refined at full rate
+
+        The tempo and beat phase are found on an onset envelope decimated to
+        envelope_rate frames per second.  Each predicted beat is then
+        re-located with ~1.5 ms resolution, looking only refine_window
+        seconds either side of the prediction, and the next prediction is
+        made from the refined position so slow drift is followed.
+        """
+        print(f"\n=== COARSE-TO-FINE ANALYSIS: {os.path.basename(file_path)} ===")
+        progress = AnalysisProgress(progress_callback, cancel_token)
+        progress.stage("Loading audio", 0.0)
+
         audio, sr = self.load_audio(file_path)
         if audio is None:
             return None
-            
         if sr != self.sample_rate:
             self.sample_rate = sr
-        
+        progress.stage("Filtering", 0.3)
         audio = self.bandpass_filter(audio)
-        
-        # Compute features
-        energy = self.compute_energy(audio)
-        spectral_flux = self.compute_spectral_flux(audio)
-        time_axis = np.arange(len(energy)) * self.hop_size / sr
-        
-        # Detect beats with dynamic thresholding
-        energy_beats = self.detect_beats_dynamic(energy, 'energy')
-        flux_beats = self.detect_beats_dynamic(spectral_flux, 'flux')
-        
-        energy_beat_times = time_axis[energy_beats]
-        flux_beat_times = time_axis[flux_beats]
-        
-        # Use improved tempo estimation
-        tempo_energy = self.estimate_tempo_improved(energy_beat_times)
-        tempo_flux = self.estimate_tempo_improved(flux_beat_times) if len(flux_beat_times) > 1 else 0
-        
-        # Use improved downbeat detection
-        downbeats, weak_beats = self.detect_downbeats_improved(energy_beat_times, energy, time_axis, tempo_energy)
-        downbeat_times = time_axis[downbeats] if hasattr(downbeats, '__len__') else np.array([])
-        
-        # Tempo analysis over time
-        energy_tempos, tempo_times = self.analyze_tempo_over_time(energy_beat_times)
+
+        # Coarse pass: tempo from the decimated onset envelope
+        progress.stage("Coarse tempo", 0.5)
+        onset, rate = self._coarse_onset(audio, sr, envelope_rate)
+        period, _ = self._autocorrelation_period(onset, rate, min_bpm, max_bpm)
+        if period is None:
+            print("Not enough signal for a tempo estimate")
+            return None
+        tempo_coarse = 60.0 * rate / period
+
+        # Beat phase: offset whose comb of predicted beats collects the most onset strength
+        offsets = np.arange(int(np.ceil(period)))
+        comb = np.arange(0, len(onset) - period, period)
+        scores = [onset[np.minimum((offset + comb).astype(int), len(onset) - 1)].sum() for offset in offsets]
+        first_beat = offsets[int(np.argmax(scores))] / rate
+
+        # Fine pass: re-locate each beat at full resolution near its prediction
+        progress.stage("Refining beats", 0.7)
+        beat_times = self._refine_beats(audio, sr, first_beat, period / rate, refine_window)
+
+        # Tempo from the refined beats (least-squares beat period)
+        if len(beat_times) > 2:
+            tempo_fine = 60.0 / np.polyfit(np.arange(len(beat_times)), beat_times, 1)[0]
+        else:
+            tempo_fine = tempo_coarse
+        energy_tempos, tempo_times = self.analyze_tempo_over_time(beat_times)
         smoothed_tempos = self.smooth_tempo(energy_tempos) if energy_tempos else []
-        
-        # Use energy tempo as primary, fallback to flux if needed
-        final_tempo = tempo_energy if tempo_energy > 0 else tempo_flux
-        
-        print(f"\n=== ENHANCED RESULTS V2 ===")
-        print(f"Primary Tempo: {final_tempo:.1f} BPM")
-        print(f"Energy Method: {tempo_energy:.1f} BPM")
-        print(f"Flux Method: {tempo_flux:.1f} BPM")
-        print(f"Downbeats Detected: {len(downbeats)}")
-        print(f"Weak Beats: {len(weak_beats)}")
-        
-        if smoothed_tempos:
-            print(f"Tempo Range: {min(smoothed_tempos):.1f}-{max(smoothed_tempos):.1f} BPM")
-            print(f"Tempo Stability: {np.std(smoothed_tempos):.1f} BPM std dev")
-        
-        if visualize:
-            self.visualize_enhanced_results(audio, sr, energy, spectral_flux,
-                                            energy_beat_times, downbeat_times,
-                                            smoothed_tempos, tempo_times,
-                                            flux_beat_times)
-        
+        progress.stage("Done", 1.0)
+
+        print(f"\n=== COARSE-TO-FINE RESULTS ===")
+        print(f"Coarse Tempo ({rate:.0f} Hz envelope): {tempo_coarse:.1f} BPM")
+        print(f"Refined Tempo: {tempo_fine:.1f} BPM")
+        print(f"Beats: {len(beat_times)}")
+
         return {
-            'final_tempo': final_tempo,
-            'tempo_energy': tempo_energy,
-            'tempo_flux': tempo_flux,
-            'energy_beats': energy_beat_times,
-            'flux_beats': flux_beat_times,
-            'downbeats': downbeat_times,
-            'weak_beats': weak_beats,
+            'final_tempo': tempo_fine,
+            'tempo_coarse': tempo_coarse,
+            'tempo_energy': tempo_fine,
+            'tempo_flux': 0,
+            'energy_beats': beat_times,
+            'flux_beats': np.array([]),
+            'downbeats': np.array([]),
+            'weak_beats': [],
             'tempo_over_time': smoothed_tempos,
             'tempo_times': tempo_times,
             'audio_length': len(audio)/sr
         }
-    
-    def analyze_audio_file_enhanced_v3(self, file_path, visualize=True):
-        """Version 3 with improved algorithms for all music genres"""
-        print(f"\n=== ENHANCED ANALYSIS V3: {os.path.basename(file_path)} ===")
-        
-        # Load and process audio
-        audio, sr = self.load_audio(file_path)
-        if audio is None:
+
+    def estimate_tempo_sampled(self, file_path, positions=(0.2, 0.5, 0.8), excerpt_seconds=12.0,
+                               tolerance=0.04, min_strength=0.2, min_bpm=60, max_bpm=200):
+        """Tempo from a few seeked excerpts, stopping as soon as two of them agree
+
+        Each excerpt is decoded on its own (librosa.load with offset and
+        duration) and tempo is estimated on its coarse onset envelope.  When
+        no two excerpts agree within `tolerance` (relative), or the
+        autocorrelation is too weak to trust, the whole track is analysed
+        with analyze_audio_file_enhanced instead (confidence is then None).
+        The result reports how much audio was decoded and how long it took.
+        """
+        print(f"\n=== SAMPLED TEMPO: {os.path.basename(file_path)} ===")
+        started = time.perf_counter()
+        try:
+            track_seconds = librosa.get_duration(path=file_path)
+        except Exception as e:
+            print(f"Error reading audio header: {e}")
             return None
-            
-        if sr != self.sample_rate:
-            self.sample_rate = sr
-        
-        audio = self.bandpass_filter(audio)
-        
-        # Compute features
-        energy = self.compute_energy(audio)
-        spectral_flux = self.compute_spectral_flux(audio)
-        time_axis = np.arange(len(energy)) * self.hop_size / sr
-        
-        # Detect beats with dynamic thresholding
-        energy_beats = self.detect_beats_dynamic(energy, 'energy')
-        flux_beats = self.detect_beats_dynamic(spectral_flux, 'flux')
-        
-        energy_beat_times = time_axis[energy_beats]
-        flux_beat_times = time_axis[flux_beats]
-        
-        # Downbeat detection
-        downbeats, weak_beats = self.detect_downbeats_kpop_enhanced(energy_beats, energy, time_axis)
-        downbeat_times = time_axis[downbeats]
-        
-        # Tempo analysis over time
-        energy_tempos, tempo_times = self.analyze_tempo_over_time(energy_beat_times)
-        smoothed_tempos = self.smooth_tempo(energy_tempos) if energy_tempos else []
-        
-        # Use advanced tempo estimation
-        tempo_energy = self.estimate_tempo_advanced(energy_beat_times)
-        tempo_flux = self.estimate_tempo_advanced(flux_beat_times) if len(flux_beat_times) > 1 else 0
-        
-        # Final tempo selection
-        final_tempo = tempo_energy if tempo_energy > 0 else tempo_flux
-        
-        print(f"\n=== ENHANCED RESULTS V3 ===")
-        print(f"Primary Tempo: {final_tempo:.1f} BPM")
-        print(f"Energy Method: {tempo_energy:.1f} BPM")
-        print(f"Flux Method: {tempo_flux:.1f} BPM")
-        print(f"Downbeats Detected: {len(downbeats)}")
-        print(f"Weak Beats: {len(weak_beats)}")
-        
-        if smoothed_tempos:
-            print(f"Tempo Range: {min(smoothed_tempos):.1f}-{max(smoothed_tempos):.1f} BPM")
-            print(f"Tempo Stability: {np.std(smoothed_tempos):.1f} BPM std dev")
-        
-        if visualize:
-            self.visualize_enhanced_results(audio, sr, energy, spectral_flux,
-                                            energy_beat_times, downbeat_times,
-                                            smoothed_tempos, tempo_times,
-                                            flux_beat_times)
-        
+
+        report = {
+            'track_seconds': track_seconds,
+            'audio_length': track_seconds,
+            'excerpts': [],
+            'early_exit': False,
+            'fallback': False
+        }
+
+        def finish(tempo, confidence, decoded_seconds):
+            report.update({
+                'final_tempo': tempo,
+                'confidence': confidence,
+                'decoded_seconds': decoded_seconds,
+                'decode_saved': max(0.0, 1.0 - decoded_seconds / track_seconds) if track_seconds else 0.0,
+                'compute_seconds': time.perf_counter() - started
+            })
+            source = f"confidence {confidence:.2f}" if confidence is not None else "full analysis"
+            print(f"Tempo: {tempo:.1f} BPM ({source}) | decoded "
+                  f"{decoded_seconds:.1f}s of {track_seconds:.1f}s "
+                  f"({100 * report['decode_saved']:.0f}% saved) in {report['compute_seconds']:.2f}s")
+            return report
+
+        # Sampling only pays off when the excerpts cover less than the track
+        if track_seconds > excerpt_seconds * len(positions):
+            decoded = 0.0
+            for position in positions:
+                offset = max(0.0, position * track_seconds - excerpt_seconds / 2)
+                audio, sr = librosa.load(file_path, sr=self.sample_rate, mono=True,
+                                         offset=offset, duration=excerpt_seconds)
+                decoded += len(audio) / sr
+                onset, rate = self._coarse_onset(self.bandpass_filter(audio), sr)
+                period, strength = self._autocorrelation_period(onset, rate, min_bpm, max_bpm)
+                if period is None:
+                    continue
+                tempo = 60.0 * rate / period
+                report['excerpts'].append({'offset': offset, 'tempo': tempo, 'strength': strength})
+                print(f"  Excerpt at {offset:.1f}s: {tempo:.1f} BPM (strength {strength:.2f})")
+
+                # Early exit: this excerpt agrees with an earlier one and both are clear
+                for earlier in report['excerpts'][:-1]:
+                    if abs(earlier['tempo'] - tempo) <= tolerance * tempo and \
+                            min(earlier['strength'], strength) >= min_strength:
+                        report['early_exit'] = len(report['excerpts']) < len(positions)
+                        agreeing = [e['tempo'] for e in report['excerpts']
+                                    if abs(e['tempo'] - tempo) <= tolerance * tempo]
+                        return finish(float(np.mean(agreeing)), len(agreeing) / len(report['excerpts']),
+                                      decoded)
+            print("  Excerpts disagree - falling back to full analysis")
+        else:
+            decoded = 0.0
+
+        # Low confidence (or a short track): analyse everything
+        report['fallback'] = True
+        results = self.analyze_audio_file_enhanced(file_path, visualize=False)
+        if not results:
+            return None
+        return finish(results['final_tempo'], None, decoded + results['audio_length'])
+
+    def _coarse_onset(self, audio, sr, envelope_rate=100):
+        """Log-compressed onset strength from block energies at ~envelope_rate Hz"""
+        hop = int(round(sr / envelope_rate))
+        blocks = audio[:len(audio) // hop * hop].reshape(-1, hop)
+        energy = np.einsum('ij,ij->i', blocks, blocks)
+        onset = np.maximum(np.diff(np.log10(energy + 1e-10), prepend=np.log10(1e-10)), 0)
+        return onset, sr / hop
+
+    def _autocorrelation_period(self, onset, rate, min_bpm, max_bpm):
+        """(beat period in envelope frames, normalized autocorrelation at it), or (None, 0)"""
+        # Light smoothing so a period between two integer lags is not split across them
+        onset = np.convolve(onset, [0.25, 0.5, 0.25], mode='same')
+        onset = onset - onset.mean()
+        n = len(onset)
+        min_lag = int(np.floor(60.0 * rate / max_bpm))
+        max_lag = int(np.ceil(60.0 * rate / min_bpm))
+        if n < 2 * max_lag:
+            return None, 0.0
+        spectrum = np.fft.rfft(onset, 2 * n)
+        ac = np.fft.irfft(spectrum * np.conj(spectrum))[:max_lag + 2]
+        ac /= ac[0] if ac[0] > 0 else 1.0
+
+        lags = np.arange(min_lag, max_lag + 1)
+        # Mild log-normal preference for ~120 BPM resolves octave ambiguity
+        bpms = 60.0 * rate / lags
+        weighted = ac[lags] * np.exp(-0.5 * np.log2(bpms / 120.0) ** 2)
+        best = lags[int(np.argmax(weighted))]
+        # The prior is symmetric in octaves, so prefer the faster level when half
+        # the lag correlates almost as well (every beat present, not every other)
+        half = int(round(best / 2))
+        if half >= min_lag and ac[half] >= 0.8 * ac[best]:
+            best = half + int(np.argmax(ac[half - 1:half + 2])) - 1
+
+        # Parabolic interpolation around the peak
+        y0, y1, y2 = ac[best - 1], ac[best], ac[best + 1]
+        denom = y0 - 2 * y1 + y2
+        shift = 0.5 * (y0 - y2) / denom if denom < 0 else 0.0
+        return best + float(np.clip(shift, -0.5, 0.5)), float(ac[best])
+
+    def _refine_beats(self, audio, sr, first_beat, period, window, frame=256, step=32):
+        """Onset of each beat within +/- window seconds of its predicted time"""
+        squared = np.concatenate(([0.0], np.cumsum(audio.astype(np.float64) ** 2)))
+        half = int(window * sr)
+        beats = []
+        predicted = first_beat
+        while predicted * sr < len(audio) - frame:
+            centre = int(predicted * sr)
+            # Window energies ending every `step` samples around the prediction
+            ends = np.arange(max(frame, centre - half), min(len(audio), centre + half), step)
+            if len(ends) > 2:
+                energy = squared[ends] - squared[ends - frame]
+                rise = np.diff(energy)
+                onset_time = ends[1 + int(np.argmax(rise))] / sr if rise.max() > 0 else predicted
+            else:
+                onset_time = predicted
+            beats.append(onset_time)
+            predicted = onset_time + period
+        return np.array(beats)
+
+    def _features_dict(self, audio, sr, energy, spectral_flux, time_axis):
+        """Intermediate signals kept for plotting (see keep_features)"""
         return {
-            'final_tempo': final_tempo,
-            'tempo_energy': tempo_energy,
-            'tempo_flux': tempo_flux,
-            'energy_beats': energy_beat_times,
-            'flux_beats': flux_beat_times,
-            'downbeats': downbeat_times,
-            'weak_beats': weak_beats,
-            'tempo_over_time': smoothed_tempos,
-            'tempo_times': tempo_times,
-            'audio_length': len(audio)/sr
+            'audio': audio,
+            'sr': sr,
+            'energy': energy,
+            'spectral_flux': spectral_flux,
+            'time_axis': time_axis,
+            'pyramids': {}  # filled on first plot, reused by later ones
         }
-    
+
+    def plot_pyramids(self, audio, sr, energy, spectral_flux, pyramids=None):
+        """Min/max pyramids for the plotted signals, building only the missing ones"""
+        pyramids = {} if pyramids is None else pyramids
+        frame_rate = sr / self.hop_size
+        if 'audio' not in pyramids:
+            pyramids['audio'] = MinMaxPyramid(audio, sr)
+        if 'energy' not in pyramids:
+            pyramids['energy'] = MinMaxPyramid(energy, frame_rate)
+        if 'spectral_flux' not in pyramids:
+            pyramids['spectral_flux'] = MinMaxPyramid(spectral_flux, frame_rate)
+        return pyramids
+
     def visualize_results(self, audio, sr, energy, spectral_flux, 
                          energy_beats, flux_beats, time_axis,
                          energy_beat_times, flux_beat_times):
         """Visualize the analysis results"""
         print("Generating visualization...")
         
+        pyramids = self.plot_pyramids(audio, sr, energy, spectral_flux)
         plt.figure(figsize=(15, 10))
         
         # Plot 1: Original audio
         plt.subplot(4, 1, 1)
-        time_audio = np.arange(len(audio)) / sr
-        plt.plot(time_audio, audio, alpha=0.7)
+        plot_pyramid(plt.gca(), pyramids['audio'], alpha=0.7)
         plt.title('Original Audio Signal')
         plt.xlabel('Time (s)')
         plt.ylabel('Amplitude')
@@ -613,7 +814,7 @@ class BeatDetector:
         
         # Plot 2: Energy with beats
         plt.subplot(4, 1, 2)
-        plt.plot(time_axis, energy, label='Energy Envelope', linewidth=1)
+        plot_pyramid(plt.gca(), pyramids['energy'], label='Energy Envelope', linewidth=1)
         plt.plot(energy_beat_times, energy[energy_beats], 'ro', markersize=4, label='Detected Beats')
         plt.title('Energy-based Beat Detection')
         plt.xlabel('Time (s)')
@@ -623,7 +824,7 @@ class BeatDetector:
         
         # Plot 3: Spectral flux with beats
         plt.subplot(4, 1, 3)
-        plt.plot(time_axis, spectral_flux, label='Spectral Flux', linewidth=1, color='orange')
+        plot_pyramid(plt.gca(), pyramids['spectral_flux'], label='Spectral Flux', linewidth=1, color='orange')
         plt.plot(flux_beat_times, spectral_flux[flux_beats], 'ro', markersize=4, label='Detected Beats')
         plt.title('Spectral Flux-based Beat Detection')
         plt.xlabel('Time (s)')
@@ -648,19 +849,24 @@ class BeatDetector:
     def visualize_enhanced_results(self, audio, sr, energy, spectral_flux,
                                   energy_beat_times, downbeat_times,
                                   tempo_over_time, tempo_times, 
-                                  flux_beat_times=None, fig=None):
-        """Enhanced visualization with improved readability and layout"""
+                                  flux_beat_times=None, fig=None, pyramids=None):
+        """Enhanced visualization with improved readability and layout
+
+        Signals are drawn from min/max pyramids (pass the features'
+        'pyramids' dict to reuse them), so long tracks plot with a bounded
+        number of points and zooming re-queries the visible range.
+        """
         import matplotlib.pyplot as plt
         if fig is None:
             fig = plt.figure(figsize=(16, 14))
+        pyramids = self.plot_pyramids(audio, sr, energy, spectral_flux, pyramids)
         axes = fig.subplots(5, 1, gridspec_kw={'hspace': 0.5})
         fig.suptitle("DSP Beat Detection & Tempo Analysis", fontsize=18, fontweight='bold', color='#1565C0')
 
-        time_axis_audio = np.arange(len(audio)) / sr
         time_axis_features = np.arange(len(energy)) * self.hop_size / sr
 
         # Plot 1: Original audio with all beat types
-        axes[0].plot(time_axis_audio, audio, alpha=0.8, linewidth=1.2, color='#37474F')
+        plot_pyramid(axes[0], pyramids['audio'], alpha=0.8, linewidth=1.2, color='#37474F')
         axes[0].set_title('Audio Signal', fontsize=14, fontweight='bold')
         axes[0].set_xlabel('Time (s)', fontsize=12)
         axes[0].set_ylabel('Amplitude', fontsize=12)
@@ -677,9 +883,11 @@ class BeatDetector:
         axes[0].legend(fontsize=11, loc='upper right')
 
         # Plot 2: Energy envelope with dynamic threshold
-        axes[1].plot(time_axis_features, energy, color='#1976D2', linewidth=1.5, label='Energy')
-        dynamic_thresh = self.dynamic_threshold(energy)
-        axes[1].plot(time_axis_features, dynamic_thresh, 'r--', linewidth=1.2, label='Dynamic Threshold')
+        plot_pyramid(axes[1], pyramids['energy'], color='#1976D2', linewidth=1.5, label='Energy')
+        if 'threshold' not in pyramids:
+            pyramids['threshold'] = MinMaxPyramid(self.dynamic_threshold(energy), sr / self.hop_size)
+        plot_pyramid(axes[1], pyramids['threshold'], linestyle='--', color='r', linewidth=1.2,
+                     label='Dynamic Threshold')
         if len(energy_beat_times) > 0:
             beat_indices = [np.argmin(np.abs(time_axis_features - t)) for t in energy_beat_times]
             beat_energies = [energy[i] for i in beat_indices]
@@ -691,7 +899,7 @@ class BeatDetector:
         axes[1].grid(True, alpha=0.3)
 
         # Plot 3: Spectral flux
-        axes[2].plot(time_axis_features, spectral_flux, color='#FFA000', linewidth=1.5, label='Spectral Flux')
+        plot_pyramid(axes[2], pyramids['spectral_flux'], color='#FFA000', linewidth=1.5, label='Spectral Flux')
         if flux_beat_times is not None and len(flux_beat_times) > 0:
             flux_beat_indices = [np.argmin(np.abs(time_axis_features - t)) for t in flux_beat_times]
             flux_beat_values = [spectral_flux[i] for i in flux_beat_indices]
@@ -752,7 +960,8 @@ class BeatDetector:
         for ax in axes:
             ax.tick_params(axis='both', labelsize=11)
 
-        plt.tight_layout(rect=[0, 0, 1, 0.97])
+        # Lay out this figure (not pyplot's current one) so it can be built off the main thread
+        fig.tight_layout(rect=[0, 0, 1, 0.97])
         # Do NOT call plt.show() here!
         return fig
 
@@ -825,37 +1034,40 @@ class BeatDetector:
         return peaks
     
     def analyze_tempo_over_time(self, beat_times, window_size=8):
-        """Analyze tempo changes over time using sliding windows"""
+        """Analyze tempo changes over time using sliding windows
+
+        Windows shorter than the autocorrelation threshold of estimate_tempo
+        use only its interval branch, so every window is estimated in one
+        vectorized pass (see tempo_batch.estimate_tempo_windows).
+        """
         if len(beat_times) < window_size + 1:
             return [self.estimate_tempo(beat_times)], beat_times[window_size//2:len(beat_times)-window_size//2]
-        
-        tempos = []
-        window_centers = []
-        
-        for i in range(len(beat_times) - window_size):
-            window_beats = beat_times[i:i + window_size]
-            window_tempo = self.estimate_tempo(window_beats)
-            
-            # Only include reasonable tempo values
-            if 60 <= window_tempo <= 200:
-                tempos.append(window_tempo)
-                window_centers.append(beat_times[i + window_size // 2])
-        
-        return tempos, window_centers
+        if window_size > 10:
+            # Long windows may reach the autocorrelation branch: estimate each one in full
+            tempos = np.array([self.estimate_tempo(beat_times[i:i + window_size])
+                               for i in range(len(beat_times) - window_size)])
+        else:
+            tempos = estimate_tempo_windows(beat_times, window_size)
+
+        # Only include reasonable tempo values
+        keep = np.flatnonzero((tempos >= 60) & (tempos <= 200))
+        return tempos[keep].tolist(), np.asarray(beat_times)[keep + window_size // 2].tolist()
 
     def smooth_tempo(self, tempos, window_size=3):
-        """Smooth tempo sequence using moving average"""
+        """Smooth tempo sequence using a running median
+
+        Windows are truncated at both ends rather than padded, so the
+        first and last window_size // 2 points are medians of fewer values.
+        """
         if len(tempos) < window_size:
             return tempos
-        
-        smoothed = []
-        for i in range(len(tempos)):
-            start = max(0, i - window_size // 2)
-            end = min(len(tempos), i + window_size // 2 + 1)
-            window = tempos[start:end]
-            smoothed.append(np.median(window))
-        
-        return smoothed
+
+        half = window_size // 2
+        values = np.asarray(tempos, dtype=np.float64)
+        smoothed = median_filter(values, size=2 * half + 1, mode='nearest')
+        for i in np.r_[0:min(half, len(values)), max(half, len(values) - half):len(values)]:
+            smoothed[i] = np.median(values[max(0, i - half):i + half + 1])
+        return smoothed.tolist()
     
     def detect_downbeats(self, beat_times, energy_signal, time_axis):
         """Identify strong (downbeats) vs weak beats"""
@@ -998,19 +1210,25 @@ class BeatDetector:
         
         return np.array(downbeats), np.array(weak_beats)
     
-def real_time_beat_detection():
-    """Real-time beat detection using microphone input"""
+def real_time_beat_detection(event_bus=None):
+    """Real-time beat detection using microphone input (mono, first channel of the default device)"""
     print("Starting real-time beat detection...")
     print("Press Ctrl+C to stop")
     
     detector = BeatDetector()
+    sample_rate = detector.sample_rate  # the stream below and the beat timestamps share it
     energy_history = []
     beat_count = 0
+    samples_seen = 0
+    if event_bus is None:
+        event_bus = BeatEventBus()
+        start_console_printer(event_bus, formatter=lambda e: f"BEAT #{e.beat_number}! ♪ Energy: {e.energy:.4f}")
     
     def audio_callback(indata, frames, time, status):
-        nonlocal beat_count
+        nonlocal beat_count, samples_seen
         if status:
             print(status)
+        samples_seen += frames
         
         audio = indata[:, 0]  # Use first channel
         energy = np.sum(audio ** 2)
@@ -1025,10 +1243,10 @@ def real_time_beat_detection():
             threshold = np.mean(energy_history) * 2.0
             if energy > threshold and len(energy_history) > 20:
                 beat_count += 1
-                print(f"BEAT #{beat_count}! ♪ Energy: {energy:.4f}")
+                event_bus.publish(BeatEvent(beat_count, samples_seen / sample_rate, energy))
     
     try:
-        with sd.InputStream(callback=audio_callback, channels=1, samplerate=22050, blocksize=1024):
+        with sd.InputStream(callback=audio_callback, channels=1, samplerate=sample_rate, blocksize=1024):
             while True:
                 sd.sleep(100)
     except KeyboardInterrupt:
@@ -1038,6 +1256,10 @@ def main():
     parser = argparse.ArgumentParser(description='Beat Detection and Tempo Estimation')
     parser.add_argument('--file', type=str, help='Audio file to analyze')
     parser.add_argument('--realtime', action='store_true', help='Run real-time beat detection')
+    parser.add_argument('--sampled', action='store_true',
+                        help='Tempo only, from a few excerpts (stops early when they agree)')
+    parser.add_argument('--coarse', action='store_true',
+                        help='Fast coarse-to-fine analysis (tempo at ~100 Hz, beats refined at full rate)')
     
     args = parser.parse_args()
     
@@ -1045,6 +1267,18 @@ def main():
     
     if args.realtime:
         real_time_beat_detection()
+    elif args.file and args.sampled:
+        if os.path.exists(args.file):
+            detector.estimate_tempo_sampled(args.file)
+        else:
+            print(f"File not found: {args.file}")
+    elif args.file and args.coarse:
+        if os.path.exists(args.file):
+            results = detector.analyze_audio_file_coarse_to_fine(args.file)
+            if results:
+                print(f"\nFinal Tempo Estimate: {results['final_tempo']:.1f} BPM")
+        else:
+            print(f"File not found: {args.file}")
     elif args.file:
         if os.path.exists(args.file):
             results = detector.analyze_audio_file(args.file)
@@ -2,12 +2,97 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import numpy as np
 import threading
 import os
+import io
 import time
-from beat_detector import BeatDetector
+import base64
+from collections import OrderedDict
+from beat_detector import BeatDetector, CancellationToken, AnalysisCancelled
+from beat_events import BeatEventBus
+from batch_analysis import BatchRunner, collect_audio_files, AUDIO_EXTENSIONS
+
+
+class VisualizationHistory:
+    """Bounded visualization history
+
+    Every entry keeps a small PNG thumbnail plus what is needed to rebuild
+    its figure (file path, analysis results without the raw features, and
+    the subplot config).  Only the max_live_figures most recently used
+    figures stay in memory; older ones are rebuilt on demand, and the
+    oldest entries are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_live_figures=3, max_entries=200, thumbnail_dpi=20):
+        self.max_live_figures = max_live_figures
+        self.max_entries = max_entries
+        self.thumbnail_dpi = thumbnail_dpi
+        self.entries = []
+        self._live = OrderedDict()  # entry id -> Figure, least recently used first
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, idx):
+        return self.entries[idx]
+
+    def make_thumbnail(self, fig):
+        """Render fig to compressed PNG bytes (safe off the Tk thread)"""
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=self.thumbnail_dpi)
+        return buffer.getvalue()
+
+    def add(self, fig, file_path, results, config, thumbnail=None):
+        """Record a rendered figure; returns (entry, number of oldest entries dropped)"""
+        entry = {
+            'id': self._next_id,
+            'file': os.path.basename(file_path) if file_path else "Unknown",
+            'path': file_path,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': {k: v for k, v in results.items() if k != 'features'},
+            'config': config.copy(),
+            'thumbnail': thumbnail if thumbnail is not None else self.make_thumbnail(fig)
+        }
+        self._next_id += 1
+        self.entries.append(entry)
+        self.remember(entry, fig)
+
+        dropped = max(0, len(self.entries) - self.max_entries)
+        for _ in range(dropped):
+            self.remove(0)
+        return entry, dropped
+
+    def figure(self, idx):
+        """Live figure for an entry, or None if it was evicted and must be rebuilt"""
+        entry_id = self.entries[idx]['id']
+        fig = self._live.get(entry_id)
+        if fig is not None:
+            self._live.move_to_end(entry_id)
+        return fig
+
+    def __contains__(self, entry):
+        """Whether entry is still in the history (not removed, dropped or cleared)"""
+        return any(e['id'] == entry['id'] for e in self.entries)
+
+    def remember(self, entry, fig):
+        """Keep fig live for entry, evicting the least recently used figures"""
+        self._live[entry['id']] = fig
+        self._live.move_to_end(entry['id'])
+        while len(self._live) > self.max_live_figures:
+            self._live.popitem(last=False)
+
+    def remove(self, idx):
+        entry = self.entries.pop(idx)
+        self._live.pop(entry['id'], None)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self._live.clear()
 
 
 class EnhancedBeatDetectorApp:
@@ -47,7 +132,12 @@ class EnhancedBeatDetectorApp:
         self.realtime_running = False
         self.realtime_thread = None
         self.current_visualization_window = None
-        self.visualization_history = []
+        self.visualization_history = VisualizationHistory()
+        self._analysis_token = None
+        self.batch_runner = None
+        self._batch_rows = {}  # path -> summary dict shown in the batch table
+        self._batch_sort = (None, False)
+        self._history_thumbnail = None
 
         # Default subplot configuration
         self.subplot_config = {
@@ -130,9 +220,14 @@ class EnhancedBeatDetectorApp:
         ttk.Button(realtime_frame, text="⏹ Stop Real-time", command=self.stop_realtime).pack(side=tk.LEFT, padx=4)
         ttk.Label(realtime_frame, text="Real-time mode listens to microphone or system audio.", font=('Arial', 8)).pack(fill=tk.X, pady=(6,0))
 
-        # Center: visualization display
-        viz_container = ttk.Frame(center_frame)
-        viz_container.grid(row=0, column=0, sticky='nsew', padx=6, pady=6)
+        # Center: visualization display and batch queue as tabs
+        center_tabs = ttk.Notebook(center_frame)
+        center_tabs.grid(row=0, column=0, sticky='nsew', padx=6, pady=6)
+        viz_container = ttk.Frame(center_tabs)
+        batch_container = ttk.Frame(center_tabs)
+        center_tabs.add(viz_container, text="📊 Visualization")
+        center_tabs.add(batch_container, text="📦 Batch")
+        self._setup_batch_tab(batch_container)
         # Create a title bar for center area for quick actions
         viz_top_bar = ttk.Frame(viz_container)
         viz_top_bar.pack(fill=tk.X, pady=(0,6))
@@ -157,6 +252,10 @@ class EnhancedBeatDetectorApp:
         viz_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.viz_history_list.config(yscrollcommand=viz_scroll.set)
 
+        # thumbnail of the selected history entry
+        self.viz_history_preview = ttk.Label(self._right_panel, anchor='center')
+        self.viz_history_preview.pack(fill=tk.X, padx=6, pady=(0, 6))
+
         # quick actions under history
         quick_frame = ttk.Frame(self._right_panel)
         quick_frame.pack(fill=tk.X, padx=6, pady=(0,6))
@@ -283,6 +382,10 @@ class EnhancedBeatDetectorApp:
         for text, command in analysis_buttons:
             ttk.Button(btn_container, text=text, command=command).pack(side=tk.LEFT, padx=(0, 10))
 
+        self.cancel_btn = ttk.Button(btn_container, text="⛔ Cancel", command=self.cancel_analysis,
+                                     state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+
     def _create_progress_section(self, parent):
         """Create progress display section"""
         self.progress_frame = ttk.LabelFrame(parent, text="📊 Analysis Progress", padding="12")
@@ -296,7 +399,7 @@ class EnhancedBeatDetectorApp:
         )
         self.progress_label.pack(fill=tk.X, anchor=tk.W)
 
-        self.progress = ttk.Progressbar(self.progress_frame, mode='indeterminate')
+        self.progress = ttk.Progressbar(self.progress_frame, mode='determinate', maximum=100)
         self.progress.pack(fill=tk.X, pady=(5, 0))
 
     def _setup_visualization_tab(self):
@@ -338,6 +441,11 @@ class EnhancedBeatDetectorApp:
                 ("All files", "*.*")
             ]
         )
+        if filename:
+            self._select_file(filename)
+
+    def _select_file(self, filename):
+        """Make filename the current analysis file"""
         if filename:
             self.current_file = filename
             file_size = os.path.getsize(filename) / (1024 * 1024)  # MB
@@ -374,54 +482,81 @@ class EnhancedBeatDetectorApp:
         """Run basic beat detection analysis in a separate thread"""
         if not self._check_file_selected():
             return
-
-        def analysis_thread():
-            try:
-                self.progress.start()
-                self.update_progress("Starting basic analysis...")
-
-                self.update_progress("Loading audio file...")
-                self.results = self.detector.analyze_audio_file(self.current_file, visualize=False)
-
-                if self.results:
-                    self.root.after(0, self.display_basic_results)
-                    self.update_progress("Basic analysis completed! ✅")
-                else:
-                    self.update_progress("Analysis failed - no results returned")
-
-            except Exception as e:
-                self._handle_analysis_error(e, "Basic analysis")
-            finally:
-                self.progress.stop()
-
-        threading.Thread(target=analysis_thread, daemon=True).start()
+        self._start_analysis("Basic analysis", self.detector.analyze_audio_file,
+                             self.display_basic_results)
 
     def run_enhanced_analysis(self):
         """Run enhanced beat detection analysis in a separate thread"""
         if not self._check_file_selected():
             return
+        self._start_analysis("Enhanced analysis", self.detector.analyze_audio_file_enhanced,
+                             self.display_enhanced_results)
 
-        def analysis_thread():
-            try:
-                self.progress.start()
-                self.update_progress("Starting enhanced analysis...")
+    def _start_analysis(self, label, analyze, display):
+        """Run analyze() on a worker thread with live progress and a cancellation token
+
+        Only the run owning the current token may touch the GUI, so a
+        cancelled worker that is still unwinding is simply ignored.
+        """
+        if self._analysis_token is not None:
+            self._analysis_token.cancel()  # a new request supersedes the running one
+        token = CancellationToken()
+        self._analysis_token = token
+        file_path = self.current_file
 
-                self.update_progress("Loading audio with enhanced features...")
-                self.results = self.detector.analyze_audio_file_enhanced(self.current_file, visualize=False)
+        self.progress['value'] = 0
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.update_progress(f"Starting {label.lower()}...")
 
-                if self.results:
-                    self.root.after(0, self.display_enhanced_results)
-                    self.update_progress("Enhanced analysis completed! ✅")
-                else:
-                    self.update_progress("Enhanced analysis failed - no results returned")
+        def report(fraction, stage):
+            self.root.after(0, lambda: self._show_analysis_progress(token, fraction, stage))
 
+        def analysis_thread():
+            try:
+                results = analyze(file_path, visualize=False, keep_features=True,
+                                  progress_callback=report, cancel_token=token)
+            except AnalysisCancelled:
+                return
             except Exception as e:
-                self._handle_analysis_error(e, "Enhanced analysis")
-            finally:
-                self.progress.stop()
+                if not token.cancelled:
+                    self.root.after(0, lambda: self._end_analysis(token))
+                    self._handle_analysis_error(e, label)
+                return
+            self.root.after(0, lambda: self._finish_analysis(token, results, label, display))
 
         threading.Thread(target=analysis_thread, daemon=True).start()
 
+    def _show_analysis_progress(self, token, fraction, stage):
+        if token is self._analysis_token:
+            self.progress['value'] = 100 * fraction
+            self.progress_label.config(text=f"{stage}... {100 * fraction:.0f}%")
+
+    def _finish_analysis(self, token, results, label, display):
+        if token is not self._analysis_token:
+            return  # cancelled or superseded while finishing
+        self._end_analysis(token)
+        self.results = results
+        if results:
+            display()
+            self.update_progress(f"{label} completed! ✅")
+        else:
+            self.update_progress(f"{label} failed - no results returned")
+
+    def _end_analysis(self, token):
+        if token is self._analysis_token:
+            self._analysis_token = None
+            self.cancel_btn.config(state=tk.DISABLED)
+
+    def cancel_analysis(self):
+        """Cancel the running analysis; the GUI is free again right away"""
+        token = self._analysis_token
+        if token is None:
+            return
+        token.cancel()
+        self._end_analysis(token)
+        self.progress['value'] = 0
+        self.update_progress("Analysis cancelled ⛔")
+
     def _check_file_selected(self):
         """Check if a file is selected, show error if not"""
         if not self.current_file:
@@ -554,35 +689,67 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
         self.viz_placeholder.pack(fill=tk.BOTH, expand=True)
 
     def generate_visualizations(self):
-        """Generate visualizations with current configuration and embed into central pane"""
+        """Generate visualizations with current configuration and embed into central pane
+
+        The figure is prepared on a worker thread from the features the
+        analysis already computed; only the embedding runs on the Tk thread.
+        """
         if not self.results:
             messagebox.showwarning("Warning", "Please run analysis first!")
             return
 
-        try:
-            # Prepare audio data for visualization
-            audio, sr = self.detector.load_audio(self.current_file)
-            energy = self.detector.compute_energy(audio)
-            spectral_flux = self.detector.compute_spectral_flux(audio)
-
-            # Create figure with custom configuration
-            fig = plt.figure(
-                figsize=(self.subplot_config['figsize_width'],
-                         self.subplot_config['figsize_height']),
-                dpi=100  # Lower DPI for better performance
-            )
+        results = self.results
+        config = self.subplot_config.copy()
+        file_path = self.current_file
+        self._viz_generation = getattr(self, '_viz_generation', 0) + 1
+        generation = self._viz_generation
+        self.update_progress("Preparing visualizations...")
 
-            # Generate enhanced visualization (this returns a matplotlib Figure)
-            fig = self.detector.visualize_enhanced_results(
-                audio, sr, energy, spectral_flux,
-                self.results['energy_beats'],
-                self.results.get('downbeats', []),
-                self.results.get('tempo_over_time', []),
-                self.results.get('tempo_times', []),
-                self.results.get('flux_beats', []),
-                fig=fig
-            )
+        def prepare_figure():
+            try:
+                fig = self._build_results_figure(results, config, file_path)
+                thumbnail = self.visualization_history.make_thumbnail(fig)
+                self.root.after(0, lambda: self._show_generated_figure(fig, generation, file_path,
+                                                                       results, config, thumbnail))
+            except Exception as e:
+                self.root.after(0, lambda: messagebox.showerror("Error", f"Visualization failed: {e}"))
+
+        threading.Thread(target=prepare_figure, daemon=True).start()
+
+    def _build_results_figure(self, results, config, file_path=None):
+        """Build the results figure off the Tk thread (pyplot-free, so thread safe)"""
+        features = results.get('features')
+        if features is None:
+            # Older results or a history entry: recompute what the plot needs
+            audio, sr = self.detector.load_audio(file_path or self.current_file)
+            features = {'audio': audio, 'sr': sr,
+                        'energy': self.detector.compute_energy(audio),
+                        'spectral_flux': self.detector.compute_spectral_flux(audio)}
+
+        # Create figure with custom configuration
+        fig = Figure(
+            figsize=(config['figsize_width'], config['figsize_height']),
+            dpi=100  # Lower DPI for better performance
+        )
 
+        # Generate enhanced visualization (this returns a matplotlib Figure)
+        return self.detector.visualize_enhanced_results(
+            features['audio'], features['sr'], features['energy'], features['spectral_flux'],
+            results['energy_beats'],
+            results.get('downbeats', []),
+            results.get('tempo_over_time', []),
+            results.get('tempo_times', []),
+            results.get('flux_beats', []),
+            fig=fig,
+            pyramids=features.setdefault('pyramids', {})
+        )
+
+    def _show_generated_figure(self, fig, generation, file_path, results, config, thumbnail):
+        """Embed a prepared figure in the central viz canvas (Tk thread)"""
+        if generation != self._viz_generation:
+            return  # A newer request superseded this one
+
+        try:
             # Embed the figure in the central viz canvas container
             for w in self.viz_canvas_container.winfo_children():
                 w.destroy()
@@ -603,7 +770,7 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
             self.current_figures = [fig]
 
             # Add to history
-            self._add_visualization_to_history(fig)
+            self._add_visualization_to_history(fig, file_path, results, config, thumbnail)
 
             # Add a small floating control to open in new window if desired
             open_btn = ttk.Button(self.viz_canvas_container, text="Open in Window", command=lambda: self._create_visualization_window(fig))
@@ -613,20 +780,55 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
         except Exception as e:
             messagebox.showerror("Error", f"Visualization failed: {e}")
 
-    def _add_visualization_to_history(self, fig):
+    def _add_visualization_to_history(self, fig, file_path, results, config, thumbnail=None):
         """Add current visualization to history"""
-        viz_info = {
-            'file': os.path.basename(self.current_file) if self.current_file else "Unknown",
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'figure': fig,
-            'config': self.subplot_config.copy()
-        }
-        self.visualization_history.append(viz_info)
+        viz_info, dropped = self.visualization_history.add(fig, file_path, results, config, thumbnail)
         try:
+            if dropped:
+                self.viz_history_list.delete(0, dropped - 1)
             self.viz_history_list.insert(tk.END, f"{viz_info['file']} ({viz_info['timestamp']})")
         except Exception:
             pass
 
+    def _with_history_figure(self, idx, callback):
+        """Call callback(fig) on the Tk thread, rebuilding an evicted figure in the background"""
+        fig = self.visualization_history.figure(idx)
+        if fig is not None:
+            callback(fig)
+            return
+
+        viz_info = self.visualization_history[idx]
+        self.update_progress(f"Regenerating visualization for {viz_info['file']}...")
+
+        results = viz_info['results']
+        if self.results and viz_info['path'] == self.current_file and 'features' in self.results:
+            results = dict(results, features=self.results['features'])  # same file still loaded
+
+        def rebuild():
+            try:
+                fig = self._build_results_figure(results, viz_info['config'], viz_info['path'])
+            except Exception as e:
+                self.root.after(0, lambda: messagebox.showerror("Error", f"Could not regenerate visualization: {e}"))
+                return
+
+            def deliver():
+                if viz_info not in self.visualization_history:
+                    return  # removed or cleared while rebuilding: drop the figure
+                self.visualization_history.remember(viz_info, fig)
+                self.update_progress("Visualization regenerated ✅")
+                callback(fig)
+            self.root.after(0, deliver)
+
+        threading.Thread(target=rebuild, daemon=True).start()
+
+    def _show_history_thumbnail(self, viz_info):
+        """Show the stored PNG thumbnail under the history list"""
+        try:
+            self._history_thumbnail = tk.PhotoImage(data=base64.b64encode(viz_info['thumbnail']))
+            self.viz_history_preview.configure(image=self._history_thumbnail)
+        except Exception:
+            pass
+
     def _create_visualization_window(self, fig):
         """Create a new window for visualization display (preserves original behavior)"""
         self.current_visualization_window = tk.Toplevel(self.root)
@@ -939,8 +1141,11 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
 
         idx = selection[0]
         viz_info = self.visualization_history[idx]
-        fig = viz_info['figure']
+        self._show_history_thumbnail(viz_info)
+        self._with_history_figure(idx, lambda fig: self._open_history_window(viz_info, fig))
 
+    def _open_history_window(self, viz_info, fig):
+        """Show a history figure in a new window"""
         # Show the figure in a new window
         new_window = tk.Toplevel(self.root)
         new_window.title(f"Visualization - {viz_info['file']}")
@@ -984,6 +1189,9 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
             messagebox.showinfo("Info", "Real-time detection is already running!")
             return
 
+        event_bus = BeatEventBus()
+        subscription = event_bus.subscribe(maxsize=64)
+
         def realtime_thread():
             try:
                 self.realtime_running = True
@@ -993,7 +1201,7 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
                 def should_stop():
                     return not self.realtime_running
 
-                simple_real_time_detection(stop_flag=should_stop)
+                simple_real_time_detection(stop_flag=should_stop, event_bus=event_bus)
 
             except Exception as e:
                 if self.realtime_running:  # Only show error if we didn't stop intentionally
@@ -1003,9 +1211,22 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
                 self.root.after(0, lambda: self.update_progress("Real-time detection stopped"))
 
         # Start the thread
+        self.realtime_running = True
         self.realtime_thread = threading.Thread(target=realtime_thread, daemon=True)
         self.realtime_thread.start()
         self.update_progress("Real-time detection started... Speak or play music!")
+        self._poll_realtime_events(subscription)
+
+    def _poll_realtime_events(self, subscription):
+        """Show the latest beat from the real-time bus (runs on the Tk thread)"""
+        events = subscription.drain()
+        if events:
+            latest = events[-1]
+            self.progress_label.config(text=f"🥁 Beat #{latest.beat_number} at {latest.time:.2f}s ♪")
+        if self.realtime_running:
+            self.root.after(100, lambda: self._poll_realtime_events(subscription))
+        else:
+            subscription.close()
 
     def stop_realtime(self):
         """Stop real-time beat detection"""
@@ -1016,6 +1237,151 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
         self.realtime_running = False
         self.update_progress("Stopping real-time detection...")
 
+    BATCH_COLUMNS = (
+        ('file', "File", 220), ('status', "Status", 80), ('final_tempo', "Tempo (BPM)", 90),
+        ('tempo_energy', "Energy BPM", 90), ('tempo_flux', "Flux BPM", 90),
+        ('total_beats', "Beats", 70), ('downbeats', "Downbeats", 80),
+        ('duration', "Duration (s)", 90), ('beat_density', "Beats/s", 70)
+    )
+
+    def _setup_batch_tab(self, parent):
+        """Batch queue: folders/files analyzed by worker processes into a sortable table"""
+        controls = ttk.Frame(parent)
+        controls.pack(fill=tk.X, pady=(0, 6))
+        ttk.Button(controls, text="📁 Add Folder", command=self.batch_add_folder).pack(side=tk.LEFT, padx=4)
+        ttk.Button(controls, text="🎵 Add Files", command=self.batch_add_files).pack(side=tk.LEFT, padx=4)
+        ttk.Button(controls, text="▶ Start", command=self.start_batch).pack(side=tk.LEFT, padx=4)
+        ttk.Button(controls, text="⛔ Cancel", command=self.cancel_batch).pack(side=tk.LEFT, padx=4)
+        ttk.Button(controls, text="🧹 Clear", command=self.clear_batch).pack(side=tk.LEFT, padx=4)
+        ttk.Label(controls, text="Workers:").pack(side=tk.LEFT, padx=(12, 2))
+        self.batch_workers = tk.IntVar(value=max(1, (os.cpu_count() or 2) - 1))
+        ttk.Spinbox(controls, from_=1, to=max(1, os.cpu_count() or 1), width=4,
+                    textvariable=self.batch_workers).pack(side=tk.LEFT)
+        self.batch_status = ttk.Label(controls, text="Queue is empty")
+        self.batch_status.pack(side=tk.RIGHT, padx=6)
+
+        table_frame = ttk.Frame(parent)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        columns = [key for key, _, _ in self.BATCH_COLUMNS]
+        self.batch_tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        for key, title, width in self.BATCH_COLUMNS:
+            self.batch_tree.heading(key, text=title, command=lambda k=key: self.sort_batch(k))
+            self.batch_tree.column(key, width=width, anchor='w' if key == 'file' else 'e')
+        scroll = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.batch_tree.yview)
+        self.batch_tree.configure(yscrollcommand=scroll.set)
+        self.batch_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        # Double-click loads a file into the single-file analysis controls
+        self.batch_tree.bind('<Double-1>', lambda e: self._select_file(self.batch_tree.focus()))
+
+    def batch_add_folder(self):
+        folder = filedialog.askdirectory(title="Select Folder to Analyze")
+        if folder:
+            self._queue_batch_files(collect_audio_files([folder]))
+
+    def batch_add_files(self):
+        patterns = " ".join(f"*{ext}" for ext in AUDIO_EXTENSIONS)
+        files = filedialog.askopenfilenames(title="Select Audio Files",
+                                            filetypes=[("Audio files", patterns), ("All files", "*.*")])
+        if files:
+            self._queue_batch_files(collect_audio_files(files))
+
+    def _queue_batch_files(self, paths):
+        """Add rows for new files (iid is the file path, so duplicates are skipped)"""
+        added = 0
+        for path in paths:
+            if path in self._batch_rows:
+                continue
+            self._batch_rows[path] = {'path': path, 'file': os.path.basename(path), 'status': 'queued'}
+            self.batch_tree.insert('', tk.END, iid=path, values=self._batch_values(self._batch_rows[path]))
+            added += 1
+        self._update_batch_status()
+        self.update_progress(f"Queued {added} file(s) for batch analysis")
+
+    def _batch_values(self, row):
+        values = []
+        for key, _, _ in self.BATCH_COLUMNS:
+            value = row.get(key, '')
+            values.append(f"{value:.2f}" if isinstance(value, float) else value)
+        return values
+
+    def start_batch(self):
+        """Submit every queued row to the worker pool"""
+        queued = [path for path, row in self._batch_rows.items() if row['status'] in ('queued', 'cancelled')]
+        if not queued:
+            messagebox.showinfo("Info", "No queued files. Add a folder or files first.")
+            return
+        workers = self.batch_workers.get()
+        if self.batch_runner is not None and not self.batch_runner.unreported \
+                and self.batch_runner.max_workers != workers:
+            self.batch_runner.shutdown()  # idle pool with the old worker count
+            self.batch_runner = None
+        if self.batch_runner is None:
+            self.batch_runner = BatchRunner(max_workers=workers)
+        for path in queued:
+            self._batch_rows[path]['status'] = 'running'
+            self.batch_tree.set(path, 'status', 'running')
+        self.batch_runner.submit(queued)
+        self._update_batch_status()
+        self._poll_batch()
+
+    def _poll_batch(self):
+        """Move finished summaries from the runner's queue into the table (Tk thread)"""
+        if self.batch_runner is None:
+            return
+        for summary in self.batch_runner.drain():
+            path = summary['path']
+            if path not in self._batch_rows:
+                continue  # cleared while running
+            self._batch_rows[path] = summary
+            self.batch_tree.item(path, values=self._batch_values(summary))
+        self._update_batch_status()
+        if self.batch_runner.unreported:  # not pending: done futures may not have queued yet
+            self.root.after(200, self._poll_batch)
+
+    def _update_batch_status(self):
+        counts = {}
+        for row in self._batch_rows.values():
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        text = f"{counts.get('done', 0)}/{len(self._batch_rows)} done"
+        for status in ('running', 'error', 'cancelled'):
+            if counts.get(status):
+                text += f" | {counts[status]} {status}"
+        self.batch_status.config(text=text)
+
+    def sort_batch(self, column):
+        """Sort the table by a column; clicking the same heading again reverses it"""
+        previous, reverse = self._batch_sort
+        reverse = not reverse if previous == column else False
+        self._batch_sort = (column, reverse)
+
+        def key(path):
+            value = self._batch_rows[path].get(column)
+            # Numbers before missing values; strings compared case-insensitively
+            if isinstance(value, str):
+                return (0, value.lower())
+            return (0, value) if value is not None else (1, 0)
+
+        for index, path in enumerate(sorted(self._batch_rows, key=key, reverse=reverse)):
+            self.batch_tree.move(path, '', index)
+
+    def cancel_batch(self):
+        if self.batch_runner is not None:
+            self.batch_runner.cancel()
+            self.update_progress("Batch cancelled - running files will finish, queued ones were dropped")
+
+    def clear_batch(self):
+        if self.batch_runner is not None and self.batch_runner.pending:
+            if not messagebox.askyesno("Confirm", "Batch is still running. Cancel it and clear the table?"):
+                return
+        if self.batch_runner is not None:
+            self.batch_runner.shutdown()
+            self.batch_runner = None
+        self.batch_tree.delete(*self.batch_tree.get_children())
+        self._batch_rows.clear()
+        self._update_batch_status()
+
+
     def update_progress(self, message):
         """Update progress label in a thread-safe manner"""
         def update():
@@ -1104,8 +1470,7 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
             return
         idx = sel[0]
         try:
-            fig = self.visualization_history[idx]['figure']
-            self._save_current_plot(fig)
+            self._with_history_figure(idx, self._save_current_plot)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save selected visualization: {e}")
 
@@ -1116,13 +1481,15 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
             return
         idx = sel[0]
         self.viz_history_list.delete(idx)
-        del self.visualization_history[idx]
+        self.visualization_history.remove(idx)
+        self.viz_history_preview.configure(image='')
         self.update_progress("Removed selected visualization from history.")
 
     def _clear_visualization_history(self):
         if messagebox.askyesno("Confirm", "Clear the entire visualization history?"):
             self.viz_history_list.delete(0, tk.END)
             self.visualization_history.clear()
+            self.viz_history_preview.configure(image='')
             self.update_progress("Visualization history cleared.")
 
     def on_closing(self):
@@ -1132,6 +1499,10 @@ with {'clear' if len(self.results.get('downbeats', [])) > len(self.results['ener
             self.realtime_running = False
             print("Stopping real-time detection...")
 
+        # Stop batch workers
+        if self.batch_runner is not None:
+            self.batch_runner.shutdown()
+
         # Close any open matplotlib figures
         plt.close('all')
 
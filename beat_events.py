@@ -0,0 +1,164 @@
+# beat_events.py
+import queue
+import threading
+import time
+
+
+class BeatEvent:
+    """A single detected beat, published from inside an audio callback"""
+
+    __slots__ = ('beat_number', 'time', 'energy', 'tempo', 'source', 'channel')
+
+    def __init__(self, beat_number, time, energy, tempo=0.0, source='realtime', channel=0):
+        self.beat_number = beat_number
+        self.time = time
+        self.energy = energy
+        self.tempo = tempo
+        self.source = source
+        self.channel = channel
+
+    def to_dict(self):
+        return {
+            'beat_number': self.beat_number,
+            'time': self.time,
+            'energy': self.energy,
+            'tempo': self.tempo,
+            'source': self.source,
+            'channel': self.channel
+        }
+
+    def __repr__(self):
+        return (f"BeatEvent(#{self.beat_number} at {self.time:.2f}s, "
+                f"energy={self.energy:.4f}, tempo={self.tempo:.1f})")
+
+
+class BeatSubscription:
+    """Bounded queue owned by one consumer of a BeatEventBus"""
+
+    def __init__(self, bus, maxsize):
+        self._bus = bus
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, event):
+        """Enqueue without blocking; drop the event if the consumer is behind"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def get(self, timeout=None):
+        """Wait for the next event, returns None on timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self, max_events=None):
+        """Return every event that is queued right now (never blocks)"""
+        events = []
+        while max_events is None or len(events) < max_events:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class BeatEventBus:
+    """Publish/subscribe hub for beat events
+
+    publish() is safe to call from an audio callback: it never blocks, never
+    does I/O and never allocates more than the event itself.  Each subscriber
+    gets its own bounded queue, so a slow consumer only loses its own events.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._subscribers = ()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, maxsize=None):
+        """Register a new consumer and return its BeatSubscription"""
+        subscription = BeatSubscription(self, maxsize or self.maxsize)
+        with self._lock:
+            # Copy-on-write so publish() can iterate without taking the lock
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, event):
+        """Hand an event to every subscriber without blocking"""
+        self.published += 1
+        for subscription in self._subscribers:
+            subscription.offer(event)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+def format_beat_event(event):
+    """Default console line for a beat event"""
+    line = f"BEAT #{event.beat_number} at {event.time:.2f}s"
+    if event.tempo > 0:
+        line += f" | Tempo: {event.tempo:.1f} BPM"
+    return line + f" | Energy: {event.energy:.4f} ♪"
+
+
+def start_consumer(bus, handler, stop_event=None, poll_interval=0.1, maxsize=None):
+    """Run handler(event) for every event on a daemon thread outside the audio callback
+
+    Returns (thread, subscription).  The consumer stops when stop_event is set.
+    """
+    subscription = bus.subscribe(maxsize)
+    stop_event = stop_event or threading.Event()
+
+    def consume():
+        try:
+            while not stop_event.is_set():
+                event = subscription.get(timeout=poll_interval)
+                if event is not None:
+                    handler(event)
+            # Flush whatever arrived before the stop request
+            for event in subscription.drain():
+                handler(event)
+        finally:
+            subscription.close()
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    return thread, subscription
+
+
+def start_console_printer(bus, stop_event=None, formatter=format_beat_event):
+    """Print beat events to the console from a background thread"""
+    return start_consumer(bus, lambda event: print(formatter(event)), stop_event)
+
+
+def start_file_logger(bus, file_path, stop_event=None):
+    """Append beat events as CSV lines (wall clock, channel, beat, time, tempo, energy)"""
+    log_file = open(file_path, 'a', buffering=1)
+
+    def write(event):
+        log_file.write(f"{time.time():.3f},{event.channel},{event.beat_number},{event.time:.4f},"
+                       f"{event.tempo:.2f},{event.energy:.6f}\n")
+
+    stop_event = stop_event or threading.Event()
+    thread, subscription = start_consumer(bus, write, stop_event)
+
+    def close_when_done():
+        thread.join()
+        log_file.close()
+
+    threading.Thread(target=close_when_done, daemon=True).start()
+    return thread, subscription
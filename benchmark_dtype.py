@@ -0,0 +1,91 @@
+# benchmark_dtype.py - float32 vs float64 pipeline: output regression and peak memory
+import argparse
+import contextlib
+import glob
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import numpy as np
+
+METHODS = ('analyze_audio_file', 'analyze_audio_file_enhanced', 'analyze_audio_file_enhanced_v3')
+
+
+def compare_outputs(files):
+    """Run every analysis in both precisions and report any difference in tempo or beats"""
+    from beat_detector import BeatDetector
+    mismatches = 0
+    print(f"{'file':<22} | {'method':<30} | {'tempo f64':>9} | {'tempo f32':>9} | beats")
+    for path in files:
+        for method in METHODS:
+            outputs = {}
+            for dtype in ('float64', 'float32'):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    outputs[dtype] = getattr(BeatDetector(dtype=dtype), method)(path, visualize=False)
+            r64, r32 = outputs['float64'], outputs['float32']
+            tempo64 = r64.get('final_tempo', r64['tempo_energy'])
+            tempo32 = r32.get('final_tempo', r32['tempo_energy'])
+            same_beats = np.array_equal(r64['energy_beats'], r32['energy_beats']) and \
+                np.array_equal(r64['flux_beats'], r32['flux_beats'])
+            same = same_beats and tempo64 == tempo32
+            mismatches += not same
+            print(f"{os.path.basename(path)[:22]:<22} | {method:<30} | {tempo64:>9.2f} | {tempo32:>9.2f} | "
+                  f"{'identical' if same_beats else 'DIFFERENT'}")
+    return mismatches
+
+
+def peak_rss_child(path, dtype):
+    """Child process: analyse once and print peak RSS and peak traced allocations (MB)"""
+    import beat_detector
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        beat_detector.BeatDetector(dtype=dtype).analyze_audio_file_enhanced(path, visualize=False)
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{rss_peak / 1024:.1f} {traced_peak / 2**20:.1f}")
+
+
+def make_long_track(directory, minutes):
+    from demo_signal import create_demo_beat_signal
+    path = os.path.join(directory, f"long_{minutes}min_120bpm.wav")
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_demo_beat_signal(path, tempo=120, duration=60 * minutes)
+    return path
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Compare the float32 and float64 analysis pipelines')
+    parser.add_argument('files', nargs='*', help='Files for the regression check (default: demo files)')
+    parser.add_argument('--minutes', type=int, default=10, help='Length of the memory benchmark track')
+    parser.add_argument('--child', nargs=2, metavar=('PATH', 'DTYPE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        peak_rss_child(*args.child)
+        return
+
+    files = args.files or sorted(glob.glob(os.path.join(here, 'demo_*bpm.wav')))
+    print("🔁 Regression: float32 vs float64 outputs")
+    mismatches = compare_outputs(files)
+    print(f"{'✅ all outputs identical' if not mismatches else f'⚠️  {mismatches} differing analyses'}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        track = make_long_track(directory, args.minutes)
+        print(f"🧠 Peak memory for analyze_audio_file_enhanced on a {args.minutes}-minute track")
+        for dtype in ('float64', 'float32'):
+            # Fresh interpreter per run: ru_maxrss only ever grows within a process
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', track, dtype],
+                                    capture_output=True, text=True, check=True).stdout.split()
+            rss, traced = float(output[-2]), float(output[-1])
+            # numpy buffers are visible to tracemalloc; RSS also includes library imports
+            print(f"  {dtype}: array peak {traced:.0f} MB | process peak RSS {rss:.0f} MB")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmark_library_index.py - Build, refresh and diff times of the SQLite library index
+import argparse
+import os
+import random
+import tempfile
+import time
+import numpy as np
+import soundfile as sf
+from library_index import LibraryIndex, GENRE_LABELS
+
+
+def make_library(root, files, seed=0):
+    """files tiny WAVs spread over genre/artist/album folders (copies of one encoded file)"""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    template = os.path.join(root, 'template.wav')
+    sf.write(template, np.zeros(2205, dtype=np.float32), 22050)
+    with open(template, 'rb') as f:
+        data = f.read()
+    os.remove(template)
+    paths = []
+    for i in range(files):
+        folder = os.path.join(root, rng.choice(list(GENRE_LABELS)), f"artist_{rng.randrange(200)}",
+                              f"album_{rng.randrange(5)}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"track_{i}.wav")
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def timed(label, function):
+    started = time.perf_counter()
+    value = function()
+    print(f"  {label:<38} {time.perf_counter() - started:>7.2f} s")
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the library scanner and SQLite index')
+    parser.add_argument('--files', type=int, default=100000, help='Number of files in the synthetic library')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = os.path.join(directory, 'music')
+        print(f"🎼 Creating {args.files} files...")
+        paths = make_library(root, args.files)
+        with LibraryIndex(os.path.join(directory, 'index.sqlite')) as index:
+            print(f"\n📚 {args.files} files")
+            diff = timed("first index (scan + headers)", lambda: index.refresh(root))
+            assert len(diff['added']) == args.files
+            diff = timed("refresh, nothing changed", lambda: index.refresh(root))
+            assert not any(diff.values())
+
+            rng = random.Random(1)
+            changed, removed = rng.sample(paths, 2 * (args.files // 100))[::2], paths[1::100]
+            for path in changed:
+                os.utime(path, ns=(0, 0))
+            for path in removed:
+                if path not in changed:
+                    os.remove(path)
+            diff = timed("refresh after 1% touched, 1% deleted", lambda: index.refresh(root))
+            print(f"     → +{len(diff['added'])} -{len(diff['removed'])} ~{len(diff['changed'])}")
+            genres = timed("files per genre", lambda: {g: index.files(root, g) for g in index.genres(root)})
+            print(f"     → {sum(len(files) for files in genres.values())} files in {len(genres)} genres")
+
+
+if __name__ == "__main__":
+    main()
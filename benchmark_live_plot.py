@@ -0,0 +1,76 @@
+# benchmark_live_plot.py - Redraw cost of the live plot: full redraw vs. blitting
+import argparse
+import time
+import matplotlib
+matplotlib.use('Agg')  # Offscreen, so only the plotting work is measured
+import matplotlib.pyplot as plt
+import numpy as np
+from real_time_detector import RealTimeBeatDetector
+
+
+def feed_blocks(detector, count, rng):
+    """Push synthetic audio blocks (noise with a kick every ~0.5s) through the callback"""
+    for _ in range(count):
+        block = rng.normal(0, 0.05, (detector.block_size, 1))
+        if rng.random() < 0.1:
+            block *= 6
+        detector.audio_callback(block, detector.block_size, None, None)
+
+
+def run_mode(blit, frames, target_fps):
+    rng = np.random.default_rng(0)
+    detector = RealTimeBeatDetector(blit=blit)
+    detector.is_running = True
+    detector.start_time = time.time()
+    canvas = detector.fig.canvas
+    lines = (detector.energy_line, detector.threshold_line, detector.beat_line)
+
+    # Fill the ring buffer once, so both modes draw the same amount of data
+    feed_blocks(detector, detector.history_size, rng)
+    canvas.draw()
+    backgrounds = [canvas.copy_from_bbox(ax.bbox) for ax in (detector.ax1, detector.ax2)]
+    blocks_per_frame = max(1, round(detector.sample_rate / detector.block_size / target_fps))
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for frame in range(frames):
+        feed_blocks(detector, blocks_per_frame, rng)
+        ylim = detector._energy_ylim
+        detector.update_plot(frame)
+        if blit:
+            if detector._energy_ylim != ylim:
+                backgrounds = [canvas.copy_from_bbox(ax.bbox) for ax in (detector.ax1, detector.ax2)]
+            for background in backgrounds:
+                canvas.restore_region(background)
+            for line in lines:
+                line.axes.draw_artist(line)
+            canvas.blit(detector.fig.bbox)
+        else:
+            canvas.draw()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    plt.close(detector.fig)
+
+    ms_per_frame = 1000 * wall / frames
+    return {
+        'max_fps': frames / wall,
+        'ms_per_frame': ms_per_frame,
+        'cpu_percent_at_target': 100 * (cpu / frames) * target_fps
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark live plot redraw cost')
+    parser.add_argument('--frames', type=int, default=200, help='Frames to render per mode')
+    parser.add_argument('--fps', type=float, default=20, help='Target animation rate (50ms interval = 20)')
+    args = parser.parse_args()
+
+    print(f"🎨 Live plot benchmark: {args.frames} frames, target {args.fps:.0f} fps")
+    for name, blit in (('Full redraw', False), ('Blitted', True)):
+        stats = run_mode(blit, args.frames, args.fps)
+        print(f"   {name:12s} | max {stats['max_fps']:7.1f} fps | {stats['ms_per_frame']:6.2f} ms/frame | "
+              f"CPU at {args.fps:.0f} fps: {stats['cpu_percent_at_target']:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmark_multichannel.py - Per-block cost of live tracking vs. channel count
+import argparse
+import time
+import numpy as np
+from enhanced_realtime import StreamingBeatTracker
+
+
+def make_blocks(count, block_size, channels, sample_rate, rng):
+    """Noise with a decaying kick every 0.5s on every channel (shifted per channel)"""
+    blocks = rng.normal(0, 0.02, (count, block_size, channels)).astype(np.float32)
+    beat_every = int(0.5 * sample_rate / block_size)
+    for channel in range(channels):
+        blocks[channel % beat_every::beat_every, :, channel] *= 20
+    return blocks
+
+
+def time_vectorized(blocks, sample_rate):
+    tracker = StreamingBeatTracker(sample_rate, channels=blocks.shape[2])
+    started = time.perf_counter()
+    for block in blocks:
+        tracker.process_block(block)
+    return time.perf_counter() - started, tracker
+
+
+def time_independent(blocks, sample_rate):
+    trackers = [StreamingBeatTracker(sample_rate, channels=1) for _ in range(blocks.shape[2])]
+    started = time.perf_counter()
+    for block in blocks:
+        for channel, tracker in enumerate(trackers):
+            tracker.process_block(block[:, channel])
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark multi-channel live beat tracking')
+    parser.add_argument('--blocks', type=int, default=400, help='Blocks per run (~18s of audio)')
+    parser.add_argument('--block-size', type=int, default=1024)
+    parser.add_argument('--sample-rate', type=int, default=22050)
+    parser.add_argument('--channels', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    budget_us = 1e6 * args.block_size / args.sample_rate
+    print(f"🎚  Multi-channel scaling: {args.blocks} blocks of {args.block_size} samples "
+          f"(real-time budget {budget_us/1000:.1f} ms/block)")
+    print(f"{'channels':>9} | {'vectorized µs/block':>20} | {'independent µs/block':>21} | "
+          f"{'speedup':>7} | {'budget used':>11} | beats/ch")
+
+    for channels in args.channels:
+        blocks = make_blocks(args.blocks, args.block_size, channels, args.sample_rate, rng)
+        vec_seconds, tracker = time_vectorized(blocks, args.sample_rate)
+        ind_seconds = time_independent(blocks, args.sample_rate)
+        vec_us = 1e6 * vec_seconds / args.blocks
+        ind_us = 1e6 * ind_seconds / args.blocks
+        print(f"{channels:>9} | {vec_us:>20.1f} | {ind_us:>21.1f} | {ind_us / vec_us:>6.1f}x | "
+              f"{100 * vec_us / budget_us:>10.2f}% | {tracker.beat_counts.mean():.1f}")
+
+
+if __name__ == "__main__":
+    main()
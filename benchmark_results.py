@@ -0,0 +1,118 @@
+# benchmark_results.py - Memory and cache read/write cost of result dicts vs AnalysisResult
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+import numpy as np
+from analysis_result import AnalysisResult
+
+
+def deep_size(value):
+    """Approximate bytes held by a result dict (containers, arrays and list items)"""
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) if value.base is None else sys.getsizeof(value) + value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(deep_size(k) + deep_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(deep_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def result_size(result):
+    return sys.getsizeof(result) + sum(deep_size(getattr(result, name)) for name in AnalysisResult.__slots__)
+
+
+def synthetic_results(minutes, tempo=128.0):
+    """A legacy enhanced-analysis dict for a long mix (beat grid with jitter)"""
+    rng = np.random.default_rng(0)
+    beats = np.cumsum(rng.normal(60.0 / tempo, 0.005, int(minutes * tempo)))
+    frames = np.round(beats * 22050 / 512).astype(np.int64)
+    curve = [float(t) for t in rng.normal(tempo, 1.0, len(beats) - 8)]
+    return {
+        'final_tempo': tempo, 'tempo_energy': tempo, 'tempo_flux': tempo,
+        'energy_beats': beats, 'flux_beats': beats.copy(),
+        'downbeats': beats[::4], 'weak_beats': np.delete(frames, np.s_[::4]),
+        'tempo_over_time': curve, 'tempo_times': [float(t) for t in beats[4:4 + len(curve)]],
+        'audio_length': float(beats[-1] + 1.0)
+    }, rng.random(len(beats)).astype(np.float32)
+
+
+def timed(function, repeats=5):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        value = function()
+        best = min(best, time.perf_counter() - started)
+    return value, best
+
+
+def compare(name, results, strengths, directory):
+    result = AnalysisResult.from_results(results, strengths, file_path=name, preset='enhanced')
+    paths = {kind: os.path.join(directory, f"{name}.{kind}") for kind in ('pkl', 'json', 'npz')}
+    legacy_json = {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in results.items()}
+
+    def write_pickle():
+        with open(paths['pkl'], 'wb') as f:
+            pickle.dump(results, f)
+
+    def read_pickle():
+        with open(paths['pkl'], 'rb') as f:
+            return pickle.load(f)
+
+    def write_json():
+        with open(paths['json'], 'w') as f:
+            f.write(result.to_json())
+
+    def read_json():
+        with open(paths['json']) as f:
+            return AnalysisResult.from_json(f.read())
+
+    rows = [
+        ('dict + pickle', deep_size(results), write_pickle, read_pickle, paths['pkl']),
+        ('AnalysisResult + JSON', result_size(result), write_json, read_json, paths['json']),
+        ('AnalysisResult + npz', result_size(result), lambda: result.save_npz(paths['npz']),
+         lambda: AnalysisResult.load_npz(paths['npz']), paths['npz']),
+    ]
+    print(f"\n📦 {name}: {len(result.beats)} beats, {len(result.tempo_curve)} tempo-curve points "
+          f"(legacy dict as JSON: {len(json.dumps(legacy_json)) / 1024:.0f} KB)")
+    for label, memory, write, read, path in rows:
+        _, write_seconds = timed(write)
+        _, read_seconds = timed(read)
+        print(f"  {label:<22} memory {memory / 1024:>7.1f} KB | file {os.path.getsize(path) / 1024:>7.1f} KB | "
+              f"write {1000 * write_seconds:>6.2f} ms | read {1000 * read_seconds:>6.2f} ms")
+
+    restored = AnalysisResult.load_npz(paths['npz'])
+    lossless = all(np.array_equal(getattr(restored, key), getattr(result, key), equal_nan=True)
+                   if isinstance(getattr(result, key), np.ndarray) else getattr(restored, key) == getattr(result, key)
+                   for key in AnalysisResult.__slots__ if key not in ('beats', 'tempo_curve')) and \
+        restored.beats.tobytes() == result.beats.tobytes() == read_json().beats.tobytes() and \
+        restored.tempo_curve.tobytes() == result.tempo_curve.tobytes()
+    print(f"  {'✅ npz and JSON round-trips are exact' if lossless else '⚠️  round-trip mismatch'}")
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Compare result dicts with AnalysisResult')
+    parser.add_argument('--minutes', type=float, default=60, help='Length of the synthetic long mix')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        demo = os.path.join(here, 'demo_120bpm.wav')
+        if os.path.exists(demo):
+            from beat_detector import BeatDetector
+            detector = BeatDetector()
+            with contextlib.redirect_stdout(io.StringIO()):
+                pipeline = detector.analysis_pipeline(demo, 'enhanced')
+                results = pipeline.run()
+                strengths = pipeline.run(['beat_strengths'])['beat_strengths']
+            compare('demo_120bpm', results, strengths, directory)
+        compare(f"{args.minutes:g}min_mix", *synthetic_results(args.minutes), directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# benchmark_tempo.py - Accuracy and speed of the file analysis paths on a labelled corpus
+import argparse
+import contextlib
+import glob
+import io
+import os
+import re
+import time
+import numpy as np
+from beat_detector import BeatDetector
+
+METHODS = {
+    'enhanced': lambda detector, path: detector.analyze_audio_file_enhanced(path, visualize=False),
+    'v3': lambda detector, path: detector.analyze_audio_file_enhanced_v3(path, visualize=False),
+    'coarse': lambda detector, path: detector.analyze_audio_file_coarse_to_fine(path),
+    'sampled': lambda detector, path: detector.estimate_tempo_sampled(path),
+}
+
+ESTIMATORS = ('estimate_tempo', 'estimate_tempo_improved', 'estimate_tempo_advanced', 'estimate_tempo_comb')
+
+
+def expected_tempo(path):
+    """Tempo label from the file name (e.g. demo_120bpm.wav, 'song 96 bpm.mp3')"""
+    match = re.search(r'(\d+(?:\.\d+)?)\s*bpm', os.path.basename(path), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def demo_beat_grid(tempo, duration):
+    """Beat onsets of a file made by demo_signal.create_demo_beat_signal"""
+    interval = 60.0 / tempo
+    return np.arange(int(duration / interval)) * interval
+
+
+def beat_f_measure(detected, reference, tolerance=0.07):
+    """F-measure of detected beats against reference onsets (one match per beat)"""
+    if len(detected) == 0 or len(reference) == 0:
+        return 0.0
+    unmatched = list(reference)
+    hits = 0
+    for t in detected:
+        distances = np.abs(np.array(unmatched) - t) if unmatched else np.array([np.inf])
+        if distances.min() <= tolerance:
+            unmatched.pop(int(np.argmin(distances)))
+            hits += 1
+    precision = hits / len(detected)
+    recall = hits / len(reference)
+    return 2 * precision * recall / (precision + recall) if hits else 0.0
+
+
+def synthesize_corpus(directory, tempos, duration):
+    from demo_signal import create_demo_beat_signal
+    os.makedirs(directory, exist_ok=True)
+    np.random.seed(0)
+    paths = []
+    for tempo in tempos:
+        path = os.path.join(directory, f"demo_{tempo}bpm.wav")
+        if not os.path.exists(path):
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_demo_beat_signal(path, tempo=tempo, duration=duration)
+        paths.append(path)
+    return paths
+
+
+def run_method(method, path):
+    detector = BeatDetector()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = METHODS[method](detector, path)
+    return results, time.perf_counter() - started
+
+
+def run_estimator(detector, name, features):
+    """Tempo from the filtered audio features, including the estimator's own input stage
+
+    The interval estimators need detected beats; the comb estimator only
+    needs the onset envelope.
+    """
+    if name == 'estimate_tempo_comb':
+        onset, rate = detector._coarse_onset(features['audio'], features['sr'])
+        return detector.estimate_tempo_comb(onset, rate)['tempo']
+    beats = detector.detect_beats_dynamic(features['energy'], 'energy')
+    return getattr(detector, name)(features['time_axis'][beats])
+
+
+def compare_estimators(files, repeats=5):
+    """Accuracy and best-of-`repeats` time of the tempo estimators on shared features"""
+    detector = BeatDetector()
+    print(f"⏱  Tempo estimators: {len(files)} files, tolerance ±4%, best of {repeats} runs")
+    print(f"{'file':<22} | {'expected':>8} | " +
+          " | ".join(f"{name.replace('estimate_tempo', 'tempo'):>13} {'ms':>5}" for name in ESTIMATORS))
+    totals = {name: {'seconds': 0.0, 'tempo_ok': 0, 'error': []} for name in ESTIMATORS}
+    for path in files:
+        expected = expected_tempo(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            features = detector.analyze_audio_file_enhanced(path, visualize=False,
+                                                            keep_features=True)['features']
+        cells = []
+        for name in ESTIMATORS:
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    tempo = run_estimator(detector, name, features)
+                timings.append(time.perf_counter() - started)
+            totals[name]['seconds'] += min(timings)
+            if expected:
+                totals[name]['error'].append(abs(tempo - expected))
+                totals[name]['tempo_ok'] += abs(tempo - expected) <= 0.04 * expected
+            cells.append(f"{tempo:>13.1f} {1000 * min(timings):>5.1f}")
+        print(f"{os.path.basename(path)[:22]:<22} | {expected or float('nan'):>8.1f} | " + " | ".join(cells))
+
+    labelled = sum(1 for path in files if expected_tempo(path))
+    print("\nSummary:")
+    for name in ESTIMATORS:
+        t = totals[name]
+        mean_error = np.mean(t['error']) if t['error'] else float('nan')
+        print(f"  {name:<24} tempo within 4%: {t['tempo_ok']}/{labelled} | "
+              f"mean error {mean_error:.2f} BPM | total {1000 * t['seconds']:.1f} ms")
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Compare tempo accuracy and speed of the analysis paths')
+    parser.add_argument('files', nargs='*', help='Audio files (default: the demo_*bpm.wav files)')
+    parser.add_argument('--synthesize', metavar='DIR',
+                        help='Also generate demo tracks at several tempos into DIR')
+    parser.add_argument('--tempos', type=int, nargs='+', default=[75, 96, 110, 128, 150, 174])
+    parser.add_argument('--duration', type=float, default=60, help='Length of synthesized tracks (s)')
+    parser.add_argument('--methods', nargs='+', default=list(METHODS), choices=list(METHODS))
+    parser.add_argument('--estimators', action='store_true',
+                        help='Compare the tempo estimators on shared features instead of whole analyses')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join(here, 'demo_*bpm.wav')))
+    if args.synthesize:
+        files += synthesize_corpus(args.synthesize, args.tempos, args.duration)
+
+    if args.estimators:
+        compare_estimators(files)
+        return
+
+    # Warm up imports and caches so the first file is not penalised
+    run_method('coarse', files[0])
+
+    print(f"⏱  Tempo benchmark: {len(files)} files, tolerance ±4% tempo / ±70 ms beats")
+    print(f"{'file':<22} | {'expected':>8} | " +
+          " | ".join(f"{name + ' BPM':>12} {'F':>5} {'s':>6}" for name in args.methods))
+
+    totals = {name: {'seconds': 0.0, 'tempo_ok': 0, 'f': []} for name in args.methods}
+    for path in files:
+        expected = expected_tempo(path)
+        row = f"{os.path.basename(path)[:22]:<22} | {expected or float('nan'):>8.1f} | "
+        cells = []
+        for name in args.methods:
+            results, seconds = run_method(name, path)
+            tempo = results['final_tempo'] if results and 'final_tempo' in results else \
+                (results or {}).get('tempo_energy', 0)
+            f_measure = float('nan')
+            if results and 'energy_beats' in results and expected and \
+                    os.path.basename(path).startswith('demo_'):
+                f_measure = beat_f_measure(results['energy_beats'],
+                                           demo_beat_grid(expected, results['audio_length']))
+                totals[name]['f'].append(f_measure)
+            if expected and abs(tempo - expected) <= 0.04 * expected:
+                totals[name]['tempo_ok'] += 1
+            totals[name]['seconds'] += seconds
+            cells.append(f"{tempo:>12.1f} {f_measure:>5.2f} {seconds:>6.2f}")
+        print(row + " | ".join(cells))
+
+    labelled = sum(1 for path in files if expected_tempo(path))
+    print("\nSummary:")
+    base_seconds = totals[args.methods[0]]['seconds']
+    for name in args.methods:
+        t = totals[name]
+        mean_f = np.mean(t['f']) if t['f'] else float('nan')
+        print(f"  {name:<9} tempo within 4%: {t['tempo_ok']}/{labelled} | mean beat F: {mean_f:.2f} | "
+              f"total {t['seconds']:.2f}s ({base_seconds / t['seconds']:.1f}x vs {args.methods[0]})")
+
+
+if __name__ == "__main__":
+    main()
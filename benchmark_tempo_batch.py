@@ -0,0 +1,64 @@
+# benchmark_tempo_batch.py - Batched vs per-call tempo estimation on many beat trains
+import argparse
+import contextlib
+import io
+import time
+import numpy as np
+from beat_detector import BeatDetector
+from tempo_batch import pack_beat_trains, sliding_windows, estimate_tempo_advanced_batch
+
+
+def random_beat_trains(count, seed=0):
+    """Beat trains with jitter, dropouts, doubled beats and degenerate lengths"""
+    rng = np.random.default_rng(seed)
+    trains = []
+    for _ in range(count):
+        length = int(rng.choice([0, 1, 3, 4, 5, 8, 16, 64, 400]))
+        tempo = rng.uniform(50, 210)
+        times = np.cumsum(rng.normal(60.0 / tempo, rng.uniform(0, 0.05), length))
+        if length > 8 and rng.random() < 0.3:
+            times = np.sort(np.concatenate((times, times[:: 4] + 30.0 / tempo)))  # off-beat extras
+        trains.append(np.round(times, int(rng.choice([2, 3, 6]))))  # frame-quantised like real beats
+    return trains
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batched and per-call estimate_tempo_advanced')
+    parser.add_argument('--trains', type=int, default=5000, help='Number of random beat trains')
+    parser.add_argument('--window', type=int, default=8, help='Window size for the sliding-window case')
+    args = parser.parse_args()
+
+    detector = BeatDetector()
+    trains = random_beat_trains(args.trains)
+    # One long track split into every 8-beat window, as a tempo curve would be
+    track = np.cumsum(np.random.default_rng(1).normal(0.5, 0.02, 2000))
+    window_offsets, window_values = sliding_windows(track, args.window)
+    window_trains = [track[i:i + args.window] for i in range(len(track) - args.window + 1)]
+
+    for name, packed, per_call_inputs in (
+            (f"{args.trains} random trains", pack_beat_trains(trains), trains),
+            (f"{len(window_trains)} sliding {args.window}-beat windows",
+             (window_offsets, window_values), window_trains)):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = np.array([detector.estimate_tempo_advanced(t) for t in per_call_inputs], dtype=float)
+        per_call = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batched = estimate_tempo_advanced_batch(*packed)
+        batch = time.perf_counter() - started
+
+        mismatches = int(np.sum(batched != expected))
+        print(f"📦 {name}: per-call {1000 * per_call:.1f} ms | batched {1000 * batch:.1f} ms "
+              f"({per_call / batch:.0f}x) | {'✅ identical' if not mismatches else f'⚠️  {mismatches} differ'}")
+
+    # Tempo curve of an hour-long mix at 128 BPM (analyze_tempo_over_time + smooth_tempo)
+    beats = np.cumsum(np.random.default_rng(2).normal(60.0 / 128, 0.01, 128 * 60))
+    started = time.perf_counter()
+    tempos, _ = detector.analyze_tempo_over_time(beats)
+    detector.smooth_tempo(tempos)
+    print(f"📈 Tempo curve of a 1-hour mix ({len(beats)} beats): {1000 * (time.perf_counter() - started):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
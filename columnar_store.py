@@ -0,0 +1,270 @@
+# columnar_store.py - Incremental Parquet / Arrow IPC output of per-file summaries and per-beat rows
+import glob
+import os
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for columnar output and queries
+    pa = pq = None
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+INTEGER_FIELDS = ('file_id', 'total_beats', 'downbeats')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Columnar output needs pyarrow (pip install pyarrow)")
+
+
+def beat_records(results, features=None):
+    """(time, strength, is_downbeat) columns for the energy beats of one analysis
+
+    Strength is the energy envelope at each beat when features (see
+    keep_features) are available, otherwise nan.
+    """
+    times = np.asarray(results['energy_beats'], dtype=np.float64)
+    if features is not None:
+        frames = np.searchsorted(features['time_axis'], times)
+        strength = np.asarray(features['energy'])[np.minimum(frames, len(features['energy']) - 1)]
+    else:
+        strength = np.full(len(times), np.nan)
+    is_downbeat = np.isin(times, np.asarray(results.get('downbeats', []), dtype=np.float64))
+    return times, strength.astype(np.float32), is_downbeat
+
+
+class ColumnarWriter:
+    """Append file summaries and beats to two columnar tables as files finish
+
+    summaries<ext> gets one row per file and beats<ext> one row per beat
+    (file_id links them).  Rows are buffered and flushed as a row group
+    (Parquet) or record batch (Arrow IPC) every `flush_every` files, so
+    memory stays bounded however many files are analysed, and whatever
+    was flushed is readable even if the run stops early.
+
+    With append=True (resumed runs) the tables of earlier runs are kept
+    and this run writes a new part (summaries.1.parquet, ...), numbering
+    its files after theirs; otherwise earlier parts are removed.  Give
+    summaries a 'path' so the readers can drop the rows a re-analysis
+    superseded (see latest_file_ids).
+    """
+
+    def __init__(self, directory, format='parquet', flush_every=32, append=False):
+        _require_pyarrow()
+        if format not in FORMATS:
+            raise ValueError(f"Unknown columnar format: {format}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.format = format
+        self.flush_every = flush_every
+        previous = _parts(directory, 'summaries')
+        if not append:
+            for path in previous + _parts(directory, 'beats'):
+                os.remove(path)
+            previous = []
+        self.part = f".{len(previous)}" if previous else ''
+        self.first_file_id = sum(_row_count(path) for path in previous)
+        self.file_count = 0
+        self.beat_count = 0
+        self._summaries = []
+        self._beats = []
+        self._writers = {}
+        self._genre_codes = {}  # one growing genre dictionary shared by every batch
+
+    def add(self, summary, times, strength=None, is_downbeat=None):
+        """Queue one file's summary dict and its beats; returns the file_id"""
+        file_id = self.first_file_id + self.file_count
+        times = np.asarray(times, dtype=np.float64)
+        self._summaries.append(self._normalize(dict(summary, file_id=file_id)))
+        self._beats.append({
+            'file_id': np.full(len(times), file_id, dtype=np.int32),
+            'genre': np.full(len(times), self._genre_codes.setdefault(summary.get('genre', ''),
+                                                                      len(self._genre_codes)), dtype=np.int32),
+            'time': times,
+            'strength': np.full(len(times), np.nan, dtype=np.float32) if strength is None
+            else np.asarray(strength, dtype=np.float32),
+            'is_downbeat': np.zeros(len(times), dtype=bool) if is_downbeat is None
+            else np.asarray(is_downbeat, dtype=bool)
+        })
+        self.file_count += 1
+        self.beat_count += len(times)
+        if len(self._summaries) >= self.flush_every:
+            self.flush()
+        return file_id
+
+    def _normalize(self, summary):
+        """Plain Python values with one type per column (counts int, other numbers float)"""
+        for key, value in summary.items():
+            if isinstance(value, (bool, np.bool_)):
+                summary[key] = bool(value)
+            elif isinstance(value, (int, float, np.integer, np.floating)):
+                summary[key] = int(value) if key in INTEGER_FIELDS else float(value)
+        return summary
+
+    @property
+    def pending(self):
+        """Files added but not yet flushed to disk"""
+        return len(self._summaries)
+
+    def flush(self):
+        if not self._summaries:
+            return
+        summaries = pa.Table.from_pylist(self._summaries)
+        beats = {column: np.concatenate([b[column] for b in self._beats])
+                 for column in ('file_id', 'genre', 'time', 'strength', 'is_downbeat')}
+        # Genre repeats on every beat of a file: store it dictionary-encoded.  New genres only
+        # extend the dictionary, which Arrow IPC files accept as a dictionary delta.
+        beats['genre'] = pa.DictionaryArray.from_arrays(beats['genre'],
+                                                        pa.array(list(self._genre_codes), pa.string()))
+        beats = pa.table(beats)
+        self._write('summaries', summaries)
+        self._write('beats', beats)
+        self._summaries = []
+        self._beats = []
+
+    def _write(self, name, table):
+        if name not in self._writers:
+            path = os.path.join(self.directory, name + self.part + FORMATS[self.format])
+            writer = pq.ParquetWriter(path, table.schema) if self.format == 'parquet' else \
+                pa.ipc.new_file(path, table.schema,
+                                options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+            self._writers[name] = (writer, table.schema)
+        writer, schema = self._writers[name]
+        writer.write_table(table.cast(schema))  # e.g. a column that was all null in the first batch
+
+    def close(self):
+        self.flush()
+        for writer, _ in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parts(directory, table):
+    """Files of one table in write order: table.ext, table.1.ext, table.2.ext, ..."""
+    paths = [path for ext in FORMATS.values()
+             for path in glob.glob(os.path.join(directory, f"{table}*{ext}"))]
+    part_number = lambda path: int(os.path.basename(path).split('.')[1]) \
+        if os.path.basename(path).count('.') > 1 else 0
+    return sorted((path for path in paths if os.path.basename(path).split('.')[0] == table),
+                  key=part_number)
+
+
+def _row_count(path):
+    if path.endswith('.parquet'):
+        return pq.ParquetFile(path).metadata.num_rows
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().num_rows
+
+
+def iter_batches(directory, table, columns, batch_size=65536):
+    """Stream record batches of one table (Parquet or Arrow IPC, all parts) with only the given columns"""
+    _require_pyarrow()
+    paths = _parts(directory, table)
+    if not paths:
+        raise FileNotFoundError(f"No {table}.parquet or {table}.arrow in {directory}")
+    for path in paths:
+        yield from _part_batches(path, columns, batch_size)
+
+
+def _part_batches(path, columns, batch_size=65536):
+    if path.endswith('.parquet'):
+        parquet = pq.ParquetFile(path, read_dictionary=['genre'])
+        yield from parquet.iter_batches(batch_size=batch_size, columns=columns)
+    else:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(columns)
+
+
+def _part_columns(path):
+    if path.endswith('.parquet'):
+        return pq.read_schema(path).names
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def latest_file_ids(directory):
+    """file_ids of the newest row per path
+
+    A file re-analysed by a resumed run gets a new row in a later part;
+    its older rows (and their beats) are superseded.  Rows without a path
+    (written before paths were stored) are all kept.
+    """
+    _require_pyarrow()
+    latest = {}
+    for part in _parts(directory, 'summaries'):
+        has_path = 'path' in _part_columns(part)
+        for batch in _part_batches(part, ['file_id', 'path'] if has_path else ['file_id']):
+            file_ids = batch.column(0).to_pylist()
+            paths = batch.column(1).to_pylist() if has_path else [None] * len(file_ids)
+            for file_id, path in zip(file_ids, paths):
+                latest[path if path is not None else ('', file_id)] = file_id  # parts are in write order
+    return np.array(sorted(latest.values()), dtype=np.int64)
+
+
+def _categories(column):
+    """(codes, labels) of a string or dictionary column, without a Python object per row"""
+    if not pa.types.is_dictionary(column.type):
+        column = column.dictionary_encode()
+    return column.indices.to_numpy(zero_copy_only=False), column.dictionary.to_pylist()
+
+
+def _add_histograms(counts, codes, labels, values, bins):
+    for code in np.unique(codes):
+        hist, _ = np.histogram(values[codes == code], bins=bins)
+        counts[labels[code]] = counts.get(labels[code], 0) + hist
+
+
+def tempo_histogram_by_genre(directory, bins=np.arange(40, 241, 5)):
+    """{genre: counts} of final tempos (newest row per file), reading only the columns needed"""
+    counts = {}
+    live = latest_file_ids(directory)
+    for batch in iter_batches(directory, 'summaries', ['file_id', 'genre', 'final_tempo']):
+        keep = np.isin(batch.column(0).to_numpy(), live)
+        codes, labels = _categories(batch.column(1))
+        _add_histograms(counts, codes[keep], labels,
+                        batch.column(2).to_numpy(zero_copy_only=False)[keep], bins)
+    return counts, bins
+
+
+def beat_tempo_histogram_by_genre(directory, bins=np.arange(40, 241, 5)):
+    """{genre: counts} of local tempo (60 / inter-beat interval) over every beat
+
+    Streams the beats table batch by batch, so memory depends on the
+    batch size rather than on the number of beats in the library.  The
+    last beat of each batch is carried over so an interval that crosses
+    a batch boundary is still counted (once).  Beats of superseded rows
+    (see latest_file_ids) are skipped.
+    """
+    counts = {}
+    live = latest_file_ids(directory)
+    carry = None  # (file_id, time) of the previous batch's last beat
+    for batch in iter_batches(directory, 'beats', ['file_id', 'genre', 'time']):
+        if batch.num_rows == 0:
+            continue
+        file_ids = batch.column(0).to_numpy()
+        codes, labels = _categories(batch.column(1))
+        times = batch.column(2).to_numpy()
+        # Interval i ends at beat i of this batch and starts at the beat before it
+        previous_ids = np.concatenate(([-1 if carry is None else carry[0]], file_ids[:-1]))
+        previous_times = np.concatenate(([np.nan if carry is None else carry[1]], times[:-1]))
+        intervals = times - previous_times
+        keep = (file_ids == previous_ids) & (intervals > 0) & np.isin(file_ids, live)
+        _add_histograms(counts, codes[keep], labels, 60.0 / intervals[keep], bins)
+        carry = (file_ids[-1], times[-1])
+    return counts, bins
+
+
+def print_histograms(counts, bins, title):
+    print(f"\n📊 {title}")
+    for genre, hist in sorted(counts.items()):
+        peak = int(np.argmax(hist))
+        print(f"   {genre:<12} {int(hist.sum()):>9} | most common {bins[peak]:.0f}-{bins[peak + 1]:.0f} BPM")
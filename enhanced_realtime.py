@@ -1,99 +1,216 @@
 # enhanced_realtime.py
+import argparse
+import contextlib
 import numpy as np
 import sounddevice as sd
 import time
+import threading
 from collections import deque
+from beat_events import BeatEvent, BeatEventBus, start_console_printer
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 
+def format_enhanced_beat(event):
+    """Console line used by the enhanced detector's printer thread"""
+    return (f"🎵 BEAT #{event.beat_number} | "
+            f"Tempo: {event.tempo:.1f} BPM | "
+            f"Energy: {event.energy:.4f}")
+
+
+def format_channel_beat(event):
+    """Console line for multi-channel sessions (prefixed with the channel)"""
+    return f"[ch {event.channel}] " + format_enhanced_beat(event)
+
+
+class StreamingBeatTracker:
+    """Block-by-block beat tracker with dynamic thresholding and live tempo
+
+    All channels of a block are handled in one vectorized step: energies,
+    thresholds and the beat decision are (channels,) arrays, so tracking N
+    inputs costs about the same Python overhead as tracking one.  Time is
+    taken from the sample clock, which makes the tracker usable for live
+    streams as well as for replayed or uploaded audio.
+    """
+
+    def __init__(self, sample_rate=22050, channels=1, energy_window=30,
+                 min_beat_interval=0.2, threshold_std=1.5, warmup_blocks=15,
+                 beat_memory=50, tempo_memory=20, source='enhanced'):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.min_beat_interval = min_beat_interval  # 0.2s = maximum 300 BPM
+        self.threshold_std = threshold_std
+        self.warmup_blocks = warmup_blocks
+        self.source = source
+
+        # Energy ring buffer, one column per channel
+        self.energy_buffer = np.zeros((energy_window, channels))
+        self._energy_pos = 0
+        self._energy_filled = 0
+        self.current_threshold = np.full(channels, 0.01)
+
+        self.last_beat_time = np.zeros(channels)
+        self.beat_counts = np.zeros(channels, dtype=int)
+        self.current_tempo = np.zeros(channels)
+        self.beat_times = [deque(maxlen=beat_memory) for _ in range(channels)]
+        self.tempo_history = [deque(maxlen=tempo_memory) for _ in range(channels)]
+        self.samples_processed = 0
+
+    @property
+    def current_time(self):
+        return self.samples_processed / self.sample_rate
+
+    def _update_threshold(self):
+        """Calculate dynamic threshold based on recent energy (per channel)"""
+        if self._energy_filled < 10:
+            self.current_threshold[:] = 0.01
+            return
+        recent = self.energy_buffer[:self._energy_filled]
+        self.current_threshold = recent.mean(axis=0) + recent.std(axis=0) * self.threshold_std
+
+    def _estimate_tempo(self, channel):
+        """Estimate current tempo from the last few beats of one channel"""
+        recent_times = self.beat_times[channel]
+        if len(recent_times) < 3:
+            return 0
+        intervals = np.diff(list(recent_times)[-5:])  # Last 5 beats
+        avg_interval = np.mean(intervals)
+        return 60.0 / avg_interval if avg_interval > 0 else 0
+
+    def process_block(self, block):
+        """Process a (frames, channels) block and return the BeatEvents it contains"""
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+
+        current_time = self.current_time
+        self.samples_processed += block.shape[0]
+
+        # Per-channel energy in one pass
+        energy = np.einsum('ij,ij->j', block, block)
+        self.energy_buffer[self._energy_pos] = energy
+        self._energy_pos = (self._energy_pos + 1) % len(self.energy_buffer)
+        self._energy_filled = min(self._energy_filled + 1, len(self.energy_buffer))
+        self._update_threshold()
+
+        # Dynamic beat detection for every channel at once
+        time_since_last_beat = np.where(self.last_beat_time > 0,
+                                        current_time - self.last_beat_time, np.inf)
+        is_beat = ((energy > self.current_threshold) &
+                   (time_since_last_beat > self.min_beat_interval))
+        if self._energy_filled <= self.warmup_blocks or not is_beat.any():
+            return []
+
+        events = []
+        for channel in np.flatnonzero(is_beat):
+            self.beat_counts[channel] += 1
+            self.beat_times[channel].append(current_time)
+            self.last_beat_time[channel] = current_time
+
+            tempo = self._estimate_tempo(channel)
+            if tempo > 0:
+                self.current_tempo[channel] = tempo
+                self.tempo_history[channel].append(tempo)
+
+            events.append(BeatEvent(int(self.beat_counts[channel]), current_time,
+                                    float(energy[channel]), tempo=tempo,
+                                    source=self.source, channel=int(channel)))
+        return events
+
+    def average_tempo(self, channel=0):
+        history = self.tempo_history[channel]
+        return float(np.mean(list(history))) if history else 0.0
+
+
 class EnhancedRealTimeDetector:
-    def __init__(self, sample_rate=22050, block_size=1024):
+    def __init__(self, sample_rate=22050, block_size=1024, event_bus=None,
+                 channels=1, devices=None):
         self.sample_rate = sample_rate
         self.block_size = block_size
-        self.energy_history = deque(maxlen=100)
-        self.beat_times = deque(maxlen=50)
-        self.tempo_history = deque(maxlen=20)
+        self.event_bus = event_bus or BeatEventBus()
+        self._console_stop = threading.Event()
         self.is_running = False
-        self.beat_count = 0
         self.start_time = time.time()
-        self.last_beat_time = 0
-        
-        # Setup for dynamic thresholding
-        self.energy_buffer = deque(maxlen=30)
-        self.current_threshold = 0.01
-        
-    def calculate_dynamic_threshold(self):
-        """Calculate dynamic threshold based on recent energy"""
-        if len(self.energy_buffer) < 10:
-            return 0.01
-        
-        energies = list(self.energy_buffer)
-        mean_energy = np.mean(energies)
-        std_energy = np.std(energies)
-        
-        return mean_energy + (std_energy * 1.5)
-    
-    def estimate_current_tempo(self):
-        """Estimate current tempo from recent beats"""
-        if len(self.beat_times) < 3:
-            return 0
-        
-        recent_times = list(self.beat_times)
-        if len(recent_times) >= 3:
-            intervals = np.diff(recent_times[-5:])  # Last 5 intervals
-            avg_interval = np.mean(intervals)
-            return 60.0 / avg_interval if avg_interval > 0 else 0
-        return 0
-    
+
+        # One stream per input device (None = system default), each with
+        # `channels` inputs; all of them feed a single vectorized tracker
+        self.channels = channels
+        self.devices = list(devices) if devices else [None]
+        self.total_channels = channels * len(self.devices)
+        self.tracker = StreamingBeatTracker(sample_rate, self.total_channels)
+
+        # With several devices each one's blocks queue up in order until
+        # every device has delivered one; the oldest block of each is then
+        # processed together (bounded, so a stalled device can't grow them)
+        self._pending = [deque(maxlen=32) for _ in self.devices]
+        self._staging_lock = threading.Lock()
+        self._callbacks = [self._make_device_callback(i) for i in range(len(self.devices))]
+
+    @property
+    def beat_count(self):
+        return int(self.tracker.beat_counts.sum())
+
+    @property
+    def beat_times(self):
+        return self.tracker.beat_times[0]
+
+    @property
+    def tempo_history(self):
+        return self.tracker.tempo_history[0]
+
+    def channel_label(self, channel):
+        device = self.devices[channel // self.channels]
+        return f"{'default' if device is None else device}:{channel % self.channels}"
+
+    def _make_device_callback(self, device_index):
+        def callback(indata, frames, time_info, status):
+            if status:
+                print(f"Audio status: {status}")
+            if not self.is_running:
+                return
+            with self._staging_lock:
+                if len(self._pending) == 1:
+                    events = self.tracker.process_block(indata)
+                else:
+                    self._pending[device_index].append(indata.copy())  # indata is reused by the stream
+                    events = []
+                    while all(self._pending):
+                        blocks = [pending.popleft() for pending in self._pending]
+                        frames = min(len(block) for block in blocks)
+                        events += self.tracker.process_block(
+                            np.concatenate([block[:frames] for block in blocks], axis=1))
+            for event in events:
+                self.event_bus.publish(event)
+
+        return callback
+
     def audio_callback(self, indata, frames, time_info, status):
-        """Enhanced audio callback with dynamic thresholding"""
-        if status:
-            print(f"Audio status: {status}")
-        
-        if self.is_running:
-            audio = indata[:, 0]
-            energy = np.sum(audio ** 2)
-            current_time = time.time() - self.start_time
-            
-            # Update energy buffer and threshold
-            self.energy_buffer.append(energy)
-            self.current_threshold = self.calculate_dynamic_threshold()
-            
-            # Dynamic beat detection
-            time_since_last_beat = current_time - self.last_beat_time if self.last_beat_time > 0 else float('inf')
-            min_beat_interval = 0.2  # Maximum 300 BPM
-            
-            if (energy > self.current_threshold and 
-                time_since_last_beat > min_beat_interval and 
-                len(self.energy_buffer) > 15):
-                
-                self.beat_count += 1
-                self.beat_times.append(current_time)
-                self.last_beat_time = current_time
-                
-                # Estimate current tempo
-                current_tempo = self.estimate_current_tempo()
-                if current_tempo > 0:
-                    self.tempo_history.append(current_tempo)
-                
-                print(f"🎵 BEAT #{self.beat_count} | "
-                      f"Tempo: {current_tempo:.1f} BPM | "
-                      f"Energy: {energy:.4f}")
+        """Enhanced audio callback with dynamic thresholding (first device)"""
+        self._callbacks[0](indata, frames, time_info, status)
     
-    def start_detection(self):
+    def start_detection(self, console=True):
         """Start enhanced real-time detection"""
         print("🚀 Starting ENHANCED real-time beat detection...")
         print("   Features: Dynamic thresholding, Live tempo estimation")
+        if self.total_channels > 1:
+            print(f"   Channels: {self.total_channels} across {len(self.devices)} device(s)")
         print("   Press Ctrl+C to stop\n")
         
         self.is_running = True
         self.start_time = time.time()
+        self._console_stop.clear()
+        if console:
+            formatter = format_channel_beat if self.total_channels > 1 else format_enhanced_beat
+            start_console_printer(self.event_bus, self._console_stop, formatter)
         
         try:
-            with sd.InputStream(callback=self.audio_callback, 
-                              channels=1,
-                              samplerate=self.sample_rate,
-                              blocksize=self.block_size):
+            with contextlib.ExitStack() as streams:
+                for device, callback in zip(self.devices, self._callbacks):
+                    streams.enter_context(sd.InputStream(callback=callback,
+                                                         device=device,
+                                                         channels=self.channels,
+                                                         samplerate=self.sample_rate,
+                                                         blocksize=self.block_size,
+                                                         dtype='float32'))
                 while self.is_running:
                     time.sleep(0.1)
         except KeyboardInterrupt:
@@ -102,15 +219,30 @@ class EnhancedRealTimeDetector:
     def stop_detection(self):
         """Stop real-time detection"""
         self.is_running = False
+        self._console_stop.set()
         print(f"\n🎉 Session Summary:")
         print(f"   Total beats: {self.beat_count}")
-        if self.tempo_history:
-            avg_tempo = np.mean(list(self.tempo_history))
-            print(f"   Average tempo: {avg_tempo:.1f} BPM")
+        if self.total_channels == 1:
+            avg_tempo = self.tracker.average_tempo(0)
+            if avg_tempo > 0:
+                print(f"   Average tempo: {avg_tempo:.1f} BPM")
+            return
+        for channel in range(self.total_channels):
+            avg_tempo = self.tracker.average_tempo(channel)
+            tempo_text = f"{avg_tempo:.1f} BPM" if avg_tempo > 0 else "n/a"
+            print(f"   [{self.channel_label(channel)}] Beats: {self.tracker.beat_counts[channel]} | "
+                  f"Average tempo: {tempo_text}")
 
 def main():
-    detector = EnhancedRealTimeDetector()
+    parser = argparse.ArgumentParser(description='Enhanced real-time beat detection')
+    parser.add_argument('--channels', type=int, default=1, help='Input channels per device')
+    parser.add_argument('--device', action='append', default=None,
+                        help='Input device index or name (repeat for several devices)')
+    args = parser.parse_args()
+
+    devices = [int(d) if d.isdigit() else d for d in args.device] if args.device else None
+    detector = EnhancedRealTimeDetector(channels=args.channels, devices=devices)
     detector.start_detection()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,13 +1,35 @@
 # genre_analysis.py
 import os
-import pandas as pd
+import csv
+import sys
+import argparse
+import numpy as np
 from beat_detector import BeatDetector
+from run_manifest import RunManifest
+from library_index import LibraryIndex, scan_library, print_diff
+from genre_stats import GenreAggregator
+from track_index import TrackIndex
+from columnar_store import (ColumnarWriter, beat_records, tempo_histogram_by_genre,
+                            beat_tempo_histogram_by_genre, print_histograms)
 import matplotlib.pyplot as plt
 
 class GenreAnalyzer:
-    def __init__(self):
+    def __init__(self, columnar_dir=None, columnar_format='parquet', manifest_path=None, resume=False,
+                 csv_path=None, report_every=0, track_index_path=None):
         self.detector = BeatDetector()
-        self.results = []
+        # Per-genre running statistics; per-file rows are streamed to csv_path instead of kept
+        self.stats = GenreAggregator()
+        self.csv_path = csv_path
+        self._csv_file = self._csv = None
+        self.report_every = report_every
+        self.analyzed = 0
+        # Optional Parquet/Arrow output: summaries and per-beat rows written as files finish
+        self.store = ColumnarWriter(columnar_dir, columnar_format, append=resume) if columnar_dir else None
+        # Optional run manifest: finished files are recorded as they complete and skipped on resume
+        self.manifest = RunManifest(manifest_path, resume) if manifest_path else None
+        self._unflushed = []  # (file_path, summary) waiting for the columnar store to flush
+        # Optional tempo-range index of the analysed tracks (see track_index.py)
+        self.tracks = TrackIndex(track_index_path) if track_index_path else None
     
     def analyze_genre_directory(self, directory_path, genre_name):
         """Analyze all audio files in a directory for a specific genre"""
@@ -17,24 +39,33 @@ class GenreAnalyzer:
             print(f"Directory not found: {directory_path}")
             return
         
-        audio_files = [f for f in os.listdir(directory_path) 
-                      if f.lower().endswith(('.wav', '.mp3', '.flac'))]
+        file_paths = sorted(path for path, _, _ in scan_library(directory_path))
         
-        if not audio_files:
+        if not file_paths:
             print(f"No audio files found in {directory_path}")
             return
         
-        for audio_file in audio_files:
-            file_path = os.path.join(directory_path, audio_file)
-            print(f"\n📁 Analyzing: {audio_file}")
-            
+        self.analyze_genre_files(file_paths, genre_name)
+
+    def analyze_genre_files(self, file_paths, genre_name):
+        """Analyze the given audio files as examples of one genre"""
+        for file_path in file_paths:
+            audio_file = os.path.basename(file_path)
             try:
-                results = self.detector.analyze_audio_file_enhanced(file_path, visualize=False)
+                record = self.manifest.current(file_path) if self.manifest is not None else None
+                if record is not None:
+                    self._add_result(record['summary'], file_path)
+                    print(f"\n⏭️  Unchanged since last run: {audio_file} ({record['summary']['final_tempo']:.1f} BPM)")
+                    continue
+                print(f"\n📁 Analyzing: {audio_file}")
+                
+                results = self.detector.analyze_audio_file_enhanced(file_path, visualize=False,
+                                                                    keep_features=self.store is not None)
                 
                 if results:
                     # Calculate additional metrics
                     beat_intervals = np.diff(results['energy_beats'])
-                    tempo_stability = np.std(results['tempo_over_time']) if results['tempo_over_time'] else 0
+                    tempo_stability = np.std(results['tempo_over_time']) if len(results['tempo_over_time']) else 0
                     
                     genre_result = {
                         'genre': genre_name,
@@ -51,75 +82,109 @@ class GenreAnalyzer:
                         'algorithm_agreement': abs(results['tempo_energy'] - results['tempo_flux'])
                     }
                     
-                    self.results.append(genre_result)
+                    self._add_result(genre_result, file_path)
+                    self._unflushed.append((file_path, genre_result))
+                    if self.store is not None:
+                        self.store.add(dict(genre_result, path=os.path.abspath(file_path)),
+                                       *beat_records(results, results.get('features')))
+                    self._checkpoint()
                     print(f"   ✅ Tempo: {results['final_tempo']:.1f} BPM | Beats: {len(results['energy_beats'])}")
+                    self.analyzed += 1
+                    if self.report_every and self.analyzed % self.report_every == 0:
+                        print(f"\n📊 Running summary after {self.stats.count} files:")
+                        print(self.stats.summary_table().round(2))
+                elif self.manifest is not None:
+                    self.manifest.record(file_path, 'error', error='could not load audio')
                     
             except Exception as e:
                 print(f"   ❌ Error analyzing {audio_file}: {e}")
+                if self.manifest is not None:
+                    self.manifest.record(file_path, 'error', error=str(e))
+
+    def _add_result(self, summary, file_path):
+        """Fold one file summary into the genre statistics, track index and CSV output"""
+        self.stats.add(summary)
+        path = os.path.abspath(file_path)  # the track index key, also written to the CSV
+        if self.tracks is not None:
+            self.tracks.add(summary, path)
+        if self.csv_path is None:
+            return
+        if self._csv is None:
+            self._csv_file = open(self.csv_path, 'w', newline='')
+            self._csv = csv.DictWriter(self._csv_file, fieldnames=list(summary) + ['path'],
+                                       extrasaction='ignore')
+            self._csv.writeheader()
+        self._csv.writerow(dict(summary, path=path))
+        self._csv_file.flush()
+
+    def _checkpoint(self):
+        """Mark finished files done once their columnar rows (if any) are on disk"""
+        if self.store is not None and self.store.pending:
+            return
+        if self.manifest is not None:
+            for file_path, summary in self._unflushed:
+                self.manifest.record(file_path, 'done', summary)
+        self._unflushed = []
     
+    def close(self):
+        """Flush and close the columnar output, CSV and run manifest, if any"""
+        if self._csv_file is not None:
+            self._csv_file.close()
+            print(f"\n💾 Results saved to '{self.csv_path}'")
+        if self.store is not None:
+            self.store.close()
+            print(f"\n💾 {self.store.file_count} files / {self.store.beat_count} beats written to "
+                  f"'{self.store.directory}' ({self.store.format})")
+        self._checkpoint()
+        if self.tracks is not None:
+            print(f"🗂️  Track index '{self.tracks.db_path}': {self.tracks.count()} tracks")
+            self.tracks.close()
+        if self.manifest is not None:
+            self.manifest.close()
+            counts = ', '.join(f"{n} {status}" for status, n in sorted(self.manifest.counts().items()))
+            print(f"📝 Run manifest '{self.manifest.path}': {counts or 'empty'}")
+
     def generate_genre_report(self):
         """Generate comprehensive genre analysis report"""
-        if not self.results:
+        if not self.stats.count:
             print("No results to analyze!")
             return
         
-        df = pd.DataFrame(self.results)
-        
         print("\n" + "="*80)
         print("🎵 GENRE ANALYSIS REPORT")
         print("="*80)
         
         # Summary by genre
-        genre_summary = df.groupby('genre').agg({
-            'final_tempo': ['mean', 'std'],
-            'beat_density': 'mean',
-            'tempo_stability': 'mean',
-            'algorithm_agreement': 'mean',
-            'file': 'count'
-        }).round(2)
+        genre_summary = self.stats.summary_table()
         
         print("\n📊 Genre Performance Summary:")
-        print(genre_summary)
+        print(genre_summary.round(2))
         
         # Create visualizations
-        self.plot_genre_comparison(df)
+        self.plot_genre_comparison()
         
-        return df
+        return genre_summary
     
-    def plot_genre_comparison(self, df):
-        """Create comparison plots across genres"""
+    def plot_genre_comparison(self, stats=None):
+        """Create comparison plots across genres from the running genre statistics"""
+        stats = self.stats if stats is None else stats
         fig, axes = plt.subplots(2, 2, figsize=(15, 12))
         fig.suptitle('DSP Beat Detection - Genre Performance Analysis', fontsize=16, fontweight='bold')
         
-        # Plot 1: Tempo distribution by genre
-        genres = df['genre'].unique()
-        tempo_data = [df[df['genre'] == genre]['final_tempo'] for genre in genres]
-        
-        axes[0,0].boxplot(tempo_data, labels=genres)
-        axes[0,0].set_title('Tempo Distribution by Genre')
-        axes[0,0].set_ylabel('BPM')
-        axes[0,0].tick_params(axis='x', rotation=45)
-        
-        # Plot 2: Beat density by genre
-        density_data = [df[df['genre'] == genre]['beat_density'] for genre in genres]
-        axes[0,1].boxplot(density_data, labels=genres)
-        axes[0,1].set_title('Beat Density by Genre (beats/second)')
-        axes[0,1].set_ylabel('Beats/Second')
-        axes[0,1].tick_params(axis='x', rotation=45)
-        
-        # Plot 3: Tempo stability by genre
-        stability_data = [df[df['genre'] == genre]['tempo_stability'] for genre in genres]
-        axes[1,0].boxplot(stability_data, labels=genres)
-        axes[1,0].set_title('Tempo Stability by Genre (BPM std dev)')
-        axes[1,0].set_ylabel('BPM Standard Deviation')
-        axes[1,0].tick_params(axis='x', rotation=45)
-        
-        # Plot 4: Algorithm agreement by genre
-        agreement_data = [df[df['genre'] == genre]['algorithm_agreement'] for genre in genres]
-        axes[1,1].boxplot(agreement_data, labels=genres)
-        axes[1,1].set_title('Algorithm Agreement by Genre (BPM difference)')
-        axes[1,1].set_ylabel('Energy vs Flux BPM Difference')
-        axes[1,1].tick_params(axis='x', rotation=45)
+        panels = [
+            ('final_tempo', 'Tempo Distribution by Genre', 'BPM'),
+            ('beat_density', 'Beat Density by Genre (beats/second)', 'Beats/Second'),
+            ('tempo_stability', 'Tempo Stability by Genre (BPM std dev)', 'BPM Standard Deviation'),
+            ('algorithm_agreement', 'Algorithm Agreement by Genre (BPM difference)',
+             'Energy vs Flux BPM Difference'),
+        ]
+        # Boxes are drawn from streamed quartiles and extremes (Axes.bxp), so no per-file data
+        # is needed; whiskers reach 1.5 IQR clipped to the data range, outliers aren't drawn
+        for ax, (field, title, ylabel) in zip(axes.flat, panels):
+            ax.bxp(stats.box_stats(field))
+            ax.set_title(title)
+            ax.set_ylabel(ylabel)
+            ax.tick_params(axis='x', rotation=45)
         
         plt.tight_layout()
         plt.show()
@@ -142,7 +207,7 @@ class GenreAnalyzer:
                 print(f"   • Downbeats: {len(results.get('downbeats', []))}")
                 print(f"   • Beat Density: {len(results['energy_beats'])/results['audio_length']:.2f} beats/sec")
                 
-                if results['tempo_over_time']:
+                if len(results['tempo_over_time']):
                     print(f"   • Tempo Range: {min(results['tempo_over_time']):.1f}-{max(results['tempo_over_time']):.1f} BPM")
                     print(f"   • Tempo Stability: {np.std(results['tempo_over_time']):.1f} BPM std dev")
                 
@@ -187,37 +252,72 @@ class GenreAnalyzer:
                 print("   ✅ High beat density typical in hip-hop")
 
 def main():
-    analyzer = GenreAnalyzer()
+    parser = argparse.ArgumentParser(description='Genre analysis of the music/ directories')
+    parser.add_argument('--columnar', metavar='DIR',
+                        help='Also write summaries and per-beat rows to DIR as files finish (needs pyarrow)')
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--histogram', metavar='DIR',
+                        help='Only print tempo histograms by genre from a columnar DIR and exit')
+    parser.add_argument('--manifest', default='genre_analysis_manifest.jsonl',
+                        help='Run manifest recording each finished file (path, size, mtime, status)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip files the manifest already has as done and unchanged')
+    parser.add_argument('--library', default='music',
+                        help='Library root; each top-level folder is a genre (default: music)')
+    parser.add_argument('--index', default='library_index.sqlite', help='SQLite file index of the library')
+    parser.add_argument('--tracks', default='track_index.sqlite',
+                        help='Tempo-range index of the analysed tracks (query with track_index.py or /search)')
+    parser.add_argument('--report-every', type=int, default=0, metavar='N',
+                        help='Print the running genre summary every N analysed files')
+    args = parser.parse_args()
+
+    if args.histogram:
+        print_histograms(*tempo_histogram_by_genre(args.histogram), "Final tempo by genre (files)")
+        print_histograms(*beat_tempo_histogram_by_genre(args.histogram), "Local tempo by genre (beats)")
+        return
+
+    # Before opening any output: an unmounted or renamed library must not look like an empty one
+    if not os.path.isdir(args.library):
+        print(f"Directory not found: {args.library}")
+        sys.exit(1)
+
+    analyzer = GenreAnalyzer(args.columnar, args.format, args.manifest, args.resume,
+                             csv_path='genre_analysis_results.csv', report_every=args.report_every,
+                             track_index_path=args.tracks)
     
     print("🎵 DSP BEAT DETECTION - GENRE ANALYSIS TOOL")
     print("="*60)
     
-    # Test different genres (modify paths as needed)
-    genre_directories = {
-        'Electronic': 'music/electronic',
-        'Classical': 'music/classical', 
-        'Jazz': 'music/jazz',
-        'Rock': 'music/rock',
-        'HipHop': 'music/hiphop',
-        'Acoustic': 'music/acoustic'
-    }
+    # Index the library (music/<genre>/..., any depth); only new or changed files are re-read
+    with LibraryIndex(args.index) as index:
+        try:
+            diff = index.refresh(args.library)
+        except NotADirectoryError as e:
+            print(f"❌ {e}")
+            analyzer.close()
+            sys.exit(1)
+        print_diff(diff, show=0)
+        if analyzer.tracks is not None:
+            # Only files the scan could see and found gone (unreadable folders are never "removed")
+            analyzer.tracks.remove(diff['removed'])
+        genres = {genre: index.files(args.library, genre) for genre in index.genres(args.library)}
     
-    # Analyze each genre directory
-    for genre, directory in genre_directories.items():
-        analyzer.analyze_genre_directory(directory, genre)
+    # Analyze each genre
+    try:
+        for genre, file_paths in genres.items():
+            print(f"\n🎵 Analyzing {genre} music ({len(file_paths)} files)...")
+            analyzer.analyze_genre_files(file_paths, genre)
+    finally:
+        analyzer.close()  # also on Ctrl+C: keep what finished for --resume
     
     # Generate comprehensive report
-    if analyzer.results:
-        df = analyzer.generate_genre_report()
-        
-        # Save results to CSV
-        df.to_csv('genre_analysis_results.csv', index=False)
-        print(f"\n💾 Results saved to 'genre_analysis_results.csv'")
+    if analyzer.stats.count:
+        analyzer.generate_genre_report()
         
         # Show top performing genres
-        avg_agreement = df.groupby('genre')['algorithm_agreement'].mean().sort_values()
+        avg_agreement = analyzer.stats.mean('algorithm_agreement')
         print(f"\n🏆 Best Performing Genres (by algorithm agreement):")
-        for genre, agreement in avg_agreement.items():
+        for genre, agreement in sorted(avg_agreement.items(), key=lambda item: item[1]):
             print(f"   {genre}: {agreement:.1f} BPM difference")
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+# genre_stats.py - Streaming per-genre statistics (Welford moments + t-digest quantiles)
+import math
+import numpy as np
+import pandas as pd
+
+REPORT_FIELDS = ('final_tempo', 'beat_density', 'tempo_stability', 'algorithm_agreement')
+
+
+class QuantileSketch:
+    """Merging t-digest: approximate quantiles in O(compression) memory
+
+    Values are buffered and periodically merged into sorted centroids
+    whose size is bounded by the k1 scale function, so centroids stay
+    small (accurate) near the tails and grow towards the median.  Until
+    the buffer first fills (5 x compression values) quantiles are taken
+    from the raw values, so they are exact and match np.quantile.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    def add(self, value):
+        value = float(value)
+        self._buffer.append(value)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._merge()
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q(self, k):
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _merge(self):
+        if not self._buffer:
+            return
+        means = np.concatenate((self.means, self._buffer))
+        weights = np.concatenate((self.weights, np.ones(len(self._buffer))))
+        self._buffer = []
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        merged_means, merged_weights = [means[0]], [weights[0]]
+        done = 0.0  # weight of the centroids before the current one
+        q_limit = self._q(self._k(0.0) + 1)
+        for mean, weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            if (done + merged_weights[-1] + weight) / total <= q_limit:
+                merged_weights[-1] += weight
+                merged_means[-1] += (mean - merged_means[-1]) * weight / merged_weights[-1]
+            else:
+                done += merged_weights[-1]
+                q_limit = self._q(self._k(done / total) + 1)
+                merged_means.append(mean)
+                merged_weights.append(weight)
+        self.means = np.array(merged_means)
+        self.weights = np.array(merged_weights)
+
+    def quantile(self, q):
+        if len(self.means) == 0:  # nothing merged yet: every value is still in the buffer
+            return float(np.quantile(self._buffer, q)) if self._buffer else math.nan
+        self._merge()
+        if np.all(self.weights == 1):
+            return float(np.quantile(self.means, q))
+        # Each centroid's mean sits at the middle of its weight; the extremes anchor the ends
+        centers = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.weights.sum(), np.concatenate(([0], centers, [self.weights.sum()])),
+                               np.concatenate(([self.min], self.means, [self.max]))))
+
+
+class RunningStats:
+    """Count, mean, sample variance (Welford), min/max and quantiles of one value stream"""
+
+    def __init__(self, compression=100):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.sketch = QuantileSketch(compression)
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.sketch.add(value)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self):
+        return self.sketch.min
+
+    @property
+    def max(self):
+        return self.sketch.max
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def box_stats(self, label):
+        """One box for Axes.bxp: quartiles, and whiskers at 1.5 IQR clipped to the data range"""
+        q1, median, q3 = (self.quantile(q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        return {'label': label, 'med': median, 'q1': q1, 'q3': q3, 'mean': self.mean, 'fliers': [],
+                'whislo': max(self.min, q1 - 1.5 * iqr), 'whishi': min(self.max, q3 + 1.5 * iqr)}
+
+
+class GenreAggregator:
+    """Per-genre RunningStats of the report fields, updated one file summary at a time
+
+    Memory depends on the number of genres, not of files, and every
+    report (summary table, box plots) can be produced at any point of
+    a long batch.
+    """
+
+    def __init__(self, fields=REPORT_FIELDS, compression=100):
+        self.fields = fields
+        self.compression = compression
+        self.genres = {}  # genre -> {field: RunningStats}, in order of first appearance
+
+    def add(self, summary):
+        stats = self.genres.get(summary['genre'])
+        if stats is None:
+            stats = self.genres[summary['genre']] = {field: RunningStats(self.compression)
+                                                     for field in self.fields}
+        for field in self.fields:
+            stats[field].add(summary[field])
+
+    @property
+    def count(self):
+        return sum(stats[self.fields[0]].count for stats in self.genres.values())
+
+    def mean(self, field):
+        """{genre: mean of field}"""
+        return {genre: stats[field].mean for genre, stats in self.genres.items()}
+
+    def summary_table(self):
+        """Per-genre table: mean and std of final_tempo, means of the other fields, file count"""
+        columns = [('final_tempo', 'mean'), ('final_tempo', 'std')]
+        columns += [(field, 'mean') for field in self.fields if field != 'final_tempo']
+        rows = {genre: [getattr(stats[field], statistic) for field, statistic in columns]
+                + [stats[self.fields[0]].count] for genre, stats in sorted(self.genres.items())}
+        table = pd.DataFrame.from_dict(rows, orient='index',
+                                       columns=pd.MultiIndex.from_tuples(columns + [('file', 'count')]))
+        table.index.name = 'genre'
+        return table
+
+    def box_stats(self, field):
+        """Axes.bxp input for one field, one box per genre"""
+        return [stats[field].box_stats(genre) for genre, stats in self.genres.items()]
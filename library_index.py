@@ -0,0 +1,183 @@
+# library_index.py - Recursive audio library scanner with a persistent SQLite file index
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import soundfile as sf
+from batch_analysis import AUDIO_EXTENSIONS
+
+# Folder names used by the genre analysis (music/<folder>/...) and their display names
+GENRE_LABELS = {'electronic': 'Electronic', 'classical': 'Classical', 'jazz': 'Jazz', 'rock': 'Rock',
+                'hiphop': 'HipHop', 'acoustic': 'Acoustic'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    duration REAL,
+    genre TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_genre ON files (genre, path);
+"""
+
+
+def infer_genre(root, path):
+    """Genre from the top-level folder under root ('Unknown' for files directly in root)"""
+    parts = os.path.relpath(path, root).split(os.sep)
+    if len(parts) < 2:
+        return 'Unknown'
+    return GENRE_LABELS.get(parts[0].lower(), parts[0])
+
+
+def scan_library(root, unreadable=None):
+    """Yield (path, size, mtime_ns) for every audio file under root
+
+    Walks with os.scandir, whose entries carry the file type from the
+    directory listing, so only audio files cost a stat call.  Folders
+    that can't be (fully) listed are skipped and appended to unreadable,
+    so callers can tell "couldn't look" from "not there".
+    """
+    pending = [root]
+    while pending:
+        folder = pending.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:  # deleted while scanning
+                            continue
+                        yield entry.path, stat.st_size, stat.st_mtime_ns
+        except OSError as e:  # unreadable folder: skip it, keep scanning
+            print(f"⚠️  Skipping {folder}: {e.strerror}")
+            if unreadable is not None:
+                unreadable.append(folder)
+
+
+def header_duration(path):
+    """Duration in seconds from the file header, or None if libsndfile can't read it (e.g. m4a)"""
+    try:
+        return sf.info(path).duration
+    except Exception:
+        return None
+
+
+class LibraryIndex:
+    """SQLite index of the audio files under one or more library roots
+
+    refresh(root) rescans a root and reads headers only for new or changed
+    files (size or mtime differ), so re-indexing a large, mostly unchanged
+    library costs little more than the directory walk.  Paths are stored
+    absolute; rows under a root are found with a primary-key range scan.
+
+    Only files the scan could have seen are treated as removed: a missing
+    root raises instead of emptying the index, and indexed files under
+    folders that couldn't be listed are kept.
+    """
+
+    def __init__(self, db_path='library_index.sqlite'):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+
+    def _prefix_range(self, root):
+        prefix = os.path.join(os.path.abspath(root), '')
+        return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+    def refresh(self, root):
+        """Rescan root and update the index; returns {'added', 'removed', 'changed'} path lists
+
+        Raises NotADirectoryError if root isn't a readable folder (e.g. an unmounted library).
+        """
+        root = os.path.abspath(root)
+        if not os.path.isdir(root):
+            raise NotADirectoryError(f"Library folder not found: {root}")
+        unreadable = []
+        known = {path: (size, mtime) for path, size, mtime in self.db.execute(
+            "SELECT path, size, mtime_ns FROM files WHERE path >= ? AND path < ?", self._prefix_range(root))}
+        diff = {'added': [], 'removed': [], 'changed': []}
+        rows = []
+        for path, size, mtime in scan_library(root, unreadable):
+            previous = known.pop(path, None)
+            if previous == (size, mtime):
+                continue
+            diff['added' if previous is None else 'changed'].append(path)
+            rows.append((path, size, mtime, header_duration(path), infer_genre(root, path)))
+        if root in unreadable:
+            raise NotADirectoryError(f"Library folder can't be read: {root}")
+        unseen = tuple(os.path.join(folder, '') for folder in unreadable)
+        diff['removed'] = sorted(path for path in known if not path.startswith(unseen))
+        with self.db:  # one transaction for the whole refresh
+            self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in diff['removed']))
+        return diff
+
+    def files(self, root=None, genre=None):
+        """Indexed file paths, optionally under one root and/or of one genre, sorted by path"""
+        query, params = "SELECT path FROM files WHERE 1", []
+        if root is not None:
+            query += " AND path >= ? AND path < ?"
+            params += self._prefix_range(root)
+        if genre is not None:
+            query += " AND genre = ?"
+            params.append(genre)
+        return [path for path, in self.db.execute(query + " ORDER BY path", params)]
+
+    def genres(self, root=None):
+        """{genre: (file count, total duration in seconds)}"""
+        query, params = "SELECT genre, COUNT(*), TOTAL(duration) FROM files", []
+        if root is not None:
+            query += " WHERE path >= ? AND path < ?"
+            params += self._prefix_range(root)
+        return {genre: (count, duration) for genre, count, duration in
+                self.db.execute(query + " GROUP BY genre ORDER BY genre", params)}
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def print_diff(diff, show=10):
+    print(f"📚 +{len(diff['added'])} added, -{len(diff['removed'])} removed, "
+          f"~{len(diff['changed'])} changed")
+    for kind, mark in (('added', '+'), ('removed', '-'), ('changed', '~')):
+        for path in diff[kind][:show]:
+            print(f"   {mark} {path}")
+        if 0 < show < len(diff[kind]):
+            print(f"   {mark} ... {len(diff[kind]) - show} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index the audio files of a music library')
+    parser.add_argument('root', nargs='?', default='music', help='Library root (genre = top-level folder)')
+    parser.add_argument('--db', default='library_index.sqlite', help='SQLite index file')
+    parser.add_argument('--genre', help='List the indexed files of one genre')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Directory not found: {args.root}")
+        sys.exit(1)
+    with LibraryIndex(args.db) as index:
+        started = time.perf_counter()
+        diff = index.refresh(args.root)
+        print(f"🔍 Scanned '{args.root}' in {time.perf_counter() - started:.2f} s")
+        print_diff(diff)
+        for genre, (count, duration) in index.genres(args.root).items():
+            print(f"   {genre:<12} {count:>7} files | {duration / 60:>9.1f} min")
+        if args.genre:
+            for path in index.files(args.root, args.genre):
+                print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# live_stream.py - Live beats for the web app: SSE fan-out and browser-mic streaming
+import json
+import threading
+import time
+import uuid
+from collections import deque
+import numpy as np
+from enhanced_realtime import StreamingBeatTracker
+
+
+def encode_sse(payload, event='beats', event_id=None):
+    """Encode one Server-Sent Events frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode('utf-8')
+
+
+class LiveBroadcaster:
+    """Batch beat events from a BeatEventBus into SSE frames shared by all viewers
+
+    A single background thread drains one bus subscription every
+    batch_interval seconds and encodes everything that arrived into one
+    frame.  Viewers only read the shared frame log, so the per-beat cost is
+    independent of the number of viewers.
+
+    After use_gevent() (web_app's default server) every viewer is a
+    greenlet and one hub watcher wakes them all when a frame is
+    published, so no OS thread is held per client.  Otherwise (the
+    threaded Flask dev server) each viewer waits on a Condition in its
+    own request thread.
+    """
+
+    def __init__(self, event_bus, batch_interval=0.1, backlog=64, keepalive=15.0):
+        self.event_bus = event_bus
+        self.batch_interval = batch_interval
+        self.keepalive = keepalive
+        self._frames = deque(maxlen=backlog)  # (sequence, encoded frame)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stop = threading.Event()
+        self._tempos = {}
+        self.viewers = 0
+        self._wakeup = None  # gevent Event replaced on every publish (see use_gevent)
+        self._watcher = None
+
+    def use_gevent(self):
+        """Wake viewers through the gevent hub; call from the thread that runs the hub"""
+        import gevent
+        from gevent.event import Event
+        self._new_event = Event
+        self._wakeup = Event()
+        # The batching thread is a real OS thread: async_ watchers are the thread-safe way in
+        self._watcher = gevent.get_hub().loop.async_()
+        self._watcher.start(self._wake_viewers)
+        return self
+
+    def _wake_viewers(self):
+        wakeup, self._wakeup = self._wakeup, self._new_event()
+        wakeup.set()
+
+    def _notify(self):
+        self._condition.notify_all()
+        if self._watcher is not None:
+            self._watcher.send()
+
+    def start(self):
+        """Start the batching thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._subscription = self.event_bus.subscribe(maxsize=4096)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._subscription.close()
+        with self._condition:
+            self._notify()
+
+    def publish_frame(self, payload, event='beats'):
+        """Append a frame to the shared log and wake every viewer"""
+        with self._condition:
+            self._sequence += 1
+            self._frames.append((self._sequence, encode_sse(payload, event, self._sequence)))
+            self._notify()
+
+    def _run(self):
+        while not self._stop.wait(self.batch_interval):
+            events = self._subscription.drain()
+            if not events:
+                continue
+            for event in events:
+                if event.tempo > 0:
+                    self._tempos[event.channel] = round(event.tempo, 1)
+            self.publish_frame({
+                'beats': [[e.channel, e.beat_number, round(e.time, 3), round(e.energy, 5)]
+                          for e in events],
+                'tempo': self._tempos,
+                'dropped': self._subscription.dropped
+            })
+
+    def frames_after(self, sequence):
+        """Frames newer than sequence (the oldest kept ones if the viewer fell behind)"""
+        with self._condition:
+            return [(seq, frame) for seq, frame in self._frames if seq > sequence]
+
+    def _resume_sequence(self, last_event_id):
+        """Sequence to resume after; new frames only if the ID is missing, malformed or from
+        before a server restart (larger than anything published since)"""
+        try:
+            sequence = int(last_event_id)
+        except (TypeError, ValueError):
+            return self._sequence
+        return sequence if 0 <= sequence <= self._sequence else self._sequence
+
+    def stream(self, last_event_id=None):
+        """Generator of encoded SSE frames for one viewer"""
+        with self._condition:
+            sequence = self._resume_sequence(last_event_id)
+            self.viewers += 1
+        try:
+            yield b"retry: 2000\n\n"
+            last_sent = time.monotonic()
+            while not self._stop.is_set():
+                wakeup = self._wakeup  # taken before the check, so a publish after it still wakes us
+                if wakeup is not None:
+                    if self._sequence <= sequence:
+                        wakeup.wait(timeout=self.keepalive)
+                else:
+                    with self._condition:
+                        if self._sequence <= sequence:
+                            self._condition.wait(timeout=self.keepalive)
+                frames = self.frames_after(sequence)
+                if frames:
+                    sequence = frames[-1][0]
+                    yield b"".join(frame for _, frame in frames)
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= self.keepalive:
+                    yield b": keepalive\n\n"
+                    last_sent = time.monotonic()
+        finally:
+            with self._condition:
+                self.viewers -= 1
+
+
+class StreamingAnalysisSession:
+    """Incremental beat tracking of PCM chunks streamed from a browser microphone
+
+    Chunks are mono little-endian int16 at `sample_rate` (the browser
+    downsamples before sending).  They are cut into fixed blocks and fed to
+    the same StreamingBeatTracker the live detector uses; leftovers wait for
+    the next chunk.  Every chunk is timed against budget_ms.  Chunks of
+    one session are processed one at a time, even if they arrive together.
+    """
+
+    def __init__(self, sample_rate=11025, block_size=512, budget_ms=20.0):
+        self.session_id = uuid.uuid4().hex
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.budget_ms = budget_ms
+        self.tracker = StreamingBeatTracker(sample_rate, channels=1, source='browser')
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.chunks = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.over_budget = 0
+        self.last_seen = time.monotonic()
+        self._lock = threading.Lock()
+
+    def process_chunk(self, pcm_bytes):
+        """Process one chunk and return the beats and tempo it produced"""
+        if len(pcm_bytes) % 2:
+            raise ValueError("PCM chunk must contain whole 16-bit samples")
+        with self._lock:
+            return self._process_chunk(pcm_bytes)
+
+    def _process_chunk(self, pcm_bytes):
+        self.last_seen = time.monotonic()
+        started = time.perf_counter()
+
+        samples = np.frombuffer(pcm_bytes, dtype='<i2').astype(np.float32) / 32768.0
+        pending = np.concatenate((self._pending, samples)) if len(self._pending) else samples
+        usable = len(pending) - len(pending) % self.block_size
+        events = []
+        for block in pending[:usable].reshape(-1, self.block_size):
+            events.extend(self.tracker.process_block(block))
+        self._pending = pending[usable:].copy()
+
+        elapsed_ms = 1000 * (time.perf_counter() - started)
+        self.chunks += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if elapsed_ms > self.budget_ms:
+            self.over_budget += 1
+        self.last_seen = time.monotonic()
+
+        return {
+            'beats': [[round(e.time, 3), round(e.energy, 5)] for e in events],
+            'tempo': round(float(self.tracker.current_tempo[0]), 1),
+            'beat_count': int(self.tracker.beat_counts[0]),
+            'stream_time': round(self.tracker.current_time, 3),
+            'processing_ms': round(elapsed_ms, 3),
+            'over_budget': elapsed_ms > self.budget_ms
+        }
+
+    def summary(self):
+        with self._lock:
+            return self._summary()
+
+    def _summary(self):
+        return {
+            'session_id': self.session_id,
+            'chunks': self.chunks,
+            'beat_count': int(self.tracker.beat_counts[0]),
+            'average_tempo': round(self.tracker.average_tempo(0), 1),
+            'stream_seconds': round(self.tracker.current_time, 2),
+            'mean_processing_ms': round(self.total_ms / max(self.chunks, 1), 3),
+            'max_processing_ms': round(self.max_ms, 3),
+            'over_budget_chunks': self.over_budget,
+            'budget_ms': self.budget_ms
+        }
@@ -5,17 +5,66 @@ from matplotlib.animation import FuncAnimation
 import time
 import threading
 from collections import deque
+from beat_events import BeatEvent, BeatEventBus, start_console_printer
+
+class PlotPerformance:
+    """Frames-per-second vs. process CPU usage of a live plot"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.frame_seconds = 0.0
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def record(self, frame_seconds):
+        self.frames += 1
+        self.frame_seconds += frame_seconds
+
+    def summary(self):
+        wall = max(time.perf_counter() - self.wall_start, 1e-9)
+        cpu = time.process_time() - self.cpu_start
+        return {
+            'frames': self.frames,
+            'fps': self.frames / wall,
+            'ms_per_frame': 1000 * self.frame_seconds / max(self.frames, 1),
+            'cpu_percent': 100 * cpu / wall
+        }
+
 
 class RealTimeBeatDetector:
-    def __init__(self, sample_rate=22050, block_size=1024):
+    def __init__(self, sample_rate=22050, block_size=1024, event_bus=None,
+                 blit=False, history_size=100):
         self.sample_rate = sample_rate
         self.block_size = block_size
-        self.energy_history = deque(maxlen=100)
+        self.event_bus = event_bus or BeatEventBus()
+        self._console_stop = threading.Event()
+        self.blit = blit
+        self.history_size = history_size
+        self.energy_history = deque(maxlen=history_size)
         self.beat_times = deque(maxlen=50)
         self.beat_energy = deque(maxlen=50)
         self.is_running = False
         self.beat_count = 0
         self.start_time = time.time()
+        self.plot_stats = PlotPerformance()
+
+        # Ring buffer written by the audio callback (no per-block allocation)
+        self._ring_times = np.zeros(history_size)
+        self._ring_energies = np.zeros(history_size)
+        self._ring_pos = 0
+        self._ring_filled = 0
+
+        # Preallocated arrays the blitted plot mirrors the ring buffer into
+        self._plot_times = np.full(history_size, np.nan)
+        self._plot_energies = np.full(history_size, np.nan)
+        self._plot_threshold = np.full(2, np.nan)
+        self._plot_beat_times = np.full(self.beat_times.maxlen, np.nan)
+        self._plot_beat_energies = np.full(self.beat_energy.maxlen, np.nan)
+        self._window_seconds = history_size * block_size / sample_rate
+        self._energy_ylim = 1.0
         
         # Setup plot
         self.fig, (self.ax1, self.ax2) = plt.subplots(2, 1, figsize=(12, 8))
@@ -39,6 +88,18 @@ class RealTimeBeatDetector:
         self.energy_line, = self.ax1.plot([], [], 'b-', linewidth=1, label='Energy')
         self.threshold_line, = self.ax1.plot([], [], 'r--', linewidth=1, label='Threshold')
         self.beat_line, = self.ax2.plot([], [], 'ro-', markersize=8, label='Beats')
+
+        if self.blit:
+            # Fixed axes on a sliding "seconds ago" scale, so only the lines
+            # are redrawn on top of a cached background
+            for ax in (self.ax1, self.ax2):
+                ax.set_xlim(-self._window_seconds, 0)
+                ax.set_xlabel('Time (seconds ago)')
+            self.ax1.set_ylim(0, self._energy_ylim)
+            self.ax2.set_ylim(0, self._energy_ylim)
+            self.threshold_line.set_data([-self._window_seconds, 0], self._plot_threshold)
+            for line in (self.energy_line, self.threshold_line, self.beat_line):
+                line.set_animated(True)
         
         self.ax1.legend()
         self.ax2.legend()
@@ -57,21 +118,34 @@ class RealTimeBeatDetector:
             current_time = time.time() - self.start_time
             
             self.energy_history.append((current_time, energy))
+            self._ring_times[self._ring_pos] = current_time
+            self._ring_energies[self._ring_pos] = energy
+            self._ring_pos = (self._ring_pos + 1) % self.history_size
+            self._ring_filled = min(self._ring_filled + 1, self.history_size)
             
             # Dynamic threshold
-            if len(self.energy_history) > 10:
-                energies = [e for t, e in self.energy_history]
-                threshold = np.mean(energies) * 2.5
+            if self._ring_filled > 10:
+                threshold = self._ring_energies[:self._ring_filled].mean() * 2.5
                 
                 # Detect beat
-                if energy > threshold and len(self.energy_history) > 20:
+                if energy > threshold and self._ring_filled > 20:
                     self.beat_count += 1
                     self.beat_times.append(current_time)
                     self.beat_energy.append(energy)
-                    print(f"BEAT #{self.beat_count} at {current_time:.2f}s - Energy: {energy:.4f}")
+                    self.event_bus.publish(BeatEvent(self.beat_count, current_time, energy))
     
     def update_plot(self, frame):
         """Update the real-time plot"""
+        started = time.perf_counter()
+        if self.blit:
+            artists = self._update_plot_blit()
+        else:
+            artists = self._update_plot_autoscale()
+        self.plot_stats.record(time.perf_counter() - started)
+        return artists
+
+    def _update_plot_autoscale(self):
+        """Original full-redraw update: rebuilds the data and rescales every frame"""
         if len(self.energy_history) > 0:
             times, energies = zip(*self.energy_history)
             
@@ -92,6 +166,51 @@ class RealTimeBeatDetector:
                 self.ax2.autoscale_view()
             
         return self.energy_line, self.threshold_line, self.beat_line
+
+    def _update_plot_blit(self):
+        """Copy the ring buffer into the preallocated plot arrays, fixed axes"""
+        filled = self._ring_filled
+        if filled == 0:
+            return self.energy_line, self.threshold_line, self.beat_line
+
+        # Unroll the ring (oldest first) with two slice copies, no allocation
+        pos = self._ring_pos
+        head = self.history_size - pos
+        self._plot_times[:head] = self._ring_times[pos:]
+        self._plot_times[head:] = self._ring_times[:pos]
+        self._plot_energies[:head] = self._ring_energies[pos:]
+        self._plot_energies[head:] = self._ring_energies[:pos]
+        now = self._plot_times[-1]
+        self._plot_times -= now
+        if filled < self.history_size:
+            self._plot_times[:self.history_size - filled] = np.nan
+
+        self.energy_line.set_data(self._plot_times, self._plot_energies)
+        if filled > 10:
+            self._plot_threshold[:] = self._ring_energies[:filled].mean() * 2.5
+            self.threshold_line.set_ydata(self._plot_threshold)
+
+        # Snapshot both deques once: the audio thread may append a beat between the two reads
+        times = np.array(self.beat_times)
+        energies = np.array(self.beat_energy)
+        beats = min(len(times), len(energies))
+        if beats > 0:
+            self._plot_beat_times.fill(np.nan)
+            self._plot_beat_energies.fill(np.nan)
+            self._plot_beat_times[:beats] = times[:beats] - now
+            self._plot_beat_energies[:beats] = energies[:beats]
+            self.beat_line.set_data(self._plot_beat_times, self._plot_beat_energies)
+
+        # Rescale only when the signal outgrows the axes; the full draw gives
+        # FuncAnimation a fresh background to cache for the new view
+        peak = np.nanmax(self._plot_energies)
+        if peak > self._energy_ylim:
+            self._energy_ylim = peak * 1.5
+            self.ax1.set_ylim(0, self._energy_ylim)
+            self.ax2.set_ylim(0, self._energy_ylim)
+            self.fig.canvas.draw()
+
+        return self.energy_line, self.threshold_line, self.beat_line
     
     def start_detection(self):
         """Start real-time beat detection"""
@@ -100,6 +219,8 @@ class RealTimeBeatDetector:
         
         self.is_running = True
         self.start_time = time.time()
+        self._console_stop.clear()
+        start_console_printer(self.event_bus, self._console_stop)
         
         # Start audio stream
         self.stream = sd.InputStream(
@@ -112,8 +233,10 @@ class RealTimeBeatDetector:
         self.stream.start()
         
         # Start animation
+        self.plot_stats.reset()
         self.ani = FuncAnimation(
-            self.fig, self.update_plot, interval=50, blit=False
+            self.fig, self.update_plot, interval=50, blit=self.blit,
+            cache_frame_data=False
         )
         
         # Show plot (this will block until window is closed)
@@ -125,16 +248,31 @@ class RealTimeBeatDetector:
         if hasattr(self, 'stream'):
             self.stream.stop()
             self.stream.close()
+        self._console_stop.set()
         print(f"\nStopped. Total beats detected: {self.beat_count}")
+        stats = self.plot_stats.summary()
+        if stats['frames']:
+            print(f"Plot: {stats['fps']:.1f} fps, {stats['ms_per_frame']:.2f} ms/frame, "
+                  f"{stats['cpu_percent']:.0f}% CPU ({'blit' if self.blit else 'full redraw'})")
+
+def simple_real_time_detection(stop_flag=None, event_bus=None):
+    """Simplified real-time detection without plots
 
-def simple_real_time_detection(stop_flag=None):
-    """Simplified real-time detection without plots"""
+    Mono: tracks the first input channel of the default device (see
+    enhanced_realtime.EnhancedRealTimeDetector for several channels or
+    devices).  Beats are published on event_bus.  When no bus is given, a private one is
+    created and printed to the console from a background thread.
+    """
     print("Starting simple real-time beat detection...")
     print("Press 'Stop Real-time' in GUI to stop")
     
     energy_history = []
     beat_count = 0
     start_time = time.time()
+    console_stop = threading.Event()
+    if event_bus is None:
+        event_bus = BeatEventBus()
+        start_console_printer(event_bus, console_stop)
     
     def audio_callback(indata, frames, time_info, status):
         nonlocal beat_count
@@ -160,7 +298,7 @@ def simple_real_time_detection(stop_flag=None):
             
             if energy > threshold and len(energy_history) > 20:
                 beat_count += 1
-                print(f"BEAT #{beat_count} at {current_time:.2f}s ♪")
+                event_bus.publish(BeatEvent(beat_count, current_time, energy))
     
     try:
         with sd.InputStream(callback=audio_callback, channels=1, samplerate=22050, blocksize=1024):
@@ -176,6 +314,7 @@ def simple_real_time_detection(stop_flag=None):
     except Exception as e:
         print(f"Real-time detection error: {e}")
     finally:
+        console_stop.set()
         print(f"Stopped. Total beats detected: {beat_count}")
 
 def main():
@@ -184,14 +323,17 @@ def main():
     parser = argparse.ArgumentParser(description='Real-time Beat Detection')
     parser.add_argument('--visual', action='store_true', help='Use visual real-time detection')
     parser.add_argument('--simple', action='store_true', help='Use simple text-based detection')
+    parser.add_argument('--blit', action='store_true', help='Use blitted fixed-axis plotting with --visual')
     
     args = parser.parse_args()
     
     if args.visual:
-        detector = RealTimeBeatDetector()
+        detector = RealTimeBeatDetector(blit=args.blit)
         try:
             detector.start_detection()
         except KeyboardInterrupt:
+            pass
+        finally:
             detector.stop_detection()
     else:
         simple_real_time_detection()
@@ -0,0 +1,84 @@
+# run_manifest.py - Append-only record of which files a long analysis run has finished
+import hashlib
+import json
+import os
+
+
+def file_sha1(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_default(value):
+    return value.item() if hasattr(value, 'item') else str(value)  # numpy scalars
+
+
+class RunManifest:
+    """JSON-lines manifest: one record per finished file (path, size, mtime, sha1, status)
+
+    Each record is appended and flushed to disk as soon as its file
+    finishes, so an interrupted run loses at most the file in progress.
+    When a path appears more than once the last record wins.  A file is
+    current when its size and mtime match its last 'done' record, or when
+    only the mtime changed but the content hash is the same (a copy or a
+    touch), so re-runs only analyse new and modified files.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.records = {}
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self.records[record['path']] = record
+        self._file = open(path, 'a' if resume else 'w')
+
+    def _stat(self, file_path):
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+    def current(self, file_path):
+        """The last 'done' record of an unchanged file, or None if it needs (re)analysis"""
+        path, size, mtime = self._stat(file_path)
+        record = self.records.get(path)
+        if record is None or record['status'] != 'done' or record['size'] != size:
+            return None
+        if record['mtime_ns'] != mtime:
+            sha1 = file_sha1(file_path)
+            if record.get('sha1') != sha1:
+                return None
+            self.record(file_path, 'done', record.get('summary'), sha1=sha1)  # remember the new mtime
+        return record
+
+    def record(self, file_path, status, summary=None, error=None, sha1=None):
+        try:
+            path, size, mtime = self._stat(file_path)
+        except OSError:
+            if status == 'done':
+                raise
+            path, size, mtime = os.path.abspath(file_path), None, None  # e.g. deleted mid-run
+        record = {'path': path, 'size': size, 'mtime_ns': mtime, 'status': status}
+        if status == 'done':
+            record['sha1'] = sha1 or file_sha1(file_path)
+            record['summary'] = summary
+        if error is not None:
+            record['error'] = error
+        self._file.write(json.dumps(record, default=_json_default) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records[path] = json.loads(json.dumps(record, default=_json_default))
+        return record
+
+    def counts(self):
+        statuses = [record['status'] for record in self.records.values()]
+        return {status: statuses.count(status) for status in set(statuses)}
+
+    def close(self):
+        self._file.close()
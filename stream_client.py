@@ -0,0 +1,109 @@
+# stream_client.py - Stand-in for the browser: replay a WAV file as streamed PCM chunks
+import argparse
+import json
+import time
+import urllib.request
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+
+def load_pcm(file_path, sample_rate):
+    """Read an audio file, mix to mono and resample to int16 PCM like the browser does"""
+    audio, sr = sf.read(file_path, dtype='float32', always_2d=True)
+    audio = audio.mean(axis=1)
+    if sr != sample_rate:
+        divisor = np.gcd(int(sr), int(sample_rate))
+        audio = resample_poly(audio, sample_rate // divisor, sr // divisor)
+    return (np.clip(audio, -1, 1) * 32767).astype('<i2')
+
+
+class HttpTransport:
+    """POST to a running web_app server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def post(self, path, data=None, json_body=None):
+        headers = {}
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        elif data is not None:
+            headers['Content-Type'] = 'application/octet-stream'
+        request = urllib.request.Request(self.base_url + path, data=data or b'', headers=headers)
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+
+class LocalTransport:
+    """Call the Flask app in-process through its test client (no server needed)"""
+
+    def __init__(self):
+        from web_app import app
+        self.client = app.test_client()
+
+    def post(self, path, data=None, json_body=None):
+        if json_body is not None:
+            return self.client.post(path, json=json_body).get_json()
+        return self.client.post(path, data=data or b'',
+                                content_type='application/octet-stream').get_json()
+
+
+def replay(transport, file_path, sample_rate=11025, chunk_ms=250, budget_ms=20.0, realtime=False):
+    """Stream a file chunk by chunk and collect what the server pushes back"""
+    pcm = load_pcm(file_path, sample_rate)
+    session = transport.post('/stream/start', json_body={'sample_rate': sample_rate,
+                                                         'budget_ms': budget_ms})
+    if not session.get('success'):
+        raise RuntimeError(session.get('error', 'Could not start stream'))
+    session_id = session['session_id']
+
+    chunk_samples = int(sample_rate * chunk_ms / 1000)
+    beats = []
+    round_trips = []
+    for start in range(0, len(pcm), chunk_samples):
+        chunk = pcm[start:start + chunk_samples].tobytes()
+        sent = time.perf_counter()
+        result = transport.post(f'/stream/{session_id}/chunk', data=chunk)
+        round_trips.append(1000 * (time.perf_counter() - sent))
+        beats.extend(result['beats'])
+        for beat_time, energy in result['beats']:
+            print(f"   🥁 {beat_time:7.2f}s | Tempo: {result['tempo']:.1f} BPM | "
+                  f"server {result['processing_ms']:.2f} ms")
+        if realtime:
+            time.sleep(max(0.0, chunk_ms / 1000 - (time.perf_counter() - sent)))
+
+    summary = transport.post(f'/stream/{session_id}/stop')
+    summary['round_trip_ms_p95'] = float(np.percentile(round_trips, 95)) if round_trips else 0.0
+    summary['beats'] = beats
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a WAV file through the streaming endpoint')
+    parser.add_argument('file', help='Audio file to stream')
+    parser.add_argument('--url', help='Base URL of a running web_app (default: in-process test client)')
+    parser.add_argument('--sample-rate', type=int, default=11025, help='Downsampled PCM rate')
+    parser.add_argument('--chunk-ms', type=int, default=250, help='Chunk length in milliseconds')
+    parser.add_argument('--budget-ms', type=float, default=20.0, help='Per-chunk processing budget')
+    parser.add_argument('--realtime', action='store_true', help='Pace chunks like a live microphone')
+    args = parser.parse_args()
+
+    transport = HttpTransport(args.url) if args.url else LocalTransport()
+    print(f"🎙  Streaming {args.file} in {args.chunk_ms} ms chunks at {args.sample_rate} Hz")
+    summary = replay(transport, args.file, args.sample_rate, args.chunk_ms,
+                     args.budget_ms, args.realtime)
+
+    print(f"\n📊 STREAM SUMMARY:")
+    print(f"   Beats: {summary['beat_count']} | Average tempo: {summary['average_tempo']:.1f} BPM")
+    print(f"   Chunks: {summary['chunks']} | Server mean/max: {summary['mean_processing_ms']:.2f}/"
+          f"{summary['max_processing_ms']:.2f} ms | Round trip p95: {summary['round_trip_ms_p95']:.2f} ms")
+    if summary['over_budget_chunks']:
+        print(f"   ⚠️  {summary['over_budget_chunks']} chunks exceeded the {summary['budget_ms']} ms budget")
+    else:
+        print(f"   ✅ Every chunk stayed under the {summary['budget_ms']} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# tempo_batch.py - Tempo estimation for many beat trains at once
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Same candidates and multipliers as BeatDetector.estimate_tempo_advanced
+COMMON_TEMPOS = np.array([60, 65, 70, 75, 80, 85, 90, 95, 100, 105, 110, 115, 120,
+                          125, 130, 135, 140, 145, 150, 155, 160, 165, 170, 175, 180, 185, 190])
+MULTIPLIERS = np.array([0.5, 0.667, 1.0, 1.5, 2.0])
+
+# Interval branch of BeatDetector.estimate_tempo
+INTERVAL_COMMON_TEMPOS = np.array([60, 70, 80, 90, 100, 110, 120, 130, 140, 150, 160, 170, 180])
+INTERVAL_MULTIPLIERS = np.array([0.5, 1.0, 2.0])
+
+
+def pack_beat_trains(beat_trains):
+    """Pack a ragged list of beat-time arrays into (offsets, values)
+
+    Train i is values[offsets[i]:offsets[i + 1]], so offsets has one more
+    entry than there are trains.
+    """
+    lengths = [len(train) for train in beat_trains]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+    values = np.concatenate([np.asarray(train, dtype=np.float64) for train in beat_trains]) \
+        if beat_trains else np.zeros(0)
+    return offsets, values
+
+
+def sliding_windows(beat_times, window_size):
+    """Packed (offsets, values) of every window_size-beat window of one beat train"""
+    beat_times = np.asarray(beat_times, dtype=np.float64)
+    count = max(0, len(beat_times) - window_size + 1)
+    index = np.arange(count)[:, None] + np.arange(window_size)
+    return np.arange(count + 1) * window_size, beat_times[index].ravel()
+
+
+def packed_intervals(offsets, values):
+    """Inter-beat intervals of every train, packed the same way"""
+    lengths = np.diff(offsets)
+    interval_counts = np.maximum(lengths - 1, 0)
+    # Drop the difference across each boundary between consecutive trains
+    keep = np.ones(max(len(values) - 1, 0), dtype=bool)
+    keep[offsets[1:-1][(offsets[1:-1] > 0) & (offsets[1:-1] < len(values))] - 1] = False
+    intervals = np.diff(values)[keep]
+    return np.concatenate(([0], np.cumsum(interval_counts))), intervals
+
+
+def _segment_ids(offsets):
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def sort_segments(offsets, values):
+    """Sort each segment's values independently (one lexsort for all of them)"""
+    return values[np.lexsort((values, _segment_ids(offsets)))]
+
+
+def segment_percentile(offsets, sorted_values, q):
+    """np.percentile (linear method) of every segment of already sorted values
+
+    Empty segments give nan.
+    """
+    lengths = np.diff(offsets)
+    result = np.full(len(lengths), np.nan)
+    filled = lengths > 0
+    position = (lengths[filled] - 1) * (q / 100.0)
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, lengths[filled] - 1)
+    t = position - low
+    a = sorted_values[offsets[:-1][filled] + low]
+    b = sorted_values[offsets[:-1][filled] + high]
+    # numpy's lerp: interpolate from whichever end is nearer
+    result[filled] = np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+    return result
+
+
+def segment_median(offsets, sorted_values):
+    """np.median of every segment of already sorted values (nan when empty)"""
+    lengths = np.diff(offsets)
+    result = np.full(len(lengths), np.nan)
+    filled = lengths > 0
+    starts = offsets[:-1][filled]
+    a = sorted_values[starts + (lengths[filled] - 1) // 2]
+    b = sorted_values[starts + lengths[filled] // 2]
+    result[filled] = (a + b) / 2
+    return result
+
+
+def filter_segments(offsets, values, mask):
+    """Keep values where mask is True; returns the re-packed (offsets, values)"""
+    counts = np.bincount(_segment_ids(offsets)[mask], minlength=len(offsets) - 1)
+    return np.concatenate(([0], np.cumsum(counts))), values[mask]
+
+
+def snap_to_common(bpms, common_tempos=COMMON_TEMPOS):
+    """Closest common tempo to each BPM (the lower one on ties, like min())"""
+    right = np.clip(np.searchsorted(common_tempos, bpms), 1, len(common_tempos) - 1)
+    left = right - 1
+    use_left = np.abs(bpms - common_tempos[left]) <= np.abs(bpms - common_tempos[right])
+    return common_tempos[np.where(use_left, left, right)]
+
+
+def estimate_tempo_advanced_batch(offsets, values):
+    """BeatDetector.estimate_tempo_advanced for every packed beat train at once
+
+    Interval statistics, IQR outlier removal, octave candidates and snapping
+    to COMMON_TEMPOS are done for all trains in a handful of array
+    operations.  Returns one tempo per train (0 where the per-call
+    estimator would return 0).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    tempos = np.zeros(len(offsets) - 1)
+
+    interval_offsets, intervals = packed_intervals(offsets, values)
+    intervals = sort_segments(interval_offsets, intervals)
+    q1 = segment_percentile(interval_offsets, intervals, 25)
+    q3 = segment_percentile(interval_offsets, intervals, 75)
+    iqr = q3 - q1
+
+    ids = _segment_ids(interval_offsets)
+    inside = (intervals >= (q1 - 1.5 * iqr)[ids]) & (intervals <= (q3 + 1.5 * iqr)[ids])
+    valid_offsets, valid = filter_segments(interval_offsets, intervals, inside)
+    usable = (np.diff(offsets) >= 4) & (np.diff(valid_offsets) >= 3)
+    if not usable.any():
+        return tempos
+
+    raw_bpm = 60.0 / segment_median(valid_offsets, valid)[usable]
+
+    # (trains x multipliers) candidate grid
+    candidates = raw_bpm[:, None] * MULTIPLIERS
+    closest = snap_to_common(candidates)
+    weights = np.where(MULTIPLIERS == 1.0, 1.0, 0.7)
+    weighted_error = np.abs(candidates - closest) * weights
+    weighted_error[(candidates < 60) | (candidates > 200)] = np.inf
+
+    best = np.argmin(weighted_error, axis=1)  # first multiplier wins ties, as the stable sort does
+    rows = np.arange(len(raw_bpm))
+    has_candidate = np.isfinite(weighted_error[rows, best])
+    tempos[usable] = np.where(has_candidate, closest[rows, best], raw_bpm)
+    return tempos
+
+
+def snap_interval_tempo(median_bpm):
+    """Octave-corrected snapping of BeatDetector.estimate_tempo for many BPMs
+
+    The per-call loop keeps the first (multiplier, common tempo) pair that
+    strictly improves on |bpm - 60|, which is the first occurrence of the
+    overall minimum error when that minimum beats the starting error.
+    """
+    median_bpm = np.asarray(median_bpm, dtype=np.float64)
+    scaled = median_bpm[:, None] * INTERVAL_MULTIPLIERS  # (n, multipliers)
+    errors = np.abs(scaled[:, :, None] - INTERVAL_COMMON_TEMPOS)  # (n, multipliers, tempos)
+    errors[(scaled < 60) | (scaled > 180)] = np.inf
+    errors = errors.reshape(len(median_bpm), -1)
+    first_min = np.argmin(errors, axis=1)
+    improves = errors[np.arange(len(median_bpm)), first_min] < np.abs(median_bpm - 60)
+    snapped = INTERVAL_COMMON_TEMPOS[first_min % len(INTERVAL_COMMON_TEMPOS)]
+    return np.where(improves, snapped, median_bpm)
+
+
+def estimate_tempo_windows(beat_times, window_size):
+    """BeatDetector.estimate_tempo (interval branch) of every window_size-beat window
+
+    Windows start at beats 0 .. len(beat_times) - window_size - 1, as in
+    analyze_tempo_over_time.  Each window's intervals are a strided view
+    of one interval array, so sliding by a beat costs nothing to set up and
+    all windows are sorted and reduced together.  Returns one tempo per
+    window (0 where no interval is between 0.3 and 2 seconds).
+    """
+    intervals = np.diff(np.asarray(beat_times, dtype=np.float64))
+    count = len(beat_times) - window_size
+    if count <= 0:
+        return np.zeros(0)
+    if window_size < 3:
+        return np.zeros(count)  # estimate_tempo needs at least 3 beats
+    windows = sliding_window_view(intervals, window_size - 1)[:count]
+
+    # Invalid intervals become nan, which np.sort puts after the valid ones
+    ordered = np.sort(np.where((windows > 0.3) & (windows < 2.0), windows, np.nan), axis=1)
+    valid = np.count_nonzero(~np.isnan(ordered), axis=1)
+    tempos = np.zeros(count)
+    has_valid = valid > 0
+    rows = np.flatnonzero(has_valid)
+    k = valid[has_valid]
+    median = (ordered[rows, (k - 1) // 2] + ordered[rows, k // 2]) / 2
+    tempos[has_valid] = snap_interval_tempo(60.0 / median)
+    return tempos
@@ -0,0 +1,151 @@
+# track_index.py - Persistent tempo-range index over analyzed tracks (SQLite B-trees)
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from library_index import scan_library
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    genre TEXT NOT NULL COLLATE NOCASE,
+    final_tempo REAL NOT NULL,
+    tempo_stability REAL NOT NULL,
+    beat_density REAL NOT NULL,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS tracks_tempo ON tracks (final_tempo, tempo_stability, beat_density);
+CREATE INDEX IF NOT EXISTS tracks_genre_tempo ON tracks (genre, final_tempo, tempo_stability, beat_density);
+"""
+
+COLUMNS = ('path', 'file', 'genre', 'final_tempo', 'tempo_stability', 'beat_density', 'duration')
+
+
+class TrackIndex:
+    """Analyzed tracks keyed by path, with B-tree indexes for tempo-range queries
+
+    (genre, final_tempo, ...) and (final_tempo, ...) indexes cover the
+    search filters, so a query such as "Electronic, 124-128 BPM, stable"
+    is a range scan over the matching tempos only, whatever the library
+    size; the table is read just for the rows returned.
+    """
+
+    def __init__(self, db_path='track_index.sqlite'):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(SCHEMA)
+
+    def _row(self, summary, path=None):
+        return (path or summary['path'], summary['file'], summary['genre'],
+                float(summary['final_tempo']), float(summary['tempo_stability']),
+                float(summary['beat_density']),
+                None if summary.get('duration') in (None, '') else float(summary['duration']))
+
+    def add(self, summary, path=None):
+        """Insert or replace one genre-analysis file summary (committed immediately)"""
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            self._row(summary, path))
+
+    def add_many(self, summaries):
+        """Insert or replace many summaries (each with an absolute 'path') in one transaction"""
+        rows = [self._row(summary) for summary in summaries]
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def import_csv(self, csv_path, library=None):
+        """Load a genre_analysis_results.csv; returns how many tracks were added
+
+        Tracks are keyed by absolute path, as genre_analysis adds them.
+        Older CSVs only have file names: those are resolved against the
+        files under library, and names that are missing or ambiguous
+        there are skipped.
+        """
+        with open(csv_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        if rows and not rows[0].get('path'):
+            if library is None:
+                raise ValueError(f"'{csv_path}' has no path column; pass the library folder to resolve file names")
+            by_name = {}
+            for path, _, _ in scan_library(library):
+                by_name.setdefault(os.path.basename(path), []).append(os.path.abspath(path))
+            resolved = [dict(row, path=by_name[row['file']][0]) for row in rows
+                        if len(by_name.get(row['file'], ())) == 1]
+            if len(resolved) < len(rows):
+                print(f"⚠️  {len(rows) - len(resolved)} file names not found (or not unique) under '{library}'")
+            rows = resolved
+        return self.add_many(rows)
+
+    def remove(self, paths):
+        with self.db:
+            self.db.executemany("DELETE FROM tracks WHERE path = ?", ((path,) for path in paths))
+
+    def search(self, min_tempo=None, max_tempo=None, genre=None, max_stability=None,
+               min_density=None, max_density=None, limit=100):
+        """Tracks matching every given filter, ordered by tempo (tempo bounds are inclusive)"""
+        conditions, params = [], []
+        for clause, value in (("genre = ?", genre), ("final_tempo >= ?", min_tempo),
+                              ("final_tempo <= ?", max_tempo), ("tempo_stability <= ?", max_stability),
+                              ("beat_density >= ?", min_density), ("beat_density <= ?", max_density)):
+            if value is not None:
+                conditions.append(clause)
+                params.append(value)
+        query = f"SELECT {', '.join(COLUMNS)} FROM tracks"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY final_tempo LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        return [dict(zip(COLUMNS, row)) for row in self.db.execute(query, params)]
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query analyzed tracks by tempo range, genre and stability')
+    parser.add_argument('--db', default='track_index.sqlite', help='SQLite track index file')
+    parser.add_argument('--import', dest='import_csv', metavar='CSV',
+                        help='Add the rows of a genre_analysis_results.csv to the index first')
+    parser.add_argument('--library', help='Library folder for resolving file names of CSVs without a path column')
+    parser.add_argument('--tempo', nargs=2, type=float, metavar=('MIN', 'MAX'), help='BPM range (inclusive)')
+    parser.add_argument('--genre', help='Genre (case-insensitive)')
+    parser.add_argument('--max-stability', type=float, help='Largest tempo std dev in BPM (lower is steadier)')
+    parser.add_argument('--density', nargs=2, type=float, metavar=('MIN', 'MAX'), help='Beats per second range')
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    with TrackIndex(args.db) as tracks:
+        if args.import_csv:
+            try:
+                imported = tracks.import_csv(args.import_csv, args.library)
+            except ValueError as e:
+                print(f"❌ {e} (--library)")
+                sys.exit(1)
+            print(f"📥 Imported {imported} tracks from '{args.import_csv}'")
+        min_tempo, max_tempo = args.tempo or (None, None)
+        min_density, max_density = args.density or (None, None)
+        started = time.perf_counter()
+        matches = tracks.search(min_tempo, max_tempo, args.genre, args.max_stability,
+                                min_density, max_density, args.limit)
+        elapsed = time.perf_counter() - started
+        print(f"🔎 {len(matches)} of {tracks.count()} tracks in {1000 * elapsed:.1f} ms")
+        for track in matches:
+            print(f"   {track['final_tempo']:6.1f} BPM | ±{track['tempo_stability']:5.1f} | "
+                  f"{track['beat_density']:4.2f} beats/s | {track['genre']:<12} {os.path.basename(track['file'])}")
+
+
+if __name__ == "__main__":
+    main()
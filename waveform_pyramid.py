@@ -0,0 +1,103 @@
+# waveform_pyramid.py - Min/max decimation pyramid for plotting long signals
+import numpy as np
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max summary of a 1-D signal
+
+    Level 0 is the signal itself; level k keeps the minimum and maximum of
+    every branching**k consecutive samples.  A plot asks query() for a time
+    range and gets back at most max_points points from the finest level
+    that fits that budget, so drawing cost depends on the
+    plot width rather than the track length.  Peaks are never lost because
+    each bin contributes both its minimum and its maximum.
+    """
+
+    def __init__(self, signal, rate, start_time=0.0, branching=4, min_bins=256):
+        self.signal = np.asarray(signal)
+        self.rate = float(rate)
+        self.start_time = start_time
+        self.branching = branching
+        self.levels = []  # (bin size in samples, mins, maxs)
+
+        mins = maxs = self.signal
+        size = 1
+        while len(mins) > min_bins * branching:
+            mins = self._reduce(mins, np.minimum)
+            maxs = self._reduce(maxs, np.maximum)
+            size *= branching
+            self.levels.append((size, mins, maxs))
+
+    def _reduce(self, values, ufunc):
+        """Combine every `branching` values into one (the last bin may be partial)"""
+        full = len(values) - len(values) % self.branching
+        reduced = values[0:full:self.branching].copy()
+        for offset in range(1, self.branching):
+            ufunc(reduced, values[offset:full:self.branching], out=reduced)
+        if full < len(values):
+            reduced = np.append(reduced, ufunc.reduce(values[full:]))
+        return reduced
+
+    def __len__(self):
+        return len(self.signal)
+
+    @property
+    def duration(self):
+        return len(self.signal) / self.rate
+
+    def query(self, t0=None, t1=None, max_points=4000):
+        """Return (times, values) covering [t0, t1] with at most max_points points
+
+        Decimated levels return an interleaved min/max trace, which draws
+        as the familiar filled waveform envelope when plotted as a line.
+        """
+        n = len(self.signal)
+        i0 = 0 if t0 is None else int(np.floor((t0 - self.start_time) * self.rate))
+        i1 = n if t1 is None else int(np.ceil((t1 - self.start_time) * self.rate)) + 1
+        i0, i1 = max(0, min(i0, n)), max(0, min(i1, n))
+        if i1 <= i0:
+            return np.zeros(0), np.zeros(0)
+
+        if i1 - i0 <= max_points:
+            times = self.start_time + np.arange(i0, i1) / self.rate
+            return times, self.signal[i0:i1]
+
+        # Finest level whose bins in the range fit the point budget (two points per bin);
+        # a short signal has no levels, so its raw samples are merged below
+        size, mins, maxs = self.levels[-1] if self.levels else (1, self.signal, self.signal)
+        for level in self.levels:
+            if 2 * (i1 - i0) / level[0] <= max_points:
+                size, mins, maxs = level
+                break
+        b0, b1 = i0 // size, -(-i1 // size)
+        bin_times = self.start_time + np.arange(b0, b1) * size / self.rate
+        mins, maxs = mins[b0:b1], maxs[b0:b1]
+        if 2 * len(mins) > max_points:
+            # Even the coarsest level is too dense for this budget: merge further
+            starts = np.arange(0, len(mins), -(-2 * len(mins) // max_points))
+            mins, maxs = np.minimum.reduceat(mins, starts), np.maximum.reduceat(maxs, starts)
+            bin_times = bin_times[starts]
+
+        times = np.repeat(bin_times, 2)
+        values = np.empty(2 * len(mins), dtype=mins.dtype)
+        values[0::2] = mins
+        values[1::2] = maxs
+        return times, values
+
+
+def plot_pyramid(ax, pyramid, max_points=4000, **plot_kwargs):
+    """Plot a pyramid on ax and re-query it whenever the x limits change
+
+    Zooming or panning (toolbar or set_xlim) swaps in the matching level
+    for the visible range, so detail appears on zoom without recomputing
+    anything from the raw signal beyond the visible slice.
+    """
+    times, values = pyramid.query(max_points=max_points)
+    line, = ax.plot(times, values, **plot_kwargs)
+
+    def on_xlim_changed(axes):
+        t0, t1 = axes.get_xlim()
+        line.set_data(*pyramid.query(t0, t1, max_points))
+
+    ax.callbacks.connect('xlim_changed', on_xlim_changed)
+    return line
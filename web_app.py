@@ -1,18 +1,36 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response
+import io
 import os
+import threading
+import time
 import numpy as np
 from beat_detector import BeatDetector
-import tempfile
-import soundfile as sf
+from beat_events import BeatEventBus
+from live_stream import LiveBroadcaster, StreamingAnalysisSession
+from track_index import TrackIndex
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file
+app.config['TRACK_INDEX'] = 'track_index.sqlite'  # written by genre_analysis.py / track_index.py
 
 # Create upload directory
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 detector = BeatDetector()
+WEB_OUTPUTS = ('tempo_energy', 'tempo_flux', 'energy_beats', 'flux_beats', 'audio_length')
+
+# Live beats: one detector feeds one bus; the broadcaster batches it for all viewers
+live_bus = BeatEventBus()
+live_broadcaster = LiveBroadcaster(live_bus)
+live_state = {'detector': None, 'thread': None}
+live_lock = threading.Lock()
+
+# Browser-microphone streaming sessions, dropped after STREAM_IDLE_SECONDS idle
+stream_sessions = {}
+stream_lock = threading.Lock()
+STREAM_IDLE_SECONDS = 60
+MAX_STREAM_SESSIONS = 32
 
 @app.route('/')
 def index():
@@ -32,8 +50,8 @@ def analyze_audio():
     file.save(filename)
     
     try:
-        # Analyze the file
-        results = detector.analyze_audio_file(filename, visualize=False)
+        # Analyze the file (only the stages behind these outputs run)
+        results = detector.analyze(filename, WEB_OUTPUTS, preset='basic')
         
         if results is None:
             return jsonify({'success': False, 'error': 'Analysis returned no results'}), 500
@@ -91,5 +109,171 @@ def create_demo():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/search')
+def search_tracks():
+    """Analyzed tracks by tempo range, genre, stability and density, e.g.
+    /search?min_tempo=124&max_tempo=128&genre=electronic&max_stability=2"""
+    filters = {}
+    for name, parse in (('min_tempo', float), ('max_tempo', float), ('max_stability', float),
+                        ('min_density', float), ('max_density', float), ('limit', int)):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = parse(value)
+        except ValueError:
+            return jsonify({'success': False, 'error': f"Invalid {name}: {value!r}"}), 400
+        if not np.isfinite(filters[name]):
+            return jsonify({'success': False, 'error': f"Invalid {name}: {value!r}"}), 400
+    limit = max(1, min(filters.pop('limit', 100), 1000))  # SQLite treats a negative LIMIT as none
+    started = time.perf_counter()
+    # One connection per request: opening SQLite is cheap and requests run on their own threads
+    with TrackIndex(app.config['TRACK_INDEX']) as tracks:
+        matches = tracks.search(genre=request.args.get('genre'), limit=limit, **filters)
+    return jsonify({'success': True, 'count': len(matches), 'tracks': matches,
+                    'query_ms': round(1000 * (time.perf_counter() - started), 2)})
+
+@app.route('/live/start', methods=['POST'])
+def start_live():
+    """Start the real-time detector on the server's audio input"""
+    with live_lock:
+        if live_state['detector'] is not None and live_state['detector'].is_running:
+            return jsonify({'success': True, 'running': True})
+        try:
+            from enhanced_realtime import EnhancedRealTimeDetector
+            channels = request.args.get('channels', 1, type=int)
+            live_detector = EnhancedRealTimeDetector(event_bus=live_bus, channels=max(1, channels))
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+
+        live_broadcaster.start()
+        thread = threading.Thread(target=live_detector.start_detection,
+                                  kwargs={'console': False}, daemon=True)
+        live_state.update(detector=live_detector, thread=thread)
+        thread.start()
+    return jsonify({'success': True, 'running': True})
+
+@app.route('/live/stop', methods=['POST'])
+def stop_live():
+    with live_lock:  # held while joining, so a restart can't open the input before it is closed
+        live_detector, thread = live_state['detector'], live_state['thread']
+        if live_detector is not None:
+            live_detector.stop_detection()
+        if thread is not None:
+            thread.join(timeout=2.0)  # start_detection checks is_running every 0.1 s
+        live_state.update(detector=None, thread=None)
+    live_broadcaster.publish_frame({'running': False}, event='status')
+    return jsonify({'success': True, 'running': False})
+
+@app.route('/live/status')
+def live_status():
+    live_detector = live_state['detector']
+    return jsonify({
+        'running': bool(live_detector and live_detector.is_running),
+        'beats': live_detector.beat_count if live_detector else 0,
+        'viewers': live_broadcaster.viewers
+    })
+
+@app.route('/live/events')
+def live_events():
+    """Server-Sent Events stream of batched beats and tempo updates"""
+    live_broadcaster.start()
+    return Response(live_broadcaster.stream(request.headers.get('Last-Event-ID')),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.before_request
+def _expire_stream_sessions():
+    """Drop idle streaming sessions (checked on every request, so abandoned ones don't pile up)"""
+    now = time.monotonic()
+    with stream_lock:
+        for session_id in [sid for sid, session in stream_sessions.items()
+                           if now - session.last_seen > STREAM_IDLE_SECONDS]:
+            del stream_sessions[session_id]
+
+@app.route('/stream/start', methods=['POST'])
+def start_stream():
+    """Open a streaming session for PCM chunks sent by the browser"""
+    options = request.get_json(silent=True)
+    if not isinstance(options, dict):
+        options = {}
+    try:
+        sample_rate = int(options.get('sample_rate', 11025))
+        budget_ms = float(options.get('budget_ms', 20.0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'sample_rate and budget_ms must be numbers'}), 400
+    if not 4000 <= sample_rate <= 48000:
+        return jsonify({'success': False, 'error': 'Unsupported sample rate'}), 400
+    if not 0 < budget_ms < float('inf'):
+        return jsonify({'success': False, 'error': 'budget_ms must be a positive number'}), 400
+
+    # Keep the block duration of the live detector (1024 samples at 22050 Hz)
+    block_size = max(64, int(round(sample_rate * 1024 / 22050)))
+    session = StreamingAnalysisSession(sample_rate, block_size, budget_ms=budget_ms)
+    with stream_lock:
+        if len(stream_sessions) >= MAX_STREAM_SESSIONS:
+            return jsonify({'success': False, 'error': 'Too many streaming sessions, try again later'}), 503
+        stream_sessions[session.session_id] = session
+    return jsonify({'success': True, 'session_id': session.session_id,
+                    'sample_rate': sample_rate, 'block_size': block_size})
+
+@app.route('/stream/<session_id>/chunk', methods=['POST'])
+def stream_chunk(session_id):
+    """Analyze one chunk of little-endian int16 mono PCM"""
+    session = stream_sessions.get(session_id)
+    if session is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired session'}), 404
+    try:
+        result = session.process_chunk(request.get_data())
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    result['success'] = True
+    return jsonify(result)
+
+@app.route('/stream/<session_id>/stop', methods=['POST'])
+def stop_stream(session_id):
+    with stream_lock:
+        session = stream_sessions.pop(session_id, None)
+    if session is None:
+        return jsonify({'success': False, 'error': 'Unknown or expired session'}), 404
+    summary = session.summary()
+    summary['success'] = True
+    return jsonify(summary)
+
+def serve(host='0.0.0.0', port=5000):
+    """Serve on gevent: each connection is a greenlet, so live viewers cost no OS thread
+
+    Nothing is monkey-patched (the audio callbacks and the live detector
+    stay real threads).  /live/events viewers wait cooperatively on the
+    hub; every other request runs on the hub's thread pool, so a long
+    file analysis doesn't stall the live streams.
+    """
+    import gevent
+    from gevent.pywsgi import WSGIServer
+    hub = gevent.get_hub()
+    live_broadcaster.use_gevent()
+
+    def dispatch(environ, start_response):
+        if environ.get('PATH_INFO') == '/live/events':
+            return app(environ, start_response)
+        # The socket belongs to the hub: read the body here, before handing over to a pool thread
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        if 0 < length <= app.config['MAX_CONTENT_LENGTH']:  # larger ones Flask rejects unread
+            environ['wsgi.input'] = io.BytesIO(environ['wsgi.input'].read(length))
+        return hub.threadpool.apply(app, (environ, start_response))
+
+    print(f"🌐 Serving on http://{host}:{port} (gevent)")
+    WSGIServer((host, port), dispatch).serve_forever()
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description='Beat detection web app')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--threaded', action='store_true',
+                        help='Flask debug server instead (one thread per connection, also per live viewer)')
+    args = parser.parse_args()
+    if args.threaded:
+        app.run(debug=True, host=args.host, port=args.port, threaded=True)
+    else:
+        serve(args.host, args.port)
\ No newline at end of file